@@ -0,0 +1,820 @@
+'''
+Benchmarks for the LOLCODE interpreter pipeline.
+
+Usage:  python benchmark.py [name ...]      (runs every benchmark by default)
+'''
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from lexer import tokenize, iter_tokens, filter_tokens
+from token_stream import TokenStream, tokenize_mmap
+from tree_parser import TreeParser, StackTreeParser
+from tree_node import NodeArena, write_tree
+from parser import Parser
+from executor import compile_program, ClosureCompiler, iter_nodes
+from evaluator import evaluate
+from bytecode import compile_bytecode
+from vm import run_bytecode
+from transpiler import transpile, load, run_transpiled
+from optimizer import fold_constants, eliminate_dead_code, hoist_invariants, number_values
+from inference import infer_types
+from visitor import Visitor
+from tree_semantic import SymbolTable, SemanticAnalyzer, analyze_unit, analyze_semantics_from_code
+from compilation import CompilationUnit
+from semantic_analyzer import analyze_semantics, evaluate_expression
+from differential import (
+    Mismatch, corpus_files, read_corpus, loop_program, fib_program, counted_program, nested_sources,
+    DIFF_PROGRAMS, LOOP_STATEMENTS, parse_source, run_program, engine_output, run_vm,
+    run_python, differential_programs, differential_check, same_tree, check_types, prefix_mismatches,
+)
+
+
+# -------------------------
+# Helpers
+# -------------------------
+# Corpus programs the parser handles without syntax errors
+PARSE_CORPUS = ("01_variables.lol", "02_gimmeh.lol", "04_smoosh_assign.lol", "05_bool.lol")
+# Corpus programs made up mostly of operator expressions
+EXPR_CORPUS = ("03_arith.lol", "05_bool.lol", "06_comparison.lol")
+
+# Statements of a program, without its HAI / KTHXBYE lines
+def program_body(source):
+    return "\n".join(line for line in source.splitlines() if line.strip() not in ("HAI", "KTHXBYE"))
+
+# Build one program of roughly `size_mb` megabytes by repeating the corpus bodies
+def make_source(size_mb, names=None):
+    chunk = "\n".join(program_body(source) for source in read_corpus(names)) + "\n"
+    repeat = max(1, int(size_mb * 1024 * 1024 / len(chunk)))
+    return "HAI\n" + chunk * repeat + "KTHXBYE\n"
+
+# Recursion `depth` calls deep
+def countdown_program(depth):
+    return f"""HAI
+HOW IZ I down YR n
+    BOTH SAEM n AN 0
+    O RLY?
+        YA RLY
+            FOUND YR 0
+    OIC
+    FOUND YR SUM OF 1 AN I IZ down YR DIFF OF n AN 1 MKAY
+IF U SAY SO
+VISIBLE I IZ down YR {depth} MKAY
+KTHXBYE
+"""
+
+# Loop whose body is mostly constant subexpressions
+def constant_program(iterations):
+    return f"""HAI
+WAZZUP
+I HAS A total ITZ 0
+I HAS A label ITZ ""
+BUHBYE
+IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN {iterations}
+    total R SUM OF MOD OF total AN 1000 AN PRODUKT OF SUM OF 2 AN 3 AN DIFF OF 10 AN 4
+    label R SMOOSH "x:)" AN QUOSHUNT OF 9 AN 2 AN BOTH SAEM 3 AN 3.0 MKAY
+    BOTH OF NOT FAIL AN DIFFRINT 1 AN 2
+IM OUTTA YR loop
+VISIBLE total label
+KTHXBYE
+"""
+
+# Loop reading and writing many variables, declared before and inside it
+def variables_program(iterations):
+    return f"""HAI
+WAZZUP
+I HAS A a ITZ 1
+I HAS A b ITZ 2
+I HAS A c ITZ 3
+I HAS A d ITZ 0
+BUHBYE
+IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN {iterations}
+    d R SUM OF a AN b
+    a R b
+    b R MOD OF SUM OF c AN d AN 1000
+    c R DIFF OF d AN a
+    d R SUM OF PRODUKT OF a AN 2 AN MOD OF i AN 7
+IM OUTTA YR loop
+VISIBLE a " " b " " c " " d
+KTHXBYE
+"""
+
+# Loop body dominated by expressions over variables it never writes
+def invariant_program(iterations):
+    return f"""HAI
+WAZZUP
+I HAS A width ITZ 12
+I HAS A height ITZ 7
+I HAS A label ITZ "area"
+I HAS A total ITZ 0
+I HAS A shown
+BUHBYE
+IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN {iterations}
+    total R MOD OF SUM OF total AN SUM OF PRODUKT OF width AN height AN DIFF OF PRODUKT OF width AN 2 AN height AN 1000
+    shown R SMOOSH label AN "=" AN PRODUKT OF width AN height MKAY
+IM OUTTA YR loop
+VISIBLE total " " shown
+KTHXBYE
+"""
+
+# Generated-looking loop body repeating the same subexpressions
+def repeated_program(iterations):
+    return f"""HAI
+WAZZUP
+I HAS A x ITZ 3
+I HAS A y ITZ 4
+I HAS A area
+I HAS A total ITZ 0
+BUHBYE
+IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN {iterations}
+    x R MOD OF SUM OF x AN i AN 100
+    area R PRODUKT OF SUM OF x AN y AN DIFF OF x AN y
+    total R SUM OF MOD OF total AN 1000 AN PRODUKT OF SUM OF x AN y AN DIFF OF x AN y
+    total R SUM OF total AN SUM OF x AN y
+    BOTH SAEM SUM OF x AN y AN PRODUKT OF SUM OF x AN y AN DIFF OF x AN y
+IM OUTTA YR loop
+VISIBLE total " " area " " IT
+KTHXBYE
+"""
+
+# Generated-looking code full of dead stores, debug branches switched
+# off by a constant and code left after GTFO / FOUND YR
+def dead_program(iterations):
+    return f"""HAI
+HOW IZ I scale YR v
+    v R PRODUKT OF v AN 3
+    FOUND YR MOD OF v AN 1000
+    VISIBLE "scale done"
+    v R 0
+IF U SAY SO
+WAZZUP
+I HAS A total ITZ 0
+I HAS A scratch ITZ 0
+I HAS A debug ITZ FAIL
+BUHBYE
+IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN {iterations}
+    scratch R SUM OF total AN i
+    scratch R PRODUKT OF scratch AN 2
+    BOTH SAEM 1 AN 2
+    O RLY?
+        YA RLY
+            VISIBLE "debug " total
+            VISIBLE "debug " i
+    OIC
+    total R SUM OF MOD OF total AN 1000 AN i
+    scratch R DIFF OF total AN 1
+    SMOOSH "t=" AN total MKAY
+    I IZ scale YR i MKAY
+IM OUTTA YR loop
+scratch R 0
+VISIBLE total
+GTFO
+VISIBLE "finished"
+KTHXBYE
+"""
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+# Run fn(*args) under tracemalloc, returning (result, peak bytes)
+def peak_memory(fn, *args):
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# Run fn(*args) under tracemalloc, returning (result, bytes still allocated)
+def retained_memory(fn, *args):
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        gc.collect()    # parsers hold reference cycles (bound method tables)
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+def count_nodes(root):
+    count = 0
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        count += 1
+        pending.extend(node.children)
+    return count
+
+def tree_depth(root):
+    depth = 0
+    pending = [(root, 1)]
+    while pending:
+        node, level = pending.pop()
+        depth = max(depth, level)
+        pending.extend((child, level + 1) for child in node.children)
+    return depth
+
+def report(label, count, unit, seconds):
+    rate = count / seconds if seconds else float("inf")
+    print(f"  {label:<28} {count:>10} {unit} in {seconds:7.3f}s  ({rate:,.0f} {unit}/s)")
+
+
+# -------------------------
+# Benchmarks
+# -------------------------
+def bench_lexer():
+    print("lexer: tokenize() on generated sources")
+    for size_mb in (1, 4):
+        code = make_source(size_mb)
+        tokens, seconds = timed(tokenize, code)
+        report(f"{len(code) / 1e6:.1f} MB source", len(tokens), "tokens", seconds)
+
+def bench_streaming():
+    print("streaming: peak memory of tokenize(f.read()) vs iter_tokens(f)")
+
+    def whole_file(path):
+        with open(path, "r") as f:
+            return len(tokenize(f.read()))
+
+    def streamed(path):
+        with open(path, "r") as f:
+            return sum(1 for _ in iter_tokens(f))
+
+    for size_mb in (1, 4):
+        with tempfile.NamedTemporaryFile("w", suffix=".lol", delete=False) as f:
+            f.write(make_source(size_mb))
+            path = f.name
+        try:
+            for label, fn in (("tokenize", whole_file), ("iter_tokens", streamed)):
+                count, peak = peak_memory(fn, path)
+                print(f"  {size_mb} MB  {label:<12} {count:>9} tokens  peak {peak / 1e6:8.2f} MB")
+        finally:
+            os.remove(path)
+
+def bench_mmap():
+    print("mmap: tokenize_mmap(path) vs tokenize(f.read())")
+
+    # Correctness against tokenize on the corpus
+    for path in corpus_files():
+        with open(path, "r") as f:
+            expected = tokenize(f.read())
+        with tokenize_mmap(path) as tokens:
+            if list(tokens) != expected:
+                raise Mismatch(f"tokenize_mmap differs from tokenize on {os.path.basename(path)}")
+    print(f"  corpus: {len(corpus_files())} files match tokenize()")
+
+    def whole_file(path):
+        with open(path, "r") as f:
+            return tokenize(f.read())
+
+    with tempfile.NamedTemporaryFile("w", suffix=".lol", delete=False) as f:
+        f.write(make_source(4))
+        path = f.name
+    try:
+        (tokens, seconds) = timed(whole_file, path)
+        _, peak = peak_memory(whole_file, path)
+        print(f"  tokenize       {len(tokens):>9} tokens  {seconds:6.3f}s  peak {peak / 1e6:7.2f} MB")
+        del tokens
+
+        (tokens, seconds) = timed(tokenize_mmap, path)
+        _, peak = peak_memory(tokenize_mmap, path)
+        print(f"  tokenize_mmap  {len(tokens):>9} tokens  {seconds:6.3f}s  peak {peak / 1e6:7.2f} MB")
+        _, seconds = timed(lambda: sum(1 for _ in tokens))
+        print(f"  reading every token value from the mapped tokens: {seconds:6.3f}s")
+        tokens.close()
+    finally:
+        os.remove(path)
+
+def bench_tokenstream():
+    print("tokenstream: token tuples vs TokenStream columns")
+    code = make_source(4, PARSE_CORPUS)
+
+    tokens, peak = peak_memory(tokenize, code)
+    print(f"  tuple list     {peak / len(tokens):6.1f} bytes/token")
+    del tokens
+    stream, peak = peak_memory(TokenStream, code)
+    print(f"  TokenStream    {peak / len(stream):6.1f} bytes/token")
+
+    parser, seconds = timed(lambda: TreeParser(stream))
+    _, seconds = timed(parser.parse_program)
+    report("TreeParser on TokenStream", len(stream), "tokens", seconds)
+
+def bench_parser():
+    print("parser: parse_program() throughput on a TokenStream")
+    code = make_source(4, PARSE_CORPUS)
+    stream = TokenStream(code)
+    for label, parser_class in (("TreeParser", TreeParser), ("Parser", Parser)):
+        best = None
+        for _ in range(3):
+            parser = parser_class(stream)
+            _, seconds = timed(parser.parse_program)
+            best = seconds if best is None else min(best, seconds)
+        report(label, len(stream), "tokens", best)
+
+def bench_expr():
+    print("expr: parse_expr() on expression-heavy sources")
+    nested = "VISIBLE " + "SUM OF PRODUKT OF x AN 2 AN " * 50 + "x" + " AN 1" * 50 + "\n"
+    sources = (
+        ("expression corpus", make_source(2, EXPR_CORPUS)),
+        ("nested SUM/PRODUKT", "HAI\n" + nested * 2000 + "KTHXBYE\n"),
+    )
+    for label, code in sources:
+        stream = TokenStream(code)
+        best = None
+        for _ in range(3):
+            parser = TreeParser(stream)
+            _, seconds = timed(parser.parse_program)
+            best = seconds if best is None else min(best, seconds)
+        report(label, len(stream), "tokens", best)
+
+def bench_deep():
+    print("deep: StackTreeParser on deeply nested programs")
+
+    # Same AST as the recursive parser where that one still fits the call stack
+    for label, code in nested_sources(100):
+        stream = TokenStream(code)
+        expected = TreeParser(stream).parse_program()
+        if not same_tree(StackTreeParser(stream).parse_program(), expected):
+            raise Mismatch(f"StackTreeParser differs from TreeParser on nested {label}")
+    print("  depth 100: same AST as TreeParser")
+
+    for label, code in nested_sources(100_000):
+        stream = TokenStream(code)
+        try:
+            TreeParser(stream).parse_program()
+            recursive = "ok"
+        except RecursionError:
+            recursive = "RecursionError"
+        parser = StackTreeParser(stream)
+        tree, seconds = timed(parser.parse_program)
+        status = "ok" if not parser.errors else f"{len(parser.errors)} errors"
+        print(f"  depth 100000 {label:<9} depth {tree_depth(tree):>7}  {seconds:6.3f}s  {status}"
+              f"  (TreeParser: {recursive})")
+
+def bench_ast():
+    print("ast: retained memory per AST node, TreeNode objects vs NodeArena")
+    stream = TokenStream(make_source(2, PARSE_CORPUS))
+
+    tree, size = retained_memory(lambda: TreeParser(stream).parse_program())
+    nodes = count_nodes(tree)
+    print(f"  TreeNode   {nodes:>9} nodes  {size / 1e6:7.2f} MB  {size / nodes:6.1f} bytes/node")
+    del tree
+
+    def arena_tree():
+        return TreeParser(stream, NodeArena()).parse_program()
+
+    root, size = retained_memory(arena_tree)
+    nodes = len(root.arena)
+    print(f"  NodeArena  {nodes:>9} nodes  {size / 1e6:7.2f} MB  {size / nodes:6.1f} bytes/node"
+          f"  ({len(root.arena.strings)} interned values)")
+    _, seconds = timed(arena_tree)
+    report("TreeParser into NodeArena", len(stream), "tokens", seconds)
+
+def bench_pretty():
+    print("pretty: streaming write_tree vs the old recursive string-concatenating pretty()")
+
+    def concat_pretty(node, level=0):
+        out = f"{' ' * (level * 4)}{node.node_type}: {node.value}\n"
+        for child in node.children:
+            out += concat_pretty(child, level + 1)
+        return out
+
+    # Deep but recursion-safe tree: the old printer copies the tail at every level
+    deep = StackTreeParser(TokenStream("HAI\nVISIBLE " + "NOT " * 900 + "WIN\nKTHXBYE\n")).parse_program()
+    text, seconds = timed(concat_pretty, deep)
+    print(f"  depth 900   concat pretty()  {seconds:6.3f}s  {len(text) / 1e6:6.2f} MB of text")
+    with open(os.devnull, "w") as out:
+        _, seconds = timed(write_tree, deep, out)
+    print(f"  depth 900   write_tree       {seconds:6.3f}s")
+
+    tree = TreeParser(TokenStream(make_source(6, PARSE_CORPUS))).parse_program()
+    nodes = count_nodes(tree)
+    with open(os.devnull, "w") as out:
+        _, seconds = timed(write_tree, tree, out)
+        report("write_tree to devnull", nodes, "nodes", seconds)
+        _, peak = peak_memory(write_tree, tree, out)
+    print(f"  peak extra memory while writing: {peak / 1e3:.1f} KB")
+    with open(os.devnull, "w") as out:
+        _, seconds = timed(write_tree, tree, out, 3, 1000)
+    print(f"  max_depth=3, max_nodes=1000: {seconds * 1e3:.2f} ms")
+
+def bench_executor():
+    print("executor: closure-compiled AST execution")
+    for path, source in zip(corpus_files(), read_corpus()):
+        output = run_program(compile_program(parse_source(source)))
+        print(f"  {os.path.basename(path):<22} ran, {len(output.splitlines())} lines of output")
+
+    for iterations in (10000, 100000):
+        tree = parse_source(loop_program(iterations))
+        program, compile_seconds = timed(compile_program, tree)
+        output, seconds = timed(run_program, program)
+        expected = 0
+        for i in range(iterations):
+            expected = (expected + i) % 1000
+        assert output == f"{expected}\n", output
+        report(f"{iterations} iterations", iterations * LOOP_STATEMENTS, "statements", seconds)
+    print(f"  compile time {compile_seconds * 1e3:.2f} ms")
+
+def bench_vm():
+    print("vm: bytecode VM vs naive AST walk (evaluator)")
+    trees = [parse_source(source) for source in read_corpus()]
+    for tree in trees:
+        assert engine_output(run_vm, tree) == engine_output(evaluate, tree)
+    runs = 200
+    for label, run in (("AST walk", evaluate), ("compile + VM", run_vm)):
+        _, seconds = timed(lambda: [engine_output(run, tree) for _ in range(runs) for tree in trees])
+        report(f"lol_files x{runs}, {label}", runs * len(trees), "programs", seconds)
+    programs = [compile_bytecode(tree) for tree in trees]
+    _, seconds = timed(lambda: [engine_output(run_bytecode, program) for _ in range(runs) for program in programs])
+    report(f"lol_files x{runs}, VM only", runs * len(trees), "programs", seconds)
+
+    iterations = 100000
+    tree = parse_source(loop_program(iterations))
+    for label, run in (("AST walk", evaluate), ("bytecode VM", run_vm)):
+        _, seconds = timed(engine_output, run, tree)
+        report(f"loop, {label}", iterations * LOOP_STATEMENTS, "statements", seconds)
+
+    tree = parse_source(fib_program(20))
+    calls = 21891     # fib(20) makes this many calls
+    for label, run in (("AST walk", evaluate), ("bytecode VM", run_vm)):
+        output, seconds = timed(engine_output, run, tree)
+        assert output == "6765\n", output
+        report(f"fib(20), {label}", calls, "calls", seconds)
+
+    depth = 50000
+    tree = parse_source(countdown_program(depth))
+    output, seconds = timed(engine_output, run_vm, tree)
+    assert output == f"{depth}\n", output
+    print(f"  recursion depth {depth}: VM {seconds:.3f}s", end="")
+    try:
+        engine_output(evaluate, tree)
+        print(", AST walk ok")
+    except RecursionError:
+        print(", AST walk hits RecursionError")
+
+    program = compile_bytecode(parse_source(loop_program(10)))
+    print(f"  loop program: {len(program.code) // 2} instructions, "
+          f"{program.code.itemsize * len(program.code)} bytes of code")
+
+def bench_transpiler():
+    print("transpiler: LOLCODE -> Python source, checked against the AST walk")
+    failures = []
+    for label, run in (("executor", lambda tree, i, o: compile_program(tree).run(i, o)),
+                       ("vm", run_vm), ("python", run_python)):
+        failures += differential_check(run, label)
+    print(f"  differential check: {len(differential_programs())} programs x 3 engines, "
+          f"{len(failures)} mismatches")
+
+    iterations = 100000
+    tree = parse_source(loop_program(iterations))
+    namespace, seconds = timed(lambda: load(transpile(tree)))
+    print(f"  transpile + compile loop program: {seconds * 1e3:.2f} ms")
+    for label, run in (("AST walk", evaluate), ("bytecode VM", run_vm),
+                       ("python", lambda tree, i, o: run_transpiled(namespace, i, o))):
+        _, seconds = timed(engine_output, run, tree)
+        report(f"loop, {label}", iterations * LOOP_STATEMENTS, "statements", seconds)
+
+    tree = parse_source(fib_program(20))
+    namespace = load(transpile(tree))
+    for label, run in (("AST walk", evaluate), ("bytecode VM", run_vm),
+                       ("python", lambda tree, i, o: run_transpiled(namespace, i, o))):
+        _, seconds = timed(engine_output, run, tree)
+        report(f"fib(20), {label}", 21891, "calls", seconds)
+
+def bench_tiering():
+    print("tiering: executor with hot HOW IZ I functions promoted to Python")
+    failures = differential_check(lambda tree, i, o: compile_program(tree, 1).run(i, o), "threshold 1")
+    print(f"  differential check with threshold 1: {len(failures)} mismatches")
+
+    for label, source, calls in (("fib(22)", fib_program(22), 57313),
+                                 ("loop 100000", loop_program(100000), 100000)):
+        tree = parse_source(source)
+        for threshold in (None, 100):
+            program = compile_program(tree, threshold)
+            _, seconds = timed(run_program, program, "")
+            report(f"{label}, threshold {threshold}", calls, "calls", seconds)
+        for name, stats in program.stats().items():
+            print(f"    {name}: {stats}")
+
+    name, source, input_text = next(program for program in DIFF_PROGRAMS if program[0] == "argument types change")
+    program = compile_program(parse_source(source))
+    run_program(program, input_text)
+    print(f"  {name}: {program.stats()['add']}")
+
+def bench_fold():
+    print("fold: literal decoding and constant folding pass")
+    before = after = 0
+    totals = {"literals": 0, "folded": 0, "eliminated": 0}
+    for source in read_corpus() + [constant_program(1)]:
+        tree = parse_source(source)
+        before += count_nodes(tree)
+        for key, value in fold_constants(tree).items():
+            totals[key] += value
+        after += count_nodes(tree)
+    print(f"  lol_files + constant program: {before} -> {after} nodes, {totals}")
+
+    tree = parse_source(make_source(1))
+    nodes = count_nodes(tree)
+    stats, seconds = timed(fold_constants, tree)
+    report("fold 1 MB program", nodes, "nodes", seconds)
+
+    def folded(run):
+        def run_folded(tree, stdin, stdout):
+            fold_constants(tree)
+            return run(tree, stdin, stdout)
+        return run_folded
+    failures = []
+    for label, run in (("AST walk", evaluate), ("executor", lambda tree, i, o: compile_program(tree).run(i, o)),
+                       ("vm", run_vm), ("python", run_python)):
+        failures += differential_check(folded(run), f"folded {label}")
+    print(f"  differential check on folded trees: {len(failures)} mismatches")
+
+    iterations = 50000
+    for label, run in (("AST walk", evaluate), ("executor", lambda tree, i, o: compile_program(tree).run(i, o))):
+        tree = parse_source(constant_program(iterations))
+        plain, plain_seconds = timed(engine_output, run, tree)
+        fold_constants(tree)
+        output, seconds = timed(engine_output, run, tree)
+        assert output == plain, (output, plain)
+        print(f"  constant loop, {label}: {plain_seconds:.3f}s -> {seconds:.3f}s folded")
+
+def bench_slots():
+    print("slots: variables resolved to frame slots")
+    failures = differential_check(lambda tree, i, o: compile_program(tree).run(i, o), "executor")
+    print(f"  differential check: {len(failures)} mismatches")
+
+    iterations = 100000
+    tree = parse_source(variables_program(iterations))
+    expected, seconds = timed(engine_output, evaluate, tree)
+    report("AST walk (dict frames)", iterations * 6, "statements", seconds)
+    program = compile_program(tree)
+    output, seconds = timed(run_program, program)
+    assert output == expected, (output, expected)
+    report("executor (slot frames)", iterations * 6, "statements", seconds)
+    print(f"  resolve errors: {program.resolution.errors}")
+
+
+def bench_types():
+    print("types: static type inference and typed executor paths")
+    wrong = []
+    known = total = 0
+    for name, tree, input_text in differential_programs():
+        types = infer_types(tree).types
+        known += sum(kind is not None for kind in types.values())
+        total += len(types)
+        wrong += check_types(name, tree, input_text)
+    print(f"  {known}/{total} expressions typed, {len(wrong)} disagree with run time {wrong[:3]}")
+    if wrong:
+        raise Mismatch(f"inferred types disagree with run time: {wrong[:3]}")
+    failures = differential_check(lambda tree, i, o: compile_program(tree).run(i, o), "typed executor")
+    print(f"  differential check: {len(failures)} mismatches")
+
+    iterations = 100000
+    for label, source in (("variables", variables_program(iterations)), ("loop", loop_program(iterations))):
+        tree = parse_source(source)
+        expected, plain_seconds = timed(run_program, compile_program(tree, typed=False))
+        program = compile_program(tree)
+        output, seconds = timed(run_program, program)
+        assert output == expected, (output, expected)
+        print(f"  {label} {iterations}: {plain_seconds:.3f}s -> {seconds:.3f}s typed "
+              f"({program.specialized} expressions specialized)")
+
+def bench_counted():
+    print("counted: UPPIN/NERFIN loops run as native ranges")
+    failures = differential_check(lambda tree, i, o: compile_program(tree).run(i, o), "executor")
+    print(f"  differential check: {len(failures)} mismatches")
+
+    iterations = 100000
+    tree = parse_source(counted_program(iterations))
+    expected = engine_output(evaluate, parse_source(counted_program(1000)), "1000\n")
+    programs = []
+    for counted_loops in (False, True):
+        compiler = ClosureCompiler()
+        compiler.counted_loops = counted_loops
+        program = compiler.compile_program(tree)
+        assert run_program(program, "1000\n") == expected
+        programs.append((compiler.counted, program))
+    (_, generic), (counted, program) = programs
+    plain, plain_seconds = timed(run_program, generic, f"{iterations}\n")
+    output, seconds = timed(run_program, program, f"{iterations}\n")
+    assert output == plain, (output, plain)
+    print(f"  09_loops x {iterations}: {plain_seconds:.3f}s -> {seconds:.3f}s ({counted} counted loops)")
+
+def bench_licm():
+    print("licm: loop-invariant code motion")
+    def hoisted(run):
+        def run_hoisted(tree, stdin, stdout):
+            fold_constants(tree)
+            hoist_invariants(tree)
+            return run(tree, stdin, stdout)
+        return run_hoisted
+    failures = []
+    for label, run in (("AST walk", evaluate), ("executor", lambda tree, i, o: compile_program(tree).run(i, o)),
+                       ("tiered", lambda tree, i, o: compile_program(tree, hot_threshold=1).run(i, o)),
+                       ("vm", run_vm), ("python", run_python)):
+        failures += differential_check(hoisted(run), f"hoisted {label}")
+    print(f"  differential check on hoisted trees: {len(failures)} mismatches")
+
+    iterations = 100000
+    for label, run in (("AST walk", evaluate), ("executor", lambda tree, i, o: compile_program(tree).run(i, o))):
+        tree = parse_source(invariant_program(iterations))
+        plain, plain_seconds = timed(engine_output, run, tree)
+        stats = hoist_invariants(tree)
+        output, seconds = timed(engine_output, run, tree)
+        assert output == plain, (output, plain)
+        print(f"  {label}: {plain_seconds / iterations * 1e6:.2f} -> {seconds / iterations * 1e6:.2f} us/iteration {stats}")
+
+def bench_cse():
+    print("cse: local value numbering")
+    def numbered(run):
+        def run_numbered(tree, stdin, stdout):
+            fold_constants(tree)
+            hoist_invariants(tree)
+            number_values(tree)
+            return run(tree, stdin, stdout)
+        return run_numbered
+    failures = []
+    for label, run in (("AST walk", evaluate), ("executor", lambda tree, i, o: compile_program(tree).run(i, o)),
+                       ("tiered", lambda tree, i, o: compile_program(tree, hot_threshold=1).run(i, o)),
+                       ("vm", run_vm), ("python", run_python)):
+        failures += differential_check(numbered(run), f"numbered {label}")
+    print(f"  differential check on numbered trees: {len(failures)} mismatches")
+
+    iterations = 100000
+    for label, run in (("AST walk", evaluate), ("executor", lambda tree, i, o: compile_program(tree).run(i, o))):
+        tree = parse_source(repeated_program(iterations))
+        plain, plain_seconds = timed(engine_output, run, tree)
+        stats = number_values(tree)
+        output, seconds = timed(engine_output, run, tree)
+        assert output == plain, (output, plain)
+        print(f"  {label}: {plain_seconds / iterations * 1e6:.2f} -> {seconds / iterations * 1e6:.2f} us/iteration {stats}")
+
+def bench_dce():
+    print("dce: dead store and unreachable code elimination")
+    def eliminated(run):
+        def run_eliminated(tree, stdin, stdout):
+            fold_constants(tree)
+            eliminate_dead_code(tree)
+            return run(tree, stdin, stdout)
+        return run_eliminated
+    failures = []
+    for label, run in (("AST walk", evaluate), ("executor", lambda tree, i, o: compile_program(tree).run(i, o)),
+                       ("tiered", lambda tree, i, o: compile_program(tree, hot_threshold=1).run(i, o)),
+                       ("vm", run_vm), ("python", run_python)):
+        failures += differential_check(eliminated(run), f"eliminated {label}")
+    print(f"  differential check on eliminated trees: {len(failures)} mismatches")
+
+    iterations = 50000
+    for label, run in (("AST walk", evaluate), ("executor", lambda tree, i, o: compile_program(tree).run(i, o))):
+        tree = parse_source(dead_program(iterations))
+        fold_constants(tree)
+        nodes = count_nodes(tree)
+        plain, plain_seconds = timed(engine_output, run, tree)
+        warnings = []
+        stats = eliminate_dead_code(tree, warnings)
+        output, seconds = timed(engine_output, run, tree)
+        assert output == plain, (output, plain)
+        print(f"  {label}: {nodes} -> {count_nodes(tree)} nodes, {plain_seconds:.3f}s -> {seconds:.3f}s {stats}")
+    for warning in warnings:
+        print(f"    {warning}")
+
+def bench_visitor():
+    print("visitor: iterative dispatch-table semantic analysis")
+    # Every node entered and left exactly once
+    tree = parse_source(make_source(0.1))
+    counts = {}
+    def count(node, values=None):
+        counts[id(node)] = counts.get(id(node), 0) + 1
+    visitor = Visitor()
+    node_types = {node.node_type for node in iter_nodes(tree)}
+    visitor.pre = dict.fromkeys(node_types, count)
+    visitor.post = dict.fromkeys(node_types, count)
+    visitor.walk(tree)
+    if set(counts.values()) != {2} or len(counts) != count_nodes(tree):
+        raise Mismatch("Visitor.walk did not run each pre and post hook once per node")
+    print(f"  {count_nodes(tree)} nodes, each hook run twice")
+
+    for label, code in nested_sources(100_000):
+        tree = StackTreeParser(TokenStream(code)).parse_program()
+        errors = []
+        _, seconds = timed(SemanticAnalyzer(SymbolTable(), errors).walk, tree)
+        print(f"  depth {tree_depth(tree):>7} {label:<9} {seconds:6.3f}s  {len(errors)} errors")
+
+    tree = parse_source(make_source(8))
+    nodes = count_nodes(tree)
+    errors = []
+    _, seconds = timed(SemanticAnalyzer(SymbolTable(), errors).walk, tree)
+    report("8 MB program", nodes, "nodes", seconds)
+
+def bench_semantic():
+    print("semantic: line checks from the parser's single token stream")
+    # Statements inside OBTW ... TLDR are comments, not lines to check
+    code = "HAI\nWAZZUP\nI HAS A x ITZ 1\nBUHBYE\nOBTW\nx R y\nTLDR\nVISIBLE x\nKTHXBYE\n"
+    errors, symbols = analyze_semantics(code)
+    if errors or symbols != {"x": 1}:
+        raise Mismatch(f"analyze_semantics checked an OBTW body: {errors} {symbols}")
+    print("  OBTW body skipped")
+
+    code = make_source(2, PARSE_CORPUS)
+    lines = code.count("\n")
+    # What the per-line pass used to spend on top of the parse
+    _, relex = timed(lambda: [filter_tokens(tokenize(line)) for line in code.splitlines()])
+    report("re-lex per line (removed)", lines, "lines", relex)
+    (errors, _), seconds = timed(analyze_semantics, code)
+    report(f"analyze ({len(errors)} errors)", lines, "lines", seconds)
+
+def bench_prefix():
+    print("prefix: right-to-left stack evaluation of token expressions")
+    mismatches = prefix_mismatches(2000)
+    for expr, expected, actual, errors in mismatches:
+        print(f"  MISMATCH {expr}: expected {expected!r}, got {actual!r} {errors}")
+    if mismatches:
+        raise Mismatch(f"{len(mismatches)} expressions differ from the AST evaluator")
+    print("  2000 random expressions match the AST evaluator")
+
+    # One pass per expression: time per token stays flat as it grows
+    for depth in (1_000, 10_000, 100_000):
+        tokens = tokenize("SUM OF 1 AN " * depth + "1")
+        _, seconds = timed(evaluate_expression, tokens, SymbolTable(), 1, [])
+        report(f"SUM OF chain x{depth}", len(tokens), "tokens", seconds)
+
+def bench_unit():
+    print("unit: one CompilationUnit shared by every phase of a GUI run")
+    code = make_source(2, PARSE_CORPUS)
+
+    # The GUI used to lex and parse, then hand the code to the semantic pass
+    def separate():
+        tokens = tokenize(code)
+        TreeParser(filter_tokens(tokens)).parse_program()
+        return analyze_semantics_from_code(code, [])
+    expected, seconds = timed(separate)
+    report("separate phases", len(code), "bytes", seconds)
+
+    unit = CompilationUnit(code)
+    builds = []
+    def stage(name, build, stage=unit.stage):
+        if name not in unit.stages:
+            builds.append(name)
+        return stage(name, build)
+    unit.stage = stage
+    def shared():
+        unit.update(code)
+        unit.tokens
+        unit.syntax_errors
+        return analyze_unit(unit, [])
+    actual, seconds = timed(shared)
+    report("shared unit", len(code), "bytes", seconds)
+    _, seconds = timed(shared)
+    report("shared unit, same source", len(code), "bytes", seconds)
+    if actual != expected:
+        raise Mismatch("shared CompilationUnit gives different semantic results")
+    print(f"  same results, stages built: {', '.join(builds)}")
+
+
+BENCHMARKS = {
+    "lexer": bench_lexer,
+    "streaming": bench_streaming,
+    "mmap": bench_mmap,
+    "tokenstream": bench_tokenstream,
+    "parser": bench_parser,
+    "expr": bench_expr,
+    "deep": bench_deep,
+    "ast": bench_ast,
+    "pretty": bench_pretty,
+    "executor": bench_executor,
+    "vm": bench_vm,
+    "transpiler": bench_transpiler,
+    "tiering": bench_tiering,
+    "fold": bench_fold,
+    "slots": bench_slots,
+    "types": bench_types,
+    "counted": bench_counted,
+    "licm": bench_licm,
+    "cse": bench_cse,
+    "dce": bench_dce,
+    "visitor": bench_visitor,
+    "semantic": bench_semantic,
+    "prefix": bench_prefix,
+    "unit": bench_unit,
+}
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            return 1
+        try:
+            BENCHMARKS[name]()
+        except Mismatch as e:
+            print(f"FAILED {name}: {e}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
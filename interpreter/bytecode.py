@@ -0,0 +1,488 @@
+'''
+Bytecode compiler for TreeParser ASTs.
+
+A program is lowered to one flat array('i') of (opcode, argument) pairs:
+the main program first, ending in HALT, then each HOW IZ I body. Jump
+arguments are code offsets; other arguments index the constant, name or
+function tables. vm.py runs the result.
+'''
+
+from array import array
+
+from runtime import CONSTANT_TYPES, node_constant, BINARY_OPS, VARIADIC_OPS
+
+# -------------------------
+# Opcodes
+# -------------------------
+OPCODES = [
+    "CONST",            # push consts[arg]
+    "LOAD",             # push variable names[arg]
+    "STORE",            # pop into a declared variable names[arg]
+    "DECLARE",          # pop into names[arg], declaring it if needed
+    "POP",
+    "DUP",
+    "ADD", "SUB", "MUL",    # SUM/DIFF/PRODUKT OF with a native fast path
+    "BINARY",           # pop b, a; push BINARY_FUNCS[arg](a, b)
+    "VARIADIC",         # consts[arg] is (function, argc)
+    "NOT",
+    "CAST",             # cast top of stack to the type consts[arg]
+    "PRINT",            # pop arg values and VISIBLE them
+    "READ",             # GIMMEH names[arg]; also pushes the line read
+    "JUMP",
+    "JUMP_IF_FALSE",    # pop; jump if false
+    "JUMP_IF_TRUE",     # pop; jump if true
+    "INIT_COUNTER",     # set names[arg] to 0 unless declared
+    "INC", "DEC",       # loop variable names[arg] +/- 1
+    "CALL",             # call functions[arg] with its arguments on the stack
+    "RETURN",           # pop the return value and go back to the caller
+    "SETUP_EXCEPT",     # PLZ: on LOLError, jump to arg
+    "POP_EXCEPT",
+    "ERROR",            # raise LOLError(consts[arg])
+    "HALT",
+]
+OP = type("OP", (), {name: code for code, name in enumerate(OPCODES)})
+
+JUMP_OPS = frozenset((OP.JUMP, OP.JUMP_IF_FALSE, OP.JUMP_IF_TRUE, OP.SETUP_EXCEPT))
+NAME_OPS = frozenset((OP.LOAD, OP.STORE, OP.DECLARE, OP.READ, OP.INIT_COUNTER, OP.INC, OP.DEC))
+CONST_OPS = frozenset((OP.CONST, OP.VARIADIC, OP.CAST, OP.ERROR))
+
+BINARY_NAMES = list(BINARY_OPS)
+BINARY_FUNCS = [BINARY_OPS[name] for name in BINARY_NAMES]
+BINARY_CODES = {name: i for i, name in enumerate(BINARY_NAMES)}
+NATIVE_OPS = {"SUM OF": OP.ADD, "DIFF OF": OP.SUB, "PRODUKT OF": OP.MUL}
+
+LOOP_PARTS = frozenset(("IMINYR", "LOOP_NAME", "DIRECTION", "BLOCK", "LOOP_END"))
+
+
+class FunctionInfo:
+    def __init__(self, name, params):
+        self.name = name
+        self.params = params
+        self.entry = None       # code offset of the body
+
+class Bytecode:
+    def __init__(self, code, lines, consts, names, functions):
+        self.code = code            # array('i') of opcode, argument pairs
+        self.lines = lines          # source line per instruction (0 if unknown)
+        self.consts = consts
+        self.names = names
+        self.functions = functions  # list of FunctionInfo
+
+
+# -------------------------
+# Compiler
+# -------------------------
+class BytecodeCompiler:
+    def __init__(self):
+        self.code = array("i")
+        self.lines = array("i")
+        self.consts = []
+        self.const_codes = {}
+        self.names = []
+        self.name_codes = {}
+        self.functions = []
+        self.function_codes = {}
+        self.line = 0
+        # Per enclosing loop/switch: (jumps to patch to its end, try depth)
+        self.break_targets = []
+        self.try_depth = 0
+        self.in_function = False
+
+        self.expr_compilers = {
+            "LITERAL": self.compile_literal,
+            "IDENTIFIER": self.compile_identifier,
+            "OP": self.compile_operator,
+            "COMPARISON": self.compile_operator,
+            "LOGICAL": self.compile_operator,
+            "SMOOSH": self.compile_operator,
+            "NOT": self.compile_not,
+            "TYPECAST": self.compile_typecast,
+            "FUNC_CALL": self.compile_call,
+            "INPUT": self.compile_read,
+        }
+        self.expr_compilers.update(dict.fromkeys(CONSTANT_TYPES, self.compile_literal))
+        self.statement_compilers = {
+            "PRINT": self.compile_print,
+            "VAR_DEC": self.compile_declaration,
+            "ASSIGN": self.compile_assignment,
+            "EXPR_STMT": self.compile_expr_stmt,
+            "FUNC_CALL": self.compile_call_stmt,
+            "INPUT": self.compile_input,
+            "IF": self.compile_conditional,
+            "SWITCH": self.compile_switch,
+            "LOOP": self.compile_loop,
+            "RETURN": self.compile_return,
+            "EXIT": self.compile_exit,
+            "EXCEPTION": self.compile_exception_handling,
+            "FUNC_DEF": lambda node: None,      # hoisted
+        }
+
+    def compile_program(self, tree):
+        definitions = []
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            if node.node_type == "FUNC_DEF":
+                definitions.append(node)
+            pending.extend(reversed(node.children))
+        for node in definitions:
+            name = node.children[1].value
+            self.function_codes[name] = len(self.functions)
+            self.functions.append(FunctionInfo(name, [param.value for param in node.children[2].children]))
+
+        for node in tree.children:
+            if node.node_type == "STMT_LIST":
+                self.compile_statements(node)
+        self.emit(OP.HALT)
+
+        for node in definitions:
+            self.functions[self.function_codes[node.children[1].value]].entry = len(self.code)
+            self.break_targets, self.try_depth, self.in_function = [], 0, True
+            self.compile_block(node.children[3])
+            # Falling off the end returns IT
+            self.emit(OP.LOAD, self.name("IT"))
+            self.emit(OP.RETURN)
+
+        return Bytecode(self.code, self.lines, self.consts, self.names, self.functions)
+
+    # -------------------------
+    # Emitting
+    # -------------------------
+    def emit(self, op, arg=0):
+        self.code.append(op)
+        self.code.append(arg)
+        self.lines.append(self.line)
+        return len(self.code) - 2
+
+    # Point the jump at `position` to `target` (default: the next instruction)
+    def patch(self, position, target=None):
+        self.code[position + 1] = len(self.code) if target is None else target
+
+    def const(self, value):
+        key = (type(value), value)
+        code = self.const_codes.get(key)
+        if code is None:
+            code = self.const_codes[key] = len(self.consts)
+            self.consts.append(value)
+        return code
+
+    def name(self, name):
+        code = self.name_codes.get(name)
+        if code is None:
+            code = self.name_codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def error(self, message):
+        self.emit(OP.ERROR, len(self.consts))
+        self.consts.append(message)
+
+    # Statement nodes often carry no line; use the first descendant's
+    def set_line(self, node):
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if node.line is not None:
+                self.line = node.line
+                return
+            pending.extend(reversed(node.children))
+
+    # -------------------------
+    # Statements
+    # -------------------------
+    def compile_statements(self, stmt_list):
+        for node in stmt_list.children:
+            self.set_line(node)
+            compiler = self.statement_compilers.get(node.node_type)
+            if compiler is None:
+                self.error(f"Line {node.line}: cannot run {node.node_type} {node.value}")
+            else:
+                compiler(node)
+
+    def compile_block(self, node):
+        self.compile_statements(node.children[0])
+
+    def compile_print(self, node):
+        items = node.children[1].children
+        for expr in items:
+            self.compile_expr(expr)
+        self.emit(OP.PRINT, len(items))
+
+    def compile_declaration(self, node):
+        if len(node.children) > 1:
+            self.compile_expr(node.children[1])
+        else:
+            self.emit(OP.CONST, self.const(None))
+        self.emit(OP.DECLARE, self.name(node.children[0].value))
+
+    def compile_assignment(self, node):
+        self.compile_expr(node.children[1])
+        self.set_line(node.children[0])
+        self.emit(OP.STORE, self.name(node.children[0].value))
+
+    def compile_expr_stmt(self, node):
+        expr = node.children[0]
+        if expr.node_type == "TYPECAST" and expr.children[0].node_type == "VAR":
+            name = self.name(expr.children[0].value)
+            self.emit(OP.LOAD, name)
+            self.emit(OP.CAST, self.const(expr.children[1].value))
+            self.emit(OP.DECLARE, name)
+            return
+        self.compile_expr(expr)
+        self.emit(OP.DECLARE, self.name("IT"))
+
+    def compile_call_stmt(self, node):
+        self.compile_call(node)
+        self.emit(OP.DECLARE, self.name("IT"))
+
+    def compile_input(self, node):
+        self.compile_read(node)
+        self.emit(OP.POP)
+
+    # O RLY? on IT
+    def compile_conditional(self, node):
+        ends = []
+        self.emit(OP.LOAD, self.name("IT"))
+        for child in node.children[1:]:
+            t = child.node_type
+            if t == "YA_RLY":
+                skip = self.emit(OP.JUMP_IF_FALSE)
+                self.compile_block(child.children[0])
+                ends.append(self.emit(OP.JUMP))
+                self.patch(skip)
+            elif t == "MEBBE":
+                self.compile_expr(child.children[0])
+                skip = self.emit(OP.JUMP_IF_FALSE)
+                self.compile_block(child.children[1])
+                ends.append(self.emit(OP.JUMP))
+                self.patch(skip)
+            elif t == "NO_WAI":
+                self.compile_block(child.children[0])
+        for jump in ends:
+            self.patch(jump)
+
+    # Cases are tested in order, then their blocks are laid out one after
+    # another so execution falls through until GTFO jumps to the end
+    def compile_switch(self, node):
+        it = self.name("IT")
+        saem = BINARY_CODES["BOTH SAEM"]
+        self.compile_expr(node.children[0])
+        self.emit(OP.DECLARE, it)
+
+        case_jumps = []
+        for child in node.children[1:]:
+            if child.node_type == "CASE":
+                self.emit(OP.LOAD, it)
+                self.emit(OP.CONST, self.const(node_constant(child.children[0])))
+                self.emit(OP.BINARY, saem)
+                case_jumps.append(self.emit(OP.JUMP_IF_TRUE))
+        no_match = self.emit(OP.JUMP)
+
+        breaks = []
+        self.break_targets.append((breaks, self.try_depth))
+        case_jumps = iter(case_jumps)
+        for child in node.children[1:]:
+            if child.node_type == "CASE":
+                self.patch(next(case_jumps))
+                self.compile_block(child.children[1])
+            elif child.node_type == "DEFAULT":
+                self.patch(no_match)
+                no_match = None
+                self.compile_block(child.children[0])
+        self.break_targets.pop()
+
+        if no_match is not None:
+            self.patch(no_match)
+        for jump in breaks:
+            self.patch(jump)
+
+    def compile_loop(self, node):
+        var = None
+        step = None
+        condition = None
+        body = None
+        for child in node.children:
+            if child.node_type == "DIRECTION":
+                step = OP.INC if child.children[0].value == "UPPIN" else OP.DEC
+                var = self.name(child.children[1].value)
+            elif child.node_type == "BLOCK":
+                body = child
+            elif child.node_type not in LOOP_PARTS:
+                condition = child
+
+        if var is not None:
+            self.emit(OP.INIT_COUNTER, var)
+        top = len(self.code)
+        exit_jump = None
+        if condition is not None:
+            if condition.node_type == "WILE":
+                self.compile_expr(condition.children[0])
+                exit_jump = self.emit(OP.JUMP_IF_FALSE)
+            else:
+                self.compile_expr(condition)
+                exit_jump = self.emit(OP.JUMP_IF_TRUE)
+
+        breaks = []
+        self.break_targets.append((breaks, self.try_depth))
+        self.compile_block(body)
+        self.break_targets.pop()
+
+        if var is not None:
+            self.emit(step, var)
+        self.emit(OP.JUMP, top)
+        if exit_jump is not None:
+            self.patch(exit_jump)
+        for jump in breaks:
+            self.patch(jump)
+
+    def compile_return(self, node):
+        self.compile_expr(node.children[-1])
+        for _ in range(self.try_depth):
+            self.emit(OP.POP_EXCEPT)
+        self.emit(OP.RETURN)
+
+    # GTFO leaves the innermost loop or switch; in a function body it
+    # returns NOOB, at the top level it ends the program
+    def compile_exit(self, node):
+        if self.break_targets:
+            breaks, depth = self.break_targets[-1]
+            for _ in range(self.try_depth - depth):
+                self.emit(OP.POP_EXCEPT)
+            breaks.append(self.emit(OP.JUMP))
+        elif self.in_function:
+            self.emit(OP.CONST, self.const(None))
+            for _ in range(self.try_depth):
+                self.emit(OP.POP_EXCEPT)
+            self.emit(OP.RETURN)
+        else:
+            self.emit(OP.HALT)
+
+    def compile_exception_handling(self, node):
+        handler = self.emit(OP.SETUP_EXCEPT)
+        self.try_depth += 1
+        for child in node.children:
+            if child.node_type == "SUCCESS":
+                self.compile_block(child.children[0])
+        self.try_depth -= 1
+        self.emit(OP.POP_EXCEPT)
+        end = self.emit(OP.JUMP)
+        self.patch(handler)
+        for child in node.children:
+            if child.node_type == "FAIL":
+                self.compile_block(child.children[0])
+        self.patch(end)
+
+    # -------------------------
+    # Expressions
+    # -------------------------
+    def compile_expr(self, node):
+        compiler = self.expr_compilers.get(node.node_type)
+        if compiler is None:
+            self.error(f"Line {node.line}: cannot run {node.node_type} {node.value}")
+        else:
+            compiler(node)
+
+    def compile_literal(self, node):
+        self.emit(OP.CONST, self.const(node_constant(node)))
+
+    def compile_identifier(self, node):
+        self.set_line(node)
+        self.emit(OP.LOAD, self.name(node.value))
+
+    def compile_operator(self, node):
+        for child in node.children:
+            self.compile_expr(child)
+        op = node.value
+        if op in BINARY_CODES:
+            if len(node.children) != 2:
+                self.error(f"Line {node.line}: cannot run {node.node_type} {op}")
+            elif op in NATIVE_OPS:
+                self.emit(NATIVE_OPS[op])
+            else:
+                self.emit(OP.BINARY, BINARY_CODES[op])
+        else:
+            self.emit(OP.VARIADIC, len(self.consts))
+            self.consts.append((VARIADIC_OPS[op], len(node.children)))
+
+    def compile_not(self, node):
+        self.compile_expr(node.children[0])
+        self.emit(OP.NOT)
+
+    def compile_typecast(self, node):
+        type_literal = self.const(node.children[-1].value)
+        if node.children[0].node_type == "VAR":
+            name = self.name(node.children[0].value)
+            self.emit(OP.LOAD, name)
+            self.emit(OP.CAST, type_literal)
+            self.emit(OP.DUP)
+            self.emit(OP.DECLARE, name)
+        else:
+            self.compile_expr(node.children[1])
+            self.emit(OP.CAST, type_literal)
+
+    def compile_call(self, node):
+        name = node.children[1].value
+        args = node.children[2].children
+        for arg in args:
+            self.compile_expr(arg.children[0])
+        self.set_line(node)
+        index = self.function_codes.get(name)
+        if index is None:
+            self.error(f"Line {node.line}: Unknown function '{name}'")
+            return
+        params = self.functions[index].params
+        if len(args) != len(params):
+            self.error(f"Function '{name}' takes {len(params)} arguments, got {len(args)}")
+            return
+        self.emit(OP.CALL, index)
+
+    def compile_read(self, node):
+        self.set_line(node.children[1])
+        self.emit(OP.READ, self.name(node.children[1].value))
+
+
+def compile_bytecode(tree):
+    return BytecodeCompiler().compile_program(tree)
+
+
+# -------------------------
+# Disassembler
+# -------------------------
+def disassemble(program):
+    '''Human-readable listing of a Bytecode program, one instruction per line.'''
+    entries = {function.entry: function for function in program.functions}
+    targets = set(program.code[i + 1] for i in range(0, len(program.code), 2)
+                  if program.code[i] in JUMP_OPS)
+    out = []
+    last_line = None
+    for i in range(0, len(program.code), 2):
+        op, arg = program.code[i], program.code[i + 1]
+        if i in entries:
+            function = entries[i]
+            out.append(f"\nHOW IZ I {function.name} ({', '.join(function.params)}):")
+            last_line = None
+        line = program.lines[i // 2]
+        line_text = f"{line:>4}" if line != last_line else "    "
+        last_line = line
+        marker = ">>" if i in targets else "  "
+        text = f"{line_text} {marker} {i:>5} {OPCODES[op]:<14}"
+
+        if op in JUMP_OPS:
+            text += f"{arg:<6} (to {arg})"
+        elif op in NAME_OPS:
+            text += f"{arg:<6} ({program.names[arg]})"
+        elif op in CONST_OPS:
+            value = program.consts[arg]
+            if op == OP.VARIADIC:
+                value = f"{value[0].__name__}, {value[1]} args"
+            else:
+                value = repr(value)
+            text += f"{arg:<6} ({value})"
+        elif op == OP.BINARY:
+            text += f"{arg:<6} ({BINARY_NAMES[arg]})"
+        elif op == OP.CALL:
+            text += f"{arg:<6} ({program.functions[arg].name})"
+        elif op == OP.PRINT:
+            text += f"{arg}"
+        out.append(text.rstrip())
+    return "\n".join(out)
@@ -0,0 +1,106 @@
+'''
+One version of a LOLCODE source and everything derived from it.
+
+A CompilationUnit computes each stage (tokens, parser tokens, AST,
+optimized AST, semantic results) the first time it is asked for and
+keeps it, so the GUI, main and the semantic layer can share one unit
+and no phase runs twice for the same source. update() starts over
+when the source changes. A unit made with from_file() never reads the
+whole file: its tokens are streamed from disk with lexer.iter_tokens.
+'''
+
+from lexer import tokenize, iter_tokens, filter_tokens
+from tree_parser import TreeParser, ParserError
+from tree_node import clone_tree
+from optimizer import fold_constants, eliminate_dead_code
+
+
+class CompilationUnit:
+    def __init__(self, source, path=None):
+        self.source = source
+        self.path = path
+        self.stages = {}            # stage name -> memoized result
+
+    @classmethod
+    def from_file(cls, path):
+        '''Unit over a file on disk; `source` stays None until update().'''
+        return cls(None, path)
+
+    def update(self, source):
+        '''Switch to a new source version, dropping stages only if it changed.'''
+        if source != self.source:
+            self.source = source
+            self.stages.clear()
+        return self
+
+    # Result of stage `name`, running `build` only the first time
+    def stage(self, name, build):
+        try:
+            return self.stages[name]
+        except KeyError:
+            result = self.stages[name] = build()
+            return result
+
+    # -------------------------
+    # Stages
+    # -------------------------
+    @property
+    def tokens(self):
+        '''All tokens, comments included.'''
+        if self.source is None:
+            return self.stage("tokens", lambda: list(self.stream_tokens()))
+        return self.stage("tokens", lambda: tokenize(self.source))
+
+    @property
+    def parser_tokens(self):
+        return self.stage("parser_tokens", lambda: filter_tokens(self.tokens))
+
+    @property
+    def tree(self):
+        '''AST as parsed (None if the parser gave up).'''
+        return self.stage("parse", self.parse)[0]
+
+    @property
+    def syntax_errors(self):
+        return self.stage("parse", self.parse)[1]
+
+    @property
+    def optimized(self):
+        '''Folded copy of the AST with dead code removed; `tree` is left as parsed.'''
+        return self.stage("optimize", self.optimize)[0]
+
+    @property
+    def warnings(self):
+        return self.stage("optimize", self.optimize)[1]
+
+    # Tokens one at a time: a file that has not been lexed yet is scanned
+    # lazily from disk and nothing is kept
+    def streaming(self):
+        return self.source is None and "tokens" not in self.stages
+
+    def stream_tokens(self):
+        if not self.streaming():
+            yield from self.tokens
+            return
+        with open(self.path, "r") as f:
+            yield from iter_tokens(f)
+
+    def parse(self):
+        if self.streaming():
+            parser = TreeParser(self.stream_tokens())
+        else:
+            parser = TreeParser(self.parser_tokens)
+        try:
+            tree = parser.parse_program()
+        except ParserError as e:
+            return None, [str(e)]
+        return tree, parser.errors
+
+    def optimize(self):
+        warnings = []
+        if self.tree is None:
+            return None, warnings
+        tree = clone_tree(self.tree)
+        fold_constants(tree)
+        eliminate_dead_code(tree, warnings)
+        return tree, warnings
@@ -0,0 +1,473 @@
+'''
+Programs and checks shared by test_correctness.py and benchmark.py: the
+corpus and synthetic programs, the engines' differential check against
+the reference AST evaluator, and the analysis cross-checks. A failed
+check raises Mismatch.
+'''
+
+import io
+import glob
+import os
+import random
+
+from lexer import tokenize
+from tree_parser import TreeParser
+from evaluator import evaluate, ASTEvaluator
+from bytecode import compile_bytecode
+from vm import run_bytecode
+from transpiler import transpile, load, run_transpiled
+from runtime import LOLError, type_name
+from inference import infer_types
+from semantic_analyzer import analyze_semantics
+
+LOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lol_files")
+
+
+# -------------------------
+# Programs
+# -------------------------
+def corpus_files(names=None):
+    paths = sorted(glob.glob(os.path.join(LOL_DIR, "*.lol")))
+    if names is not None:
+        paths = [path for path in paths if os.path.basename(path) in names]
+    return paths
+
+def read_corpus(names=None):
+    sources = []
+    for path in corpus_files(names):
+        with open(path, "r") as f:
+            sources.append(f.read())
+    return sources
+
+# Synthetic loop program: every iteration runs LOOP_STATEMENTS statements
+# (including the one in the function body)
+LOOP_STATEMENTS = 6
+
+def loop_program(iterations):
+    return f"""HAI
+HOW IZ I twice YR x
+    FOUND YR PRODUKT OF x AN 2
+IF U SAY SO
+WAZZUP
+I HAS A total ITZ 0
+I HAS A i ITZ 0
+BUHBYE
+IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN {iterations}
+    total R SUM OF total AN i
+    total R MOD OF total AN 1000
+    I IZ twice YR i MKAY
+    BOTH SAEM IT AN 1
+    O RLY?
+        YA RLY
+            VISIBLE "never"
+    OIC
+IM OUTTA YR loop
+VISIBLE total
+KTHXBYE
+"""
+
+# Doubly recursive HOW IZ I: fib(n) calls
+def fib_program(n):
+    return f"""HAI
+HOW IZ I fib YR n
+    BOTH SAEM n AN SMALLR OF n AN 1
+    O RLY?
+        YA RLY
+            FOUND YR n
+    OIC
+    FOUND YR SUM OF I IZ fib YR DIFF OF n AN 1 MKAY AN I IZ fib YR DIFF OF n AN 2 MKAY
+IF U SAY SO
+VISIBLE I IZ fib YR {n} MKAY
+KTHXBYE
+"""
+
+# lol_files/09_loops.lol scaled up: counting up to a GIMMEH'd bound and
+# back down, plus a nested counted loop
+def counted_program(iterations):
+    return f"""HAI
+WAZZUP
+I HAS A num1
+I HAS A num2
+I HAS A total ITZ 0
+I HAS A j
+BUHBYE
+GIMMEH num1
+num2 R 0
+IM IN YR asc UPPIN YR num2 WILE BOTH SAEM num2 AN SMALLR OF num2 AN num1
+    total R MOD OF SUM OF total AN num2 AN 1000
+IM OUTTA YR asc
+IM IN YR desc NERFIN YR num2 TIL BOTH SAEM num2 AN 0
+    j R 0
+    IM IN YR inner UPPIN YR j TIL BOTH SAEM j AN 3
+        total R DIFF OF total AN j
+    IM OUTTA YR inner
+IM OUTTA YR desc
+VISIBLE total " " num2 " " j
+KTHXBYE
+"""
+
+# (label, source) of programs nested `depth` levels deep
+def nested_sources(depth):
+    yield "NOT", "HAI\nVISIBLE " + "NOT " * depth + "WIN\nKTHXBYE\n"
+    yield "SUM OF", "HAI\nVISIBLE " + "SUM OF " * depth + "1" + " AN 1" * depth + "\nKTHXBYE\n"
+    yield "MAEK", "HAI\nVISIBLE " + "MAEK " * depth + "1" + " A YARN" * depth + "\nKTHXBYE\n"
+    yield "O RLY?", "HAI\n" + "WIN\nO RLY?\nYA RLY\n" * depth + "VISIBLE 1\n" + "OIC\n" * depth + "KTHXBYE\n"
+    yield "IM IN YR", "HAI\n" + "IM IN YR l\n" * depth + "GTFO\n" + "IM OUTTA YR l\n" * depth + "KTHXBYE\n"
+
+# Small programs exercising one construct each, for differential checks
+# between the engines: (name, source, input)
+DIFF_PROGRAMS = [
+    ("switch fall-through", """HAI
+WAZZUP
+I HAS A n ITZ 2
+BUHBYE
+n WTF?
+OMG 1
+    VISIBLE "one"
+OMG 2
+    VISIBLE "two"
+OMG 3
+    VISIBLE "three"
+    GTFO
+OMG 4
+    VISIBLE "four"
+OMGWTF
+    VISIBLE "other"
+OIC
+SUM OF n AN 10
+WTF?
+OMG 5
+    VISIBLE "five"
+OMGWTF
+    VISIBLE "default " IT
+OIC
+KTHXBYE
+""", ""),
+    ("nested loops and GTFO", """HAI
+WAZZUP
+I HAS A total ITZ 0
+I HAS A j ITZ 0
+BUHBYE
+IM IN YR outer UPPIN YR i TIL BOTH SAEM i AN 5
+    j R 0
+    IM IN YR inner NERFIN YR j WILE DIFFRINT j AN -10
+        BOTH SAEM j AN -3
+        O RLY?
+            YA RLY
+                GTFO
+        OIC
+        total R SUM OF total AN PRODUKT OF i AN j
+    IM OUTTA YR inner
+    VISIBLE i " " total
+IM OUTTA YR outer
+KTHXBYE
+""", ""),
+    ("casts and yarns", """HAI
+WAZZUP
+I HAS A x ITZ "12"
+I HAS A y ITZ 2.5
+I HAS A z
+BUHBYE
+VISIBLE SUM OF x AN y
+VISIBLE QUOSHUNT OF -7 AN 2 " " MOD OF -7 AN 2 " " QUOSHUNT OF 7.0 AN 2
+VISIBLE MAEK y A NUMBR " " MAEK z A YARN "|" MAEK "3.75" A NUMBAR
+x IS NOW A NUMBR
+VISIBLE SUM OF x AN 1
+VISIBLE SMOOSH "a:)b" AN 1.005 AN WIN AN z MKAY
+VISIBLE BOTH SAEM "1" AN 1 " " BOTH SAEM 1 AN 1.0 " " DIFFRINT FAIL AN 0
+VISIBLE ALL OF WIN AN 1 AN "x" MKAY " " ANY OF FAIL AN 0 AN "" MKAY " " NOT z
+VISIBLE BIGGR OF 3 AN "4.5" " " SMALLR OF 3 AN WIN
+KTHXBYE
+""", ""),
+    ("functions", """HAI
+HOW IZ I early YR n
+    BOTH SAEM n AN 0
+    O RLY?
+        YA RLY
+            GTFO
+    OIC
+    SUM OF n AN 100
+IF U SAY SO
+HOW IZ I greet YR who AN YR times
+    IM IN YR loop UPPIN YR k TIL BOTH SAEM k AN times
+        VISIBLE "hi " who
+    IM OUTTA YR loop
+    FOUND YR SMOOSH "done " AN k MKAY
+IF U SAY SO
+VISIBLE I IZ early YR 0 MKAY
+VISIBLE I IZ early YR 5 MKAY
+I IZ greet YR "bob" AN YR 2 MKAY
+VISIBLE IT
+KTHXBYE
+""", ""),
+    ("conditionals", """HAI
+WAZZUP
+I HAS A n
+BUHBYE
+GIMMEH n
+n IS NOW A NUMBR
+IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN 4
+    BOTH SAEM i AN n
+    O RLY?
+        YA RLY
+            VISIBLE i " is n"
+        MEBBE BOTH SAEM i AN 0
+            VISIBLE "zero"
+        MEBBE BIGGR OF i AN 2
+            VISIBLE i " big"
+        NO WAI
+            VISIBLE "else"
+    OIC
+IM OUTTA YR loop
+KTHXBYE
+""", "2\n"),
+    ("argument types change", """HAI
+HOW IZ I add YR a AN YR b
+    FOUND YR SUM OF a AN b
+IF U SAY SO
+WAZZUP
+I HAS A total ITZ 0
+BUHBYE
+IM IN YR loop UPPIN YR i TIL BOTH SAEM i AN 150
+    total R I IZ add YR total AN YR i MKAY
+IM OUTTA YR loop
+VISIBLE total
+VISIBLE I IZ add YR "1.5" AN YR 2 MKAY
+VISIBLE I IZ add YR 1.25 AN YR WIN MKAY
+VISIBLE I IZ add YR total AN YR 1 MKAY
+KTHXBYE
+""", ""),
+    ("PLZ and errors", """HAI
+WAZZUP
+I HAS A x ITZ 1
+BUHBYE
+PLZ
+AWSUM THX
+    VISIBLE "before"
+    x R QUOSHUNT OF x AN 0
+    VISIBLE "after"
+O NOES
+    VISIBLE "caught"
+KTHX
+PLZ
+AWSUM THX
+    VISIBLE SUM OF "abc" AN 1
+O NOES
+    VISIBLE "bad yarn"
+KTHX
+VISIBLE x
+VISIBLE SUM OF nope AN 1
+KTHXBYE
+""", ""),
+    # UPPIN / NERFIN edge cases for counted loops
+    ("counted YARN, NUMBAR and TROOF counters", """HAI
+WAZZUP
+I HAS A y ITZ "2"
+I HAS A f ITZ 0.5
+I HAS A t ITZ WIN
+BUHBYE
+IM IN YR yarn UPPIN YR y TIL BOTH SAEM y AN 5
+    VISIBLE y
+IM OUTTA YR yarn
+IM IN YR numbar UPPIN YR f WILE BOTH SAEM f AN SMALLR OF f AN 3
+    VISIBLE f
+IM OUTTA YR numbar
+IM IN YR troof UPPIN YR t TIL BOTH SAEM 4 AN t
+    VISIBLE t
+IM OUTTA YR troof
+VISIBLE y " " f " " t
+KTHXBYE
+""", ""),
+    ("counted reversed operands and NERFIN", """HAI
+WAZZUP
+I HAS A n ITZ 4
+BUHBYE
+IM IN YR up UPPIN YR i WILE BOTH SAEM SMALLR OF n AN i AN i
+    VISIBLE i
+IM OUTTA YR up
+IM IN YR down NERFIN YR j WILE DIFFRINT -3 AN j
+    VISIBLE j
+IM OUTTA YR down
+IM IN YR big NERFIN YR j WILE BOTH SAEM BIGGR OF j AN -6 AN j
+    VISIBLE j
+IM OUTTA YR big
+VISIBLE i " " j
+KTHXBYE
+""", ""),
+    ("counted bound never reached", """HAI
+WAZZUP
+I HAS A i ITZ 10
+BUHBYE
+IM IN YR past UPPIN YR i TIL BOTH SAEM i AN 5
+    VISIBLE i
+    BOTH SAEM i AN 14
+    O RLY?
+        YA RLY
+            GTFO
+    OIC
+IM OUTTA YR past
+VISIBLE i
+KTHXBYE
+""", ""),
+    ("counted bound is the counter", """HAI
+IM IN YR l UPPIN YR i WILE BOTH SAEM i AN SMALLR OF i AN i
+    VISIBLE i
+    BOTH SAEM i AN 3
+    O RLY?
+        YA RLY
+            GTFO
+    OIC
+IM OUTTA YR l
+IM IN YR m NERFIN YR k WILE BOTH SAEM k AN BIGGR OF k AN k
+    VISIBLE k
+    BOTH SAEM k AN -2
+    O RLY?
+        YA RLY
+            GTFO
+    OIC
+IM OUTTA YR m
+IM IN YR e UPPIN YR e TIL BOTH SAEM e AN e
+    VISIBLE "never"
+IM OUTTA YR e
+VISIBLE i " " k " " e
+KTHXBYE
+""", ""),
+]
+
+
+# -------------------------
+# Running engines
+# -------------------------
+# Lines fed to GIMMEH when running corpus programs
+CORPUS_INPUT = "3\n4\n5\n6\n7\n"
+
+def parse_source(source):
+    parser = TreeParser(tokenize(source))
+    tree = parser.parse_program()
+    if parser.errors:
+        raise ValueError(f"syntax errors: {parser.errors}")
+    return tree
+
+# Run a compiled program on canned input; returns its output text
+def run_program(program, input_text=CORPUS_INPUT):
+    out = io.StringIO()
+    program.run(io.StringIO(input_text), out)
+    return out.getvalue()
+
+# Run an engine's `run(tree, stdin, stdout)` on canned input; returns its output
+def engine_output(run, tree, input_text=CORPUS_INPUT):
+    out = io.StringIO()
+    run(tree, io.StringIO(input_text), out)
+    return out.getvalue()
+
+def run_vm(tree, stdin=None, stdout=None):
+    return run_bytecode(compile_bytecode(tree), stdin, stdout)
+
+def run_python(tree, stdin=None, stdout=None):
+    return run_transpiled(load(transpile(tree)), stdin, stdout)
+
+# (output, whether a LOLError ended the run)
+def engine_outcome(run, tree, input_text=CORPUS_INPUT):
+    out = io.StringIO()
+    try:
+        run(tree, io.StringIO(input_text), out)
+    except LOLError:
+        return out.getvalue(), True
+    return out.getvalue(), False
+
+
+# -------------------------
+# Checks
+# -------------------------
+# Programs for differential checks: the corpus, DIFF_PROGRAMS and the
+# synthetic benchmarks, as (name, tree, input)
+def differential_programs():
+    programs = [(os.path.basename(path), parse_source(source), CORPUS_INPUT)
+                for path, source in zip(corpus_files(), read_corpus())]
+    programs += [(name, parse_source(source), input_text) for name, source, input_text in DIFF_PROGRAMS]
+    programs.append(("loop", parse_source(loop_program(100)), ""))
+    programs.append(("fib", parse_source(fib_program(10)), ""))
+    return programs
+
+# A correctness check failed
+class Mismatch(AssertionError):
+    pass
+
+# Compare an engine against the reference evaluator; raises Mismatch
+# naming every program it gets wrong, else returns []
+def differential_check(run, label):
+    failures = []
+    for name, tree, input_text in differential_programs():
+        expected = engine_outcome(evaluate, tree, input_text)
+        actual = engine_outcome(run, tree, input_text)
+        if actual != expected:
+            failures.append(name)
+            print(f"  MISMATCH {label} on {name}:\n    expected {expected!r}\n    got      {actual!r}")
+    if failures:
+        raise Mismatch(f"{label} differs from the AST walk on: {', '.join(failures)}")
+    return failures
+
+# Node-by-node AST comparison without recursion
+def same_tree(a, b):
+    pending = [(a, b)]
+    while pending:
+        a, b = pending.pop()
+        if (a.node_type, a.value, a.line, len(a.children)) != (b.node_type, b.value, b.line, len(b.children)):
+            return False
+        pending.extend(zip(a.children, b.children))
+    return True
+
+# Run the reference evaluator checking every value against its inferred
+# type; returns (program, node type, inferred, actual) mismatches
+def check_types(name, tree, input_text):
+    types = infer_types(tree)
+    evaluator = ASTEvaluator(tree, io.StringIO(input_text), io.StringIO())
+    evaluate_node = evaluator.eval
+    wrong = []
+
+    def checked_eval(node, frame):
+        value = evaluate_node(node, frame)
+        kind = types.type_of(node)
+        if kind is not None and kind != type_name(value):
+            wrong.append((name, node.node_type, kind, type_name(value)))
+        return value
+    evaluator.eval = checked_eval
+    try:
+        evaluator.run()
+    except (LOLError, RecursionError):
+        pass
+    return wrong
+
+# Random prefix expression over the variables of PREFIX_DECLARATIONS
+PREFIX_DECLARATIONS = 'I HAS A a ITZ 7\nI HAS A b ITZ -2.5\nI HAS A s ITZ "12"\nI HAS A t ITZ WIN\n'
+
+def random_expression(rng, depth):
+    if depth == 0 or rng.random() < 0.25:
+        return rng.choice(["a", "b", "s", "t", "0", "3", "1.5", '"4"', '"x"', "WIN", "FAIL"])
+    op = rng.choice(["SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF", "BIGGR OF", "SMALLR OF",
+                     "BOTH SAEM", "DIFFRINT", "BOTH OF", "EITHER OF", "WON OF", "NOT",
+                     "ALL OF", "ANY OF", "SMOOSH"])
+    if op == "NOT":
+        return f"NOT {random_expression(rng, depth - 1)}"
+    if op in ("ALL OF", "ANY OF", "SMOOSH"):
+        operands = " AN ".join(random_expression(rng, depth - 1) for _ in range(rng.randint(1, 4)))
+        return f"{op} {operands} MKAY"
+    return f"{op} {random_expression(rng, depth - 1)} AN {random_expression(rng, depth - 1)}"
+
+# Random expressions where the token-level evaluator and the AST evaluator
+# disagree (None where running it fails): [(expr, expected, actual, errors)]
+def prefix_mismatches(count, seed=124):
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(count):
+        expr = random_expression(rng, 4)
+        code = f"HAI\nWAZZUP\n{PREFIX_DECLARATIONS}I HAS A r ITZ {expr}\nBUHBYE\nKTHXBYE\n"
+        try:
+            expected = evaluate(parse_source(code))["r"]
+        except LOLError:
+            expected = None
+        errors, symbols = analyze_semantics(code)
+        actual = symbols.get("r")
+        if errors or (type(actual), actual) != (type(expected), expected):
+            mismatches.append((expr, expected, actual, errors))
+    return mismatches
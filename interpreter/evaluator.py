@@ -0,0 +1,223 @@
+'''
+Reference tree-walking evaluator for TreeParser ASTs.
+
+Every node is dispatched on its type each time it runs, and control flow
+uses Python exceptions. This is deliberately the plain reading of the
+language semantics: the faster engines (executor, vm, ...) are checked
+and benchmarked against it.
+'''
+
+import sys
+
+from runtime import LOLError, CONSTANT_TYPES, node_constant, cast, to_number, to_yarn, lol_saem, BINARY_OPS, VARIADIC_OPS
+
+
+class BreakSignal(Exception):       # GTFO
+    pass
+
+class ReturnSignal(Exception):      # FOUND YR
+    def __init__(self, value):
+        self.value = value
+
+
+class ASTEvaluator:
+    def __init__(self, tree, stdin=None, stdout=None):
+        self.tree = tree
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+        self.functions = {}
+
+    def run(self):
+        '''Run the program; returns its global variables.'''
+        pending = [self.tree]
+        while pending:
+            node = pending.pop()
+            if node.node_type == "FUNC_DEF":
+                self.functions[node.children[1].value] = node
+            pending.extend(node.children)
+
+        frame = {"IT": None}
+        for node in self.tree.children:
+            if node.node_type == "STMT_LIST":
+                try:
+                    self.exec_statements(node, frame)
+                except BreakSignal:
+                    pass
+        return frame
+
+    # -------------------------
+    # Statements
+    # -------------------------
+    def exec_statements(self, stmt_list, frame):
+        for node in stmt_list.children:
+            self.exec_statement(node, frame)
+
+    def exec_block(self, block, frame):
+        self.exec_statements(block.children[0], frame)
+
+    def exec_statement(self, node, frame):
+        t = node.node_type
+        if t == "PRINT":
+            items = [to_yarn(self.eval(expr, frame)) for expr in node.children[1].children]
+            self.stdout.write("".join(items) + "\n")
+        elif t == "VAR_DEC":
+            value = self.eval(node.children[1], frame) if len(node.children) > 1 else None
+            frame[node.children[0].value] = value
+        elif t == "ASSIGN":
+            name = node.children[0].value
+            if name not in frame:
+                raise LOLError(f"Line {node.children[0].line}: Variable '{name}' used before declaration.")
+            frame[name] = self.eval(node.children[1], frame)
+        elif t == "EXPR_STMT":
+            expr = node.children[0]
+            if expr.node_type == "TYPECAST" and expr.children[0].node_type == "VAR":
+                self.eval(expr, frame)
+            else:
+                frame["IT"] = self.eval(expr, frame)
+        elif t == "FUNC_CALL":
+            frame["IT"] = self.eval(node, frame)
+        elif t == "INPUT":
+            self.eval(node, frame)
+        elif t == "IF":
+            self.exec_conditional(node, frame)
+        elif t == "SWITCH":
+            self.exec_switch(node, frame)
+        elif t == "LOOP":
+            self.exec_loop(node, frame)
+        elif t == "RETURN":
+            raise ReturnSignal(self.eval(node.children[-1], frame))
+        elif t == "EXIT":
+            raise BreakSignal()
+        elif t == "EXCEPTION":
+            self.exec_exception_handling(node, frame)
+        elif t == "FUNC_DEF":
+            pass
+        else:
+            raise LOLError(f"Line {node.line}: cannot run {t} {node.value}")
+
+    def exec_conditional(self, node, frame):
+        if frame["IT"]:
+            self.exec_block(node.children[1].children[0], frame)
+            return
+        for child in node.children[2:]:
+            if child.node_type == "MEBBE":
+                if self.eval(child.children[0], frame):
+                    self.exec_block(child.children[1], frame)
+                    return
+            elif child.node_type == "NO_WAI":
+                self.exec_block(child.children[0], frame)
+                return
+
+    def exec_switch(self, node, frame):
+        value = frame["IT"] = self.eval(node.children[0], frame)
+        matched = False
+        try:
+            for child in node.children[1:]:
+                if child.node_type == "CASE":
+                    if not matched and lol_saem(value, node_constant(child.children[0])):
+                        matched = True
+                    if matched:
+                        self.exec_block(child.children[1], frame)
+                elif child.node_type == "DEFAULT":
+                    self.exec_block(child.children[0], frame)
+        except BreakSignal:
+            pass
+
+    def exec_loop(self, node, frame):
+        var = None
+        step = 0
+        condition = None
+        body = None
+        for child in node.children:
+            t = child.node_type
+            if t == "DIRECTION":
+                step = 1 if child.children[0].value == "UPPIN" else -1
+                var = child.children[1].value
+            elif t == "BLOCK":
+                body = child
+            elif t not in ("IMINYR", "LOOP_NAME", "LOOP_END"):
+                condition = child
+
+        if var is not None and var not in frame:
+            frame[var] = 0
+        try:
+            while True:
+                if condition is not None:
+                    if condition.node_type == "WILE":
+                        if not self.eval(condition.children[0], frame):
+                            break
+                    elif self.eval(condition, frame):
+                        break
+                self.exec_block(body, frame)
+                if var is not None:
+                    frame[var] = to_number(frame[var]) + step
+        except BreakSignal:
+            pass
+
+    def exec_exception_handling(self, node, frame):
+        success = next(child for child in node.children if child.node_type == "SUCCESS")
+        try:
+            self.exec_block(success.children[0], frame)
+        except LOLError:
+            for child in node.children:
+                if child.node_type == "FAIL":
+                    self.exec_block(child.children[0], frame)
+
+    # -------------------------
+    # Expressions
+    # -------------------------
+    def eval(self, node, frame):
+        t = node.node_type
+        if t == "LITERAL" or t in CONSTANT_TYPES:
+            return node_constant(node)
+        if t == "IDENTIFIER":
+            if node.value not in frame:
+                raise LOLError(f"Line {node.line}: Variable '{node.value}' used before declaration.")
+            return frame[node.value]
+        if t in ("OP", "COMPARISON", "LOGICAL", "SMOOSH"):
+            values = [self.eval(child, frame) for child in node.children]
+            if node.value in BINARY_OPS:
+                return BINARY_OPS[node.value](*values)
+            return VARIADIC_OPS[node.value](*values)
+        if t == "NOT":
+            return not self.eval(node.children[0], frame)
+        if t == "TYPECAST":
+            type_literal = node.children[-1].value
+            if node.children[0].node_type == "VAR":
+                name = node.children[0].value
+                frame[name] = cast(frame[name], type_literal)
+                return frame[name]
+            return cast(self.eval(node.children[1], frame), type_literal)
+        if t == "FUNC_CALL":
+            return self.call(node, frame)
+        if t == "INPUT":
+            var = node.children[1]
+            if var.value not in frame:
+                raise LOLError(f"Line {var.line}: Variable '{var.value}' used before declaration.")
+            frame[var.value] = self.stdin.readline().rstrip("\n")
+            return frame[var.value]
+        raise LOLError(f"Line {node.line}: cannot evaluate {t} {node.value}")
+
+    def call(self, node, frame):
+        name = node.children[1].value
+        if name not in self.functions:
+            raise LOLError(f"Line {node.line}: Unknown function '{name}'")
+        function = self.functions[name]
+        params = [param.value for param in function.children[2].children]
+        args = [self.eval(arg.children[0], frame) for arg in node.children[2].children]
+        if len(args) != len(params):
+            raise LOLError(f"Function '{name}' takes {len(params)} arguments, got {len(args)}")
+
+        local = dict(zip(params, args))
+        local["IT"] = None
+        try:
+            self.exec_block(function.children[3], local)
+        except ReturnSignal as signal:
+            return signal.value
+        except BreakSignal:
+            return None
+        return local["IT"]
+
+
+def evaluate(tree, stdin=None, stdout=None):
+    return ASTEvaluator(tree, stdin, stdout).run()
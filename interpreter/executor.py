@@ -0,0 +1,763 @@
+'''
+Closure-compiling executor for TreeParser ASTs.
+
+The AST is compiled once into a tree of Python closures, one per node,
+with operands, literal values and operator functions pre-bound. Running
+the program is then plain closure calls, with no dispatch on node types.
+
+Variables live in frame slots assigned by resolver.py: a frame is a
+list, with IT in slot 0. Expression closures take the current frame and
+return a value. Statement closures return None, or
+a signal when control leaves the block early: BREAK for GTFO, or a
+Return for FOUND YR.
+
+Usage:  python executor.py program.lol
+'''
+
+import sys
+
+from lexer import iter_tokens
+from tree_parser import TreeParser
+from optimizer import fold_constants, eliminate_dead_code, hoist_invariants, number_values
+from resolver import resolve, UNSET, DEFINITE, UNDECLARED
+from inference import infer_types, TypeInfo, NUMERIC, assigned_names
+from runtime import (
+    LOLError, CONSTANT_TYPES, node_constant, cast, to_number, to_yarn, lol_saem,
+    BINARY_OPS, VARIADIC_OPS,
+)
+from transpiler import PREAMBLE, transpile_function, type_kind, load
+
+# Calls with the same argument types before a function is compiled
+HOT_THRESHOLD = 100
+
+NUMERIC_TYPES = frozenset((int, float))
+
+# Arithmetic with a fast path for NUMBR/NUMBAR operands
+NATIVE_OPS = {
+    "SUM OF": lambda a, b: a + b,
+    "DIFF OF": lambda a, b: a - b,
+    "PRODUKT OF": lambda a, b: a * b,
+}
+
+# Closures for operands whose types inference proved: NUMBR/NUMBAR
+# arithmetic, and BOTH SAEM / DIFFRINT on numbers or on equal types
+TYPED_OPS = {
+    "SUM OF": lambda left, right: lambda frame: left(frame) + right(frame),
+    "DIFF OF": lambda left, right: lambda frame: left(frame) - right(frame),
+    "PRODUKT OF": lambda left, right: lambda frame: left(frame) * right(frame),
+    "BOTH SAEM": lambda left, right: lambda frame: left(frame) == right(frame),
+    "DIFFRINT": lambda left, right: lambda frame: left(frame) != right(frame),
+}
+
+# Node types that make up a LOOP header rather than its condition
+LOOP_PARTS = frozenset(("IMINYR", "LOOP_NAME", "DIRECTION", "BLOCK", "LOOP_END"))
+
+# Counter relations (the loop runs while `counter <relation> bound` holds)
+NEGATED = {"==": "!=", "!=": "==", "<=": ">", ">": "<=", ">=": "<", "<": ">="}
+# Relation -> (direction the counter must move, range end given the bound)
+COUNTED_RANGES = {
+    "!=": (0, lambda bound: bound),
+    "<=": (1, lambda bound: bound + 1),
+    "<": (1, lambda bound: bound),
+    ">=": (-1, lambda bound: bound - 1),
+    ">": (-1, lambda bound: bound),
+}
+
+
+def is_counter(node, var):
+    return node.node_type == "IDENTIFIER" and node.value == var
+
+# Recognize a loop condition comparing the counter with a bound:
+#   TIL BOTH SAEM i AN n / WILE DIFFRINT i AN n                   i != n
+#   WILE BOTH SAEM i AN SMALLR OF i AN n                          i <= n
+#   WILE BOTH SAEM i AN BIGGR OF i AN n                           i >= n
+# (operands either way round, TIL negating the relation). Returns
+# (relation, bound node) or None.
+def counter_condition(condition, var):
+    wile = condition.node_type == "WILE"
+    expr = condition.children[0] if wile else condition
+    if expr.node_type != "COMPARISON" or len(expr.children) != 2:
+        return None
+    counter, bound = expr.children
+    if not is_counter(counter, var):
+        counter, bound = bound, counter
+    if not is_counter(counter, var):
+        return None
+    relation = "=="
+    if bound.node_type in ("OP", "COMPARISON") and bound.value in ("SMALLR OF", "BIGGR OF") and len(bound.children) == 2:
+        counter, limit = bound.children
+        if not is_counter(counter, var):
+            counter, limit = limit, counter
+        if not is_counter(counter, var):
+            return None
+        relation = "<=" if bound.value == "SMALLR OF" else ">="
+        bound = limit
+    # A bound that reads the counter moves with it
+    if any(is_counter(node, var) for node in iter_nodes(bound)):
+        return None
+    if expr.value == "DIFFRINT":
+        relation = NEGATED[relation]
+    if not wile:
+        relation = NEGATED[relation]
+    if relation == "==":
+        return None
+    return relation, bound
+
+
+# -------------------------
+# Control signals
+# -------------------------
+class Break:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "BREAK"
+
+BREAK = Break()     # GTFO
+
+class Return:       # FOUND YR <expr>
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+# -------------------------
+# Runtime state
+# -------------------------
+class IOState:
+    '''Where VISIBLE writes and GIMMEH reads; set by CompiledProgram.run.'''
+    def __init__(self):
+        self.write = sys.stdout.write
+        self.readline = sys.stdin.readline
+
+class Function:
+    '''
+    A HOW IZ I function; `body` is filled in once it is compiled. With
+    `tiering` set, calls are counted and a hot function is promoted to
+    generated Python code specialized for its most common argument types.
+    '''
+    def __init__(self, name, params, node=None, tiering=None):
+        self.name = name
+        self.params = params
+        self.body = None
+        self.scope = None           # resolver.Scope of the body
+        self.node = node
+        self.tiering = tiering
+        self.calls = 0
+        self.signatures = {}        # argument types -> calls, since the last promotion
+        self.compiled = None        # specialized Python function, once hot
+        self.signature = None       # argument types `compiled` was specialized for
+        self.compiled_calls = 0
+        self.guard_failures = 0
+        self.compilations = 0
+
+    def call(self, values):
+        if len(values) != len(self.params):
+            raise LOLError(f"Function '{self.name}' takes {len(self.params)} arguments, got {len(values)}")
+        self.calls += 1
+        tiering = self.tiering
+        if tiering is not None:
+            signature = tuple([type(value) for value in values])
+            if signature == self.signature:
+                self.compiled_calls += 1
+                return self.compiled(*values)
+            # Cold, or the guard failed: interpret, and (re)promote once this
+            # signature is hot
+            if self.compiled is not None:
+                self.guard_failures += 1
+            seen = self.signatures[signature] = self.signatures.get(signature, 0) + 1
+            if seen >= tiering.threshold:
+                tiering.promote(self, signature)
+
+        frame = self.scope.new_frame()
+        frame[1:len(values) + 1] = values       # parameters take the first slots after IT
+        signal = self.body(frame)
+        if signal is None:
+            return frame[0]         # falling off the end returns IT
+        if signal is BREAK:
+            return None
+        return signal.value
+
+    # Entry point for generated code
+    def invoke(self, *values):
+        return self.call(values)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "compiled": self.compiled is not None,
+            "signature": None if self.signature is None else [t.__name__ for t in self.signature],
+            "compiled_calls": self.compiled_calls,
+            "guard_failures": self.guard_failures,
+            "compilations": self.compilations,
+        }
+
+class Tiering:
+    '''Promotes functions called `threshold` times with the same argument types.'''
+    def __init__(self, threshold, io, functions):
+        self.threshold = threshold
+        self.io = io
+        self.functions = functions
+
+    def promote(self, function, signature):
+        kinds = {param: type_kind(t) for param, t in zip(function.params, signature) if type_kind(t)}
+        arities = {name: len(other.params) for name, other in self.functions.items()}
+        source = PREAMBLE + transpile_function(function.node, arities, kinds)
+        namespace = load(source, f"<lolcode {function.name}>")
+        function.compiled = namespace[f"f_{function.name}"]
+        # Calls out of generated code go back through Function.call, so
+        # they are counted and guarded too
+        for name, other in self.functions.items():
+            namespace[f"f_{name}"] = other.invoke
+        io = self.io
+        namespace["_write"] = lambda text: io.write(text)
+        namespace["_readline"] = lambda: io.readline()
+
+        function.signature = signature
+        function.signatures = {}
+        function.compilations += 1
+
+class CompiledProgram:
+    def __init__(self, main, io, functions, resolution, types, specialized=0):
+        self.main = main
+        self.io = io
+        self.functions = functions
+        self.resolution = resolution    # resolver.Resolution: slots and undeclared uses
+        self.scope = resolution.main
+        self.types = types              # inference.TypeInfo: static expression types
+        self.specialized = specialized  # expressions compiled without type checks
+
+    def run(self, stdin=None, stdout=None):
+        '''Run the program; returns its global variables as a dict.'''
+        self.io.write = (stdout or sys.stdout).write
+        self.io.readline = (stdin or sys.stdin).readline
+        frame = self.scope.new_frame()
+        self.main(frame)
+        return self.scope.frame_dict(frame)
+
+    def stats(self):
+        '''Per-function call counts and tiering state.'''
+        return {name: function.stats() for name, function in self.functions.items()}
+
+
+# -------------------------
+# Compiler
+# -------------------------
+class ClosureCompiler:
+    counted_loops = True        # False runs every loop through the generic path
+
+    def __init__(self, hot_threshold=HOT_THRESHOLD, typed=True):
+        self.io = IOState()
+        self.functions = {}
+        self.resolution = None
+        self.typed = typed      # False keeps every operation type-checked at run time
+        self.types = None
+        self.specialized = 0
+        self.counted = 0        # loops compiled as counted ranges
+        # None keeps every function interpreted
+        self.tiering = None if hot_threshold is None else Tiering(hot_threshold, self.io, self.functions)
+
+        self.expr_compilers = {
+            "LITERAL": self.compile_literal,
+            "IDENTIFIER": self.compile_identifier,
+            "OP": self.compile_operator,
+            "COMPARISON": self.compile_operator,
+            "LOGICAL": self.compile_operator,
+            "SMOOSH": self.compile_operator,
+            "NOT": self.compile_not,
+            "TYPECAST": self.compile_typecast,
+            "FUNC_CALL": self.compile_call,
+            "INPUT": self.compile_input_expr,
+        }
+        self.expr_compilers.update(dict.fromkeys(CONSTANT_TYPES, self.compile_literal))
+        self.statement_compilers = {
+            "PRINT": self.compile_print,
+            "VAR_DEC": self.compile_declaration,
+            "ASSIGN": self.compile_assignment,
+            "EXPR_STMT": self.compile_expr_stmt,
+            "FUNC_CALL": self.compile_call_stmt,
+            "INPUT": self.compile_input,
+            "IF": self.compile_conditional,
+            "SWITCH": self.compile_switch,
+            "LOOP": self.compile_loop,
+            "RETURN": self.compile_return,
+            "EXIT": self.compile_exit,
+            "EXCEPTION": self.compile_exception_handling,
+        }
+
+    def compile_program(self, tree):
+        # Functions are hoisted, so calls may come before (or inside) their definition
+        self.resolution = resolve(tree)
+        self.types = infer_types(tree) if self.typed else TypeInfo()
+        definitions = [node for node in iter_nodes(tree) if node.node_type == "FUNC_DEF"]
+        for node in definitions:
+            name = node.children[1].value
+            params = [param.value for param in node.children[2].children]
+            self.functions[name] = Function(name, params, node, self.tiering)
+        for node in definitions:
+            function = self.functions[node.children[1].value]
+            function.scope = self.resolution.functions[function.name]
+            function.body = self.compile_block(node.children[3])
+
+        statements = next(child for child in tree.children if child.node_type == "STMT_LIST")
+        main = self.compile_statements(statements)
+        return CompiledProgram(main, self.io, self.functions, self.resolution, self.types, self.specialized)
+
+    # -------------------------
+    # Statements
+    # -------------------------
+    def compile_statement(self, node):
+        compiler = self.statement_compilers.get(node.node_type)
+        if compiler is None:
+            return self.compile_error(node)
+        return compiler(node)
+
+    # STMT_LIST -> one closure running each statement until a signal
+    def compile_statements(self, stmt_list):
+        statements = [self.compile_statement(node) for node in stmt_list.children
+                      if node.node_type != "FUNC_DEF"]
+        if not statements:
+            return lambda frame: None
+        if len(statements) == 1:
+            return statements[0]
+
+        def block(frame):
+            for statement in statements:
+                signal = statement(frame)
+                if signal is not None:
+                    return signal
+        return block
+
+    def compile_block(self, node):
+        return self.compile_statements(node.children[0])
+
+    # (slot, reference kind, error message) of a variable node
+    def variable(self, node):
+        slot, kind = self.resolution.ref(node)
+        return slot, kind, f"Line {node.line}: Variable '{node.value}' used before declaration."
+
+    # Closure storing a value into a variable that must already be declared
+    def compile_store(self, node):
+        slot, kind, message = self.variable(node)
+        if kind == DEFINITE:
+            def store(frame, value):
+                frame[slot] = value
+        elif kind == UNDECLARED:
+            def store(frame, value):
+                raise LOLError(message)
+        else:
+            def store(frame, value):
+                if frame[slot] is UNSET:
+                    raise LOLError(message)
+                frame[slot] = value
+        return store
+
+    def compile_error(self, node):
+        message = f"Line {node.line}: cannot run {node.node_type} {node.value}"
+
+        def error(frame):
+            raise LOLError(message)
+        return error
+
+    # VISIBLE <expr>...
+    def compile_print(self, node):
+        exprs = [self.compile_expr(expr) for expr in node.children[1].children]
+        io = self.io
+
+        def visible(frame):
+            io.write("".join([to_yarn(expr(frame)) for expr in exprs]) + "\n")
+        return visible
+
+    # I HAS A <var> (ITZ <expr>)?
+    def compile_declaration(self, node):
+        slot = self.variable(node.children[0])[0]
+        if len(node.children) == 1:
+            def declare(frame):
+                frame[slot] = None
+            return declare
+        expr = self.compile_expr(node.children[1])
+
+        def declare_init(frame):
+            frame[slot] = expr(frame)
+        return declare_init
+
+    # <var> R <expr>
+    def compile_assignment(self, node):
+        slot, kind, message = self.variable(node.children[0])
+        expr = self.compile_expr(node.children[1])
+        if kind == DEFINITE:
+            def assign(frame):
+                frame[slot] = expr(frame)
+            return assign
+
+        def assign_checked(frame):
+            if kind == UNDECLARED or frame[slot] is UNSET:
+                raise LOLError(message)
+            frame[slot] = expr(frame)
+        return assign_checked
+
+    # A bare expression sets IT; <var> IS NOW A <type> recasts in place
+    def compile_expr_stmt(self, node):
+        expr_node = node.children[0]
+        if expr_node.node_type == "TYPECAST" and expr_node.children[0].node_type == "VAR":
+            recast = self.compile_typecast(expr_node)
+
+            def recast_stmt(frame):
+                recast(frame)
+            return recast_stmt
+        expr = self.compile_expr(expr_node)
+
+        def set_it(frame):
+            frame[0] = expr(frame)
+        return set_it
+
+    def compile_call_stmt(self, node):
+        call = self.compile_call(node)
+
+        def call_stmt(frame):
+            frame[0] = call(frame)
+        return call_stmt
+
+    # GIMMEH <var>
+    def compile_input(self, node):
+        read = self.compile_input_expr(node)
+
+        def gimmeh(frame):
+            read(frame)
+        return gimmeh
+
+    # O RLY? on IT
+    def compile_conditional(self, node):
+        ya_rly = None
+        mebbes = []
+        no_wai = None
+        for child in node.children:
+            if child.node_type == "YA_RLY":
+                ya_rly = self.compile_block(child.children[0])
+            elif child.node_type == "MEBBE":
+                mebbes.append((self.compile_expr(child.children[0]), self.compile_block(child.children[1])))
+            elif child.node_type == "NO_WAI":
+                no_wai = self.compile_block(child.children[0])
+
+        if not mebbes:
+            if no_wai is None:
+                def if_then(frame):
+                    if frame[0]:
+                        return ya_rly(frame)
+                return if_then
+
+            def if_else(frame):
+                if frame[0]:
+                    return ya_rly(frame)
+                return no_wai(frame)
+            return if_else
+
+        def if_chain(frame):
+            if frame[0]:
+                return ya_rly(frame)
+            for condition, block in mebbes:
+                if condition(frame):
+                    return block(frame)
+            if no_wai is not None:
+                return no_wai(frame)
+        return if_chain
+
+    # <expr> WTF? OMG ... OMGWTF ... OIC: jump to the matching case and fall
+    # through until GTFO
+    def compile_switch(self, node):
+        subject = self.compile_expr(node.children[0])
+        cases = []
+        blocks = []
+        default = None
+        for child in node.children[1:]:
+            if child.node_type == "CASE":
+                cases.append((node_constant(child.children[0]), len(blocks)))
+                blocks.append(self.compile_block(child.children[1]))
+            elif child.node_type == "DEFAULT":
+                default = len(blocks)
+                blocks.append(self.compile_block(child.children[0]))
+
+        def switch(frame):
+            value = frame[0] = subject(frame)
+            start = default
+            for literal, index in cases:
+                if lol_saem(value, literal):
+                    start = index
+                    break
+            if start is None:
+                return None
+            for block in blocks[start:]:
+                signal = block(frame)
+                if signal is not None:
+                    return None if signal is BREAK else signal
+        return switch
+
+    # IM IN YR <label> [UPPIN|NERFIN YR <var>] [TIL|WILE <expr>] ... IM OUTTA YR <label>
+    def compile_loop(self, node):
+        var = None
+        create = True      # the loop variable may need creating on entry
+        step = 0
+        til = None
+        wile = None
+        body = None
+        counted = None
+        for child in node.children:
+            if child.node_type == "DIRECTION":
+                step = 1 if child.children[0].value == "UPPIN" else -1
+                var, kind, _ = self.variable(child.children[1])
+                name = child.children[1].value
+                if kind == DEFINITE:
+                    create = False
+            elif child.node_type == "BLOCK":
+                body = self.compile_block(child)
+                assigned = assigned_names(child)
+            elif child.node_type == "WILE":
+                wile = self.compile_expr(child.children[0])
+                condition = child
+            elif child.node_type not in LOOP_PARTS:
+                til = self.compile_expr(child)
+                condition = child
+        if var is not None and (til or wile) and self.counted_loops:
+            counted = counter_condition(condition, name)
+
+        def loop(frame):
+            if create and var is not None and frame[var] is UNSET:
+                frame[var] = 0
+            while True:
+                if til is not None and til(frame):
+                    return None
+                if wile is not None and not wile(frame):
+                    return None
+                signal = body(frame)
+                if signal is not None:
+                    return None if signal is BREAK else signal
+                if var is not None:
+                    frame[var] = to_number(frame[var]) + step
+        if counted is None or name in assigned:
+            return loop
+        relation, bound_node = counted
+        if not (bound_node.node_type in CONSTANT_TYPES or bound_node.node_type == "LITERAL" or
+                (bound_node.node_type == "IDENTIFIER" and bound_node.value not in assigned)):
+            return loop
+        direction = COUNTED_RANGES[relation][0]
+        if direction not in (0, step):
+            return loop
+        return self.compile_counted_loop(loop, body, var, step, relation, bound_node)
+
+    # Loop over a NUMBR counter that only UPPIN/NERFIN changes, against a
+    # bound the body never assigns: runs as a range, or as `generic` when
+    # the values at entry are not both NUMBRs
+    def compile_counted_loop(self, generic, body, var, step, relation, bound_node):
+        bound = self.compile_expr(bound_node)
+        range_end = COUNTED_RANGES[relation][1]
+        equality = relation == "!="
+        self.counted += 1
+
+        def counted_loop(frame):
+            start = frame[var]
+            if start is UNSET:
+                start = frame[var] = 0
+            limit = bound(frame)
+            if not equality:
+                limit = to_number(limit)        # SMALLR / BIGGR cast the bound
+            if type(start) is not int or type(limit) is not int:
+                return generic(frame)
+            if equality and (limit - start) * step < 0:
+                return generic(frame)           # never reaches the bound
+            end = range_end(limit)
+            for i in range(start, end, step):
+                frame[var] = i
+                signal = body(frame)
+                if signal is not None:
+                    return None if signal is BREAK else signal
+            if (end - start) * step > 0:
+                frame[var] = end
+            return None
+        return counted_loop
+
+    # FOUND YR <expr>
+    def compile_return(self, node):
+        expr = self.compile_expr(node.children[-1])
+
+        def found_yr(frame):
+            return Return(expr(frame))
+        return found_yr
+
+    # GTFO
+    def compile_exit(self, node):
+        return lambda frame: BREAK
+
+    # PLZ <expr>? AWSUM THX <block> (O NOES <block>)? KTHX
+    def compile_exception_handling(self, node):
+        attempt = None
+        fallback = None
+        for child in node.children:
+            if child.node_type == "SUCCESS":
+                attempt = self.compile_block(child.children[0])
+            elif child.node_type == "FAIL":
+                fallback = self.compile_block(child.children[0])
+
+        def plz(frame):
+            try:
+                return attempt(frame)
+            except LOLError:
+                if fallback is not None:
+                    return fallback(frame)
+        return plz
+
+    # -------------------------
+    # Expressions
+    # -------------------------
+    def compile_expr(self, node):
+        compiler = self.expr_compilers.get(node.node_type)
+        if compiler is None:
+            return self.compile_error(node)
+        return compiler(node)
+
+    def compile_literal(self, node):
+        value = node_constant(node)
+        return lambda frame: value
+
+    def compile_identifier(self, node):
+        slot, kind, message = self.variable(node)
+        if kind == DEFINITE:
+            return lambda frame: frame[slot]
+        if kind == UNDECLARED:
+            def undeclared(frame):
+                raise LOLError(message)
+            return undeclared
+
+        def load_checked(frame):
+            value = frame[slot]
+            if value is UNSET:
+                raise LOLError(message)
+            return value
+        return load_checked
+
+    # OP, COMPARISON, LOGICAL and SMOOSH nodes
+    def compile_operator(self, node):
+        operands = [self.compile_expr(child) for child in node.children]
+        op = node.value
+        kinds = [self.types.type_of(child) for child in node.children]
+        function = BINARY_OPS.get(op)
+        if function is None:
+            function = VARIADIC_OPS[op]
+            if op == "SMOOSH" and all(kind == "YARN" for kind in kinds):
+                self.specialized += 1
+                return lambda frame: "".join([operand(frame) for operand in operands])
+
+            def variadic(frame):
+                return function(*[operand(frame) for operand in operands])
+            return variadic
+        if len(operands) != 2:
+            return self.compile_error(node)
+        left, right = operands
+
+        typed = TYPED_OPS.get(op)
+        if typed is not None and kinds[0] is not None and kinds[1] is not None:
+            numeric = kinds[0] in NUMERIC and kinds[1] in NUMERIC
+            if numeric or (op in ("BOTH SAEM", "DIFFRINT") and kinds[0] == kinds[1]):
+                self.specialized += 1
+                return typed(left, right)
+
+        native = NATIVE_OPS.get(op)
+        if native is not None:
+            def arithmetic(frame):
+                a = left(frame)
+                b = right(frame)
+                if type(a) in NUMERIC_TYPES and type(b) in NUMERIC_TYPES:
+                    return native(a, b)
+                return function(a, b)
+            return arithmetic
+
+        def binary(frame):
+            return function(left(frame), right(frame))
+        return binary
+
+    def compile_not(self, node):
+        operand = self.compile_expr(node.children[0])
+        return lambda frame: not operand(frame)
+
+    # MAEK <expr> A <type>, or <var> IS NOW A <type> used as a value
+    def compile_typecast(self, node):
+        type_literal = node.children[-1].value
+        if node.children[0].node_type == "VAR":
+            load = self.compile_identifier(node.children[0])
+            store = self.compile_store(node.children[0])
+
+            def recast(frame):
+                value = cast(load(frame), type_literal)
+                store(frame, value)
+                return value
+            return recast
+        expr = self.compile_expr(node.children[1])
+        if self.types.type_of(node.children[1]) == type_literal:
+            self.specialized += 1
+            return expr     # already of that type
+        return lambda frame: cast(expr(frame), type_literal)
+
+    # I IZ <function> (YR <expr>)* MKAY
+    def compile_call(self, node):
+        name = node.children[1].value
+        function = self.functions.get(name)
+        if function is None:
+            return self.compile_error(node.children[1])
+        args = [self.compile_expr(arg.children[0]) for arg in node.children[2].children]
+        call = function.call
+
+        def call_function(frame):
+            return call([arg(frame) for arg in args])
+        return call_function
+
+    # GIMMEH <var>: stores the line read (a YARN) and yields it
+    def compile_input_expr(self, node):
+        store = self.compile_store(node.children[1])
+        io = self.io
+
+        def gimmeh(frame):
+            value = io.readline().rstrip("\n")
+            store(frame, value)
+            return value
+        return gimmeh
+
+
+# Every node of a tree, without recursion
+def iter_nodes(root):
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        yield node
+        pending.extend(reversed(node.children))
+
+def compile_program(tree, hot_threshold=HOT_THRESHOLD, typed=True):
+    return ClosureCompiler(hot_threshold, typed).compile_program(tree)
+
+
+def main(argv):
+    if len(argv) != 1:
+        print("Usage: python executor.py program.lol")
+        return 1
+    with open(argv[0], "r") as f:
+        parser = TreeParser(iter_tokens(f))
+        tree = parser.parse_program()
+    if parser.errors:
+        for error in parser.errors:
+            print("-", error)
+        return 1
+    fold_constants(tree)
+    warnings = []
+    eliminate_dead_code(tree, warnings)
+    for warning in warnings:
+        print(warning, file=sys.stderr)
+    hoist_invariants(tree)
+    number_values(tree)
+    try:
+        compile_program(tree).run()
+    except LOLError as e:
+        print(f"Runtime error: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,192 @@
+'''
+Machine-readable LOLCODE statement grammar (after docs/lolcode_grammar.pdf)
+and a generator for its FIRST/FOLLOW sets and LL(1) parse table.
+
+Usage:  python grammar.py       (prints FIRST/FOLLOW sets and the table)
+'''
+
+import sys
+
+# -------------------------
+# Grammar
+# -------------------------
+# Nonterminals are lowercase names; each maps to its productions (lists of
+# symbols, [] is epsilon). Terminals are keyword phrases ("O RLY?") or one
+# of the TOKEN_TERMINALS token kinds. "$" is end of input.
+TOKEN_TERMINALS = ("IDENTIFIER", "INT_LITERAL", "FLOAT_LITERAL", "STRING")
+END = "$"
+START = "program"
+
+STATEMENT_GRAMMAR = {
+    "program": [["HAI", "stmt_list", "KTHXBYE"]],
+    "stmt_list": [["stmt", "stmt_list"], []],
+    "stmt": [
+        ["print"], ["var_section"], ["declaration"], ["ident_stmt"], ["expr_stmt"],
+        ["function_call"], ["conditional"], ["loop"], ["function_def"], ["input"],
+        ["return"], ["exit"], ["exception_handling"],
+    ],
+
+    # VISIBLE <expr> (AN? <expr>)*
+    "print": [["VISIBLE", "expr_list"]],
+    "var_section": [["WAZZUP"], ["BUHBYE"]],
+    "declaration": [["I HAS A", "IDENTIFIER", "declaration_init"]],
+    "declaration_init": [["ITZ", "expr"], []],
+
+    # Statements starting with a variable: assignment, IS NOW A, or an
+    # expression statement (possibly the subject of a switch)
+    "ident_stmt": [["IDENTIFIER", "ident_tail"]],
+    "ident_tail": [["assignment"], ["recast"], ["switch_tail"]],
+    "assignment": [["R", "expr"]],
+    "recast": [["IS NOW A", "TYPE_LITERAL"]],
+    "expr_stmt": [["operator_expr", "switch_tail"]],
+
+    # <switch> ::= <expr> WTF? (OMG <literal> <block>)* [OMGWTF <block>] OIC
+    "switch_tail": [["WTF?", "switch_cases", "switch_default", "OIC"], []],
+    "switch_cases": [["OMG", "literal", "stmt_list", "switch_cases"], []],
+    "switch_default": [["OMGWTF", "stmt_list"], []],
+
+    # <function_call> ::= I IZ <funcident> (YR <expr> (AN YR <expr>)*)? MKAY
+    "function_call": [["I IZ", "IDENTIFIER", "call_args", "call_end"]],
+    "call_args": [["YR", "expr", "call_more_args"], []],
+    "call_more_args": [["AN", "YR", "expr", "call_more_args"], []],
+    "call_end": [["MKAY"], []],
+
+    # <conditional> ::= O RLY? YA RLY <block> (MEBBE <expr> <block>)* (NO WAI <block>)? OIC
+    "conditional": [["O RLY?", "YA RLY", "stmt_list", "mebbe", "no_wai", "OIC"]],
+    "mebbe": [["MEBBE", "expr", "stmt_list", "mebbe"], []],
+    "no_wai": [["NO WAI", "stmt_list"], []],
+
+    # <loop> ::= IM IN YR <loopident> [UPPIN|NERFIN YR <varident>] [TIL|WILE <expr>] <block> IM OUTTA YR <loopident>
+    "loop": [["IM IN YR", "IDENTIFIER", "loop_update", "loop_cond", "stmt_list", "IM OUTTA YR", "IDENTIFIER"]],
+    "loop_update": [["UPPIN", "YR", "IDENTIFIER"], ["NERFIN", "YR", "IDENTIFIER"], []],
+    "loop_cond": [["TIL", "expr"], ["WILE", "expr"], []],
+
+    # <function_def> ::= HOW IZ I <funcident> (YR <param> (AN YR <param>)*)? <block> IF U SAY SO
+    "function_def": [["HOW IZ I", "IDENTIFIER", "params", "stmt_list", "IF U SAY SO"]],
+    "params": [["YR", "IDENTIFIER", "more_params"], []],
+    "more_params": [["AN", "YR", "IDENTIFIER", "more_params"], []],
+
+    "input": [["GIMMEH", "IDENTIFIER"]],
+    "return": [["FOUND YR", "expr"]],
+    "exit": [["GTFO"]],
+
+    # <exception_handling> ::= PLZ <expr>? AWSUM THX <block> (O NOES <block>)? KTHX
+    "exception_handling": [["PLZ", "optional_expr", "AWSUM THX", "stmt_list", "o_noes", "KTHX"]],
+    "optional_expr": [["expr"], []],
+    "o_noes": [["O NOES", "stmt_list"], []],
+}
+
+# Nonterminals parsed by hand-written code (TreeParser.parse_expr and
+# friends); the grammar only needs the terminals each can start with.
+# Prefix expressions with optional MKAYs are not LL(1), so they stay out.
+LITERAL_FIRST = ["INT_LITERAL", "FLOAT_LITERAL", "STRING", "WIN", "FAIL"]
+OPERATOR_FIRST = LITERAL_FIRST + [
+    "MAEK", "SMOOSH", "NOT", "SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF",
+    "BIGGR OF", "SMALLR OF", "BOTH SAEM", "DIFFRINT", "BOTH OF", "EITHER OF", "WON OF",
+    "ALL OF", "ANY OF",
+]
+EXPR_FIRST = OPERATOR_FIRST + ["IDENTIFIER", "I IZ"]
+
+EXTERNAL_FIRST = {
+    "expr": EXPR_FIRST,
+    "expr_list": EXPR_FIRST + ["GIMMEH"],
+    "operator_expr": OPERATOR_FIRST,
+    "literal": LITERAL_FIRST,
+}
+
+
+class GrammarError(Exception):
+    pass
+
+
+# -------------------------
+# FIRST / FOLLOW
+# -------------------------
+def is_nonterminal(symbol, grammar=STATEMENT_GRAMMAR, external=EXTERNAL_FIRST):
+    return symbol in grammar or symbol in external
+
+# FIRST of a symbol sequence; "" in the result means it can derive epsilon
+def first_of(symbols, first):
+    result = set()
+    for symbol in symbols:
+        symbol_first = first.get(symbol, {symbol})
+        result |= symbol_first - {""}
+        if "" not in symbol_first:
+            return result
+    result.add("")
+    return result
+
+def first_sets(grammar=STATEMENT_GRAMMAR, external=EXTERNAL_FIRST):
+    first = {name: set(terminals) for name, terminals in external.items()}
+    first.update((name, set()) for name in grammar)
+    changed = True
+    while changed:
+        changed = False
+        for name, productions in grammar.items():
+            for production in productions:
+                new = first_of(production, first) - first[name]
+                if new:
+                    first[name] |= new
+                    changed = True
+    return first
+
+def follow_sets(grammar=STATEMENT_GRAMMAR, first=None, start=START, external=EXTERNAL_FIRST):
+    first = first or first_sets(grammar, external)
+    follow = {name: set() for name in list(grammar) + list(external)}
+    follow[start].add(END)
+    changed = True
+    while changed:
+        changed = False
+        for name, productions in grammar.items():
+            for production in productions:
+                for i, symbol in enumerate(production):
+                    if symbol not in follow:
+                        continue
+                    rest = first_of(production[i + 1:], first)
+                    new = rest - {""}
+                    if "" in rest:
+                        new |= follow[name]
+                    new -= follow[symbol]
+                    if new:
+                        follow[symbol] |= new
+                        changed = True
+    return follow
+
+
+# -------------------------
+# LL(1) table
+# -------------------------
+# {nonterminal: {terminal: production}}; raises GrammarError on a conflict
+def ll1_table(grammar=STATEMENT_GRAMMAR, first=None, follow=None):
+    first = first or first_sets(grammar)
+    follow = follow or follow_sets(grammar, first)
+    table = {}
+    for name, productions in grammar.items():
+        row = table[name] = {}
+        for production in productions:
+            predict = first_of(production, first)
+            if "" in predict:
+                predict = (predict - {""}) | follow[name]
+            for terminal in predict:
+                if terminal in row and row[terminal] is not production:
+                    raise GrammarError(
+                        f"LL(1) conflict in {name} on {terminal!r}: {row[terminal]} / {production}")
+                row[terminal] = production
+    return table
+
+FIRST = first_sets()
+FOLLOW = follow_sets(first=FIRST)
+LL1_TABLE = ll1_table(first=FIRST, follow=FOLLOW)
+
+
+def main():
+    for name in STATEMENT_GRAMMAR:
+        print(f"{name}")
+        print(f"  FIRST  {sorted(FIRST[name])}")
+        print(f"  FOLLOW {sorted(FOLLOW[name])}")
+        for terminal, production in sorted(LL1_TABLE[name].items()):
+            print(f"    {terminal!r:<16} -> {' '.join(production) or 'ε'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
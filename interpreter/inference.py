@@ -0,0 +1,307 @@
+'''
+Flow-sensitive static type inference for TreeParser ASTs.
+
+Walks each body in execution order, tracking the type every variable
+(and IT) holds at each point: NUMBR, NUMBAR, YARN, TROOF or NOOB, or
+None when it cannot be known statically (GIMMEH'd text parsed as a
+number, function results, branches that disagree, ...). Literals,
+operators, MAEK and IS NOW A all give known types, so each expression
+node gets the type its value will have whenever it runs.
+
+Branches are analysed separately and joined; loop heads are iterated to
+a fixed point. Operations that are certain to fail (NOOB in arithmetic,
+a YARN constant that is not a number) are reported as type errors.
+'''
+
+from runtime import LOLError, CONSTANT_TYPES, node_constant, type_name, to_number
+
+NUMERIC = frozenset(("NUMBR", "NUMBAR"))
+
+ARITHMETIC = frozenset(("SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF"))
+MINMAX = frozenset(("BIGGR OF", "SMALLR OF"))
+BOOLEAN = frozenset(("BOTH SAEM", "DIFFRINT", "BOTH OF", "EITHER OF", "WON OF", "ALL OF", "ANY OF"))
+
+# Type literals MAEK / IS NOW A can produce
+CAST_TYPES = frozenset(("NUMBR", "NUMBAR", "YARN", "TROOF", "NOOB"))
+
+
+# Type state at a point: {name: type}; None for an unreachable point
+def join(a, b):
+    if a is None:
+        return None if b is None else dict(b)
+    if b is None:
+        return dict(a)
+    return {name: (a.get(name) if a.get(name) == b.get(name) else None) for name in a.keys() | b.keys()}
+
+
+class TypeInfo:
+    def __init__(self):
+        self.types = {}             # id(expression node) -> type or None
+        self.errors = []
+
+    def type_of(self, node):
+        '''Inferred type of an expression node, None when unknown.'''
+        return self.types.get(id(node))
+
+    def error(self, message):
+        if message not in self.errors:
+            self.errors.append(message)
+
+
+class TypeInference:
+    def __init__(self):
+        self.info = TypeInfo()
+        self.breaks = []            # per loop / switch: states at its GTFOs
+
+    def infer(self, tree):
+        definitions = []
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            if node.node_type == "FUNC_DEF":
+                definitions.append(node)
+            pending.extend(reversed(node.children))
+
+        for node in tree.children:
+            if node.node_type == "STMT_LIST":
+                self.body(node, {"IT": "NOOB"})
+        for node in definitions:
+            # Arguments can be anything
+            state = {param.value: None for param in node.children[2].children}
+            state["IT"] = "NOOB"
+            self.body(node.children[3].children[0], state)
+        return self.info
+
+    # A whole program or function body; GTFO there ends it
+    def body(self, stmt_list, state):
+        self.breaks.append([])
+        self.statements(stmt_list, state)
+        self.breaks.pop()
+
+    # -------------------------
+    # Statements
+    # -------------------------
+    # Returns the state after the statements (None once unreachable)
+    def statements(self, stmt_list, state):
+        for node in stmt_list.children:
+            if state is None:
+                break
+            state = self.statement(node, state)
+        return state
+
+    def block(self, node, state):
+        return self.statements(node.children[0], dict(state))
+
+    def statement(self, node, state):
+        t = node.node_type
+        if t == "VAR_DEC":
+            state[node.children[0].value] = self.expr(node.children[1], state) if len(node.children) > 1 else "NOOB"
+        elif t == "ASSIGN":
+            state[node.children[0].value] = self.expr(node.children[1], state)
+        elif t == "EXPR_STMT":
+            expr = node.children[0]
+            value = self.expr(expr, state)
+            if not (expr.node_type == "TYPECAST" and expr.children[0].node_type == "VAR"):
+                state["IT"] = value
+        elif t == "FUNC_CALL":
+            state["IT"] = self.expr(node, state)
+        elif t == "PRINT":
+            for expr in node.children[1].children:
+                self.expr(expr, state)
+        elif t == "INPUT":
+            self.expr(node, state)
+        elif t == "IF":
+            return self.conditional(node, state)
+        elif t == "SWITCH":
+            return self.switch(node, state)
+        elif t == "LOOP":
+            return self.loop(node, state)
+        elif t == "RETURN":
+            self.expr(node.children[-1], state)
+            return None
+        elif t == "EXIT":
+            self.breaks[-1].append(dict(state))
+            return None
+        elif t == "EXCEPTION":
+            return self.exception_handling(node, state)
+        return state
+
+    def conditional(self, node, state):
+        out = self.block(node.children[1].children[0], state)
+        for child in node.children[2:]:
+            if child.node_type == "MEBBE":
+                self.expr(child.children[0], state)
+                out = join(out, self.block(child.children[1], state))
+            elif child.node_type == "NO_WAI":
+                return join(out, self.block(child.children[0], state))
+        return join(out, state)
+
+    # Cases fall through into the next one until GTFO
+    def switch(self, node, state):
+        state["IT"] = self.expr(node.children[0], state)
+        self.breaks.append([])
+        out = state
+        previous = None
+        for child in node.children[1:]:
+            if child.node_type in ("CASE", "DEFAULT"):
+                block = child.children[1] if child.node_type == "CASE" else child.children[0]
+                previous = self.block(block, join(state, previous))
+                out = join(out, previous)
+        for exit_state in self.breaks.pop():
+            out = join(out, exit_state)
+        return out
+
+    def loop(self, node, state):
+        var = None
+        condition = None
+        body = None
+        for child in node.children:
+            t = child.node_type
+            if t == "DIRECTION":
+                var = child.children[1].value
+            elif t == "BLOCK":
+                body = child
+            elif t not in ("IMINYR", "LOOP_NAME", "LOOP_END"):
+                condition = child
+
+        head = dict(state)
+        if var is not None and var not in head:
+            head[var] = "NUMBR"     # created as 0 on entry
+        while True:
+            self.breaks.append([])
+            entry = dict(head)
+            if condition is not None:
+                self.expr(condition.children[0] if condition.node_type == "WILE" else condition, entry)
+            end = self.block(body, entry)
+            if end is not None and var is not None:
+                end[var] = self.numeric(end.get(var), node_line(node))
+            breaks = self.breaks.pop()
+            merged = join(head, end)
+            if merged == head:
+                break
+            head = merged
+
+        out = entry
+        for exit_state in breaks:
+            out = join(out, exit_state)
+        return out
+
+    # PLZ: the block may fail at any point, so O NOES starts knowing
+    # nothing about what the block assigns
+    def exception_handling(self, node, state):
+        success = next(child for child in node.children if child.node_type == "SUCCESS")
+        done = self.block(success.children[0], state)
+        assigned = assigned_names(success)
+        recovered = {name: (None if name in assigned else kind) for name, kind in state.items()}
+        for child in node.children:
+            if child.node_type == "FAIL":
+                return join(done, self.block(child.children[0], recovered))
+        return join(done, recovered)
+
+    # -------------------------
+    # Expressions
+    # -------------------------
+    def expr(self, node, state):
+        kind = self.expr_type(node, state)
+        self.info.types[id(node)] = kind
+        return kind
+
+    def expr_type(self, node, state):
+        t = node.node_type
+        if t == "LITERAL" or t in CONSTANT_TYPES:
+            return type_name(node_constant(node))
+        if t == "IDENTIFIER":
+            return state.get(node.value)
+        if t in ("OP", "COMPARISON", "LOGICAL", "SMOOSH"):
+            operands = [self.expr(child, state) for child in node.children]
+            op = node.value
+            if op in BOOLEAN:
+                return "TROOF"
+            if op == "SMOOSH":
+                return "YARN"
+            if op in ARITHMETIC or op in MINMAX:
+                kinds = [self.numeric(kind, node_line(node), child) for kind, child in zip(operands, node.children)]
+                if kinds == ["NUMBR", "NUMBR"]:
+                    return "NUMBR"
+                if "NUMBAR" in kinds and None not in kinds and op in ARITHMETIC:
+                    return "NUMBAR"
+                if kinds == ["NUMBAR", "NUMBAR"]:
+                    return "NUMBAR"
+            return None
+        if t == "NOT":
+            self.expr(node.children[0], state)
+            return "TROOF"
+        if t == "TYPECAST":
+            target = node.children[-1].value
+            if node.children[0].node_type == "VAR":
+                source = state.get(node.children[0].value)
+                subject = node.children[0]
+            else:
+                source = self.expr(node.children[1], state)
+                subject = node.children[1]
+            if target in NUMERIC and source == "YARN":
+                self.numeric(source, node_line(node), subject)     # NOOB casts to 0
+            kind = target if target in CAST_TYPES else None
+            if node.children[0].node_type == "VAR":
+                state[node.children[0].value] = kind
+            return kind
+        if t == "FUNC_CALL":
+            for arg in node.children[2].children:
+                self.expr(arg.children[0], state)
+            return None
+        if t == "INPUT":
+            state[node.children[1].value] = "YARN"
+            return "YARN"
+        return None
+
+    # Type an operand of `kind` has once implicitly cast to a number;
+    # reports the casts that always fail
+    def numeric(self, kind, line, node=None):
+        if kind == "TROOF":
+            return "NUMBR"
+        if kind == "NOOB":
+            self.info.error(f"Line {line}: Type error: cannot implicitly cast NOOB to a number.")
+            return None
+        if kind == "YARN":
+            if node is not None and node.node_type in CONSTANT_TYPES | {"LITERAL"}:
+                try:
+                    return type_name(to_number(node_constant(node)))
+                except LOLError:
+                    self.info.error(f"Line {line}: Type error: YARN {node_constant(node)!r} is not a number.")
+            return None
+        return kind
+
+
+# First line number in a subtree (operator nodes often have none)
+def node_line(root):
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        if node.line is not None:
+            return node.line
+        pending.extend(reversed(node.children))
+    return None
+
+
+# Names a statement tree can assign (IT included), for PLZ recovery
+def assigned_names(root):
+    names = {"IT"}
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        t = node.node_type
+        if t in ("VAR_DEC", "ASSIGN"):
+            names.add(node.children[0].value)
+        elif t == "INPUT":
+            names.add(node.children[1].value)
+        elif t == "TYPECAST" and node.children[0].node_type == "VAR":
+            names.add(node.children[0].value)
+        elif t == "DIRECTION":
+            names.add(node.children[1].value)
+        pending.extend(node.children)
+    return names
+
+
+def infer_types(tree):
+    '''Infer the type of every expression of a TreeParser AST; returns a TypeInfo.'''
+    return TypeInference().infer(tree)
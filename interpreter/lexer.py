@@ -1,136 +1,263 @@
 import re
 
-# Define token types with readable names
-token_specs = [
-    # COMMENT
-    ("COMMENT", r"BTW[^\n]*"),                    # single-line
-    ("COMMENT_MULTI", r"OBTW[\s\S]*?TLDR"),       # multi-line
-
+# -----------------------------
+# KEYWORDS
+# -----------------------------
+# Every keyword is a phrase of one or more words. The scanner reads a whole
+# word first and then walks this table (as a trie) to find the longest
+# keyword phrase, so e.g. "R" never matches the start of "RESULT".
+keyword_specs = [
     # CODE DELIMITER
-    ("CODE_DELIMITER", r"HAI|KTHXBYE"),
+    ("CODE_DELIMITER", ["HAI", "KTHXBYE"]),
 
     # VARIABLE LIST DELIMITER
-    ("VAR_LIST_DELIMITER", r"WAZZUP|BUHBYE"),
+    ("VAR_LIST_DELIMITER", ["WAZZUP", "BUHBYE"]),
 
     # VARIABLE DECLARATION
-    ("VAR_DECLARATION", r"I HAS A"),
+    ("VAR_DECLARATION", ["I HAS A"]),
 
     # VARIABLE ASSIGNMENT
-    ("VAR_ASSIGNMENT", r"ITZ|R"),
+    ("VAR_ASSIGNMENT", ["ITZ", "R"]),
 
     # OUTPUT KEYWORD
-    ("OUTPUT_KEYWORD", r"VISIBLE|INVISIBLE"),
+    ("OUTPUT_KEYWORD", ["VISIBLE", "INVISIBLE"]),
 
     # ARITHMETIC OPERATORS
-    ("ARITHMETIC_OPERATOR", r"SUM OF|DIFF OF|PRODUKT OF|QUOSHUNT OF|MOD OF"),
+    ("ARITHMETIC_OPERATOR", ["SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF"]),
 
     # COMPARISON OPERATORS
-    ("COMPARISON_OPERATOR", r"BIGGR OF|SMALLR OF|BOTH_SAEM|DIFFRINT"),
+    ("COMPARISON_OPERATOR", ["BIGGR OF", "SMALLR OF", "BOTH SAEM", "DIFFRINT"]),
 
     # LOGICAL OPERATORS
-    ("LOGICAL_OPERATOR", r"BOTH OF|EITHER OF|WON OF|NOT|ANY|OF|ALL OF"),
-
-    # CONTROL FLOW
-    ("CONTROL_FLOW", r"O RLY?|YA RLY|MEBBE|NO WAI|OIC|WTF|OMG|OMGWTF|AWSUM THX|O NOES|PLZ|KTHNX|GTFO|FOUND YR"),
-    ("ORLY", r"O RLY\?"),
-    ("YARLY", r"YA RLY"),
-    ("MEBBE", r"MEBBE"),
-    ("NOWAI", r"NO WAI"),
-    ("OIC", r"OIC"),
+    ("LOGICAL_OPERATOR", ["BOTH OF", "EITHER OF", "WON OF", "NOT", "ANY", "OF", "ALL OF", "ANY OF"]),
 
-    # SWITCH/CASE
-    ("WTF", r"WTF\?"),
-    ("OMG", r"OMG"),
-    ("OMGWTF", r"OMGWTF"),
+    # CONTROL FLOW, SWITCH/CASE, EXCEPTION HANDLING, RETURN / EXIT
+    ("CONTROL_FLOW", ["O RLY?", "YA RLY", "MEBBE", "NO WAI", "OIC", "WTF?", "OMG", "OMGWTF",
+                      "AWSUM THX", "O NOES", "PLZ", "KTHNX", "KTHX", "GTFO", "FOUND YR"]),
 
     # LOOPING
-    ("LOOPING", r"\bIM IN YR\b|\bUPPIN\b|\bNERFIN\b|\bYR\b|\bTIL\b|\bWILE\b|\bIM OUTTA YR\b"),
-    ("IMINYR", r"IM IN YR"),
-    ("IMOUTTAYR", r"IM OUTTA YR"),
-    ("UPPIN", r"UPPIN"),
-    ("NERFIN", r"NERFIN"),
-    ("TIL", r"TIL"),
+    ("LOOPING", ["IM IN YR", "UPPIN", "NERFIN", "YR", "TIL", "WILE", "IM OUTTA YR"]),
 
     # FUNCTION DEFINITION AND CALL
-    ("FUNCTION_DEF_CALL", r"HOW IZ I|IF U SAY SO|I IZ|MKAY"),
-    ("HOWIZI", r"HOW IZ I"),
-    ("IIZ", r"I IZ"),
-    ("MKAY", r"MKAY"),
-    ("IFUSAYSO", r"IF U SAY SO"),
+    ("FUNCTION_DEF_CALL", ["HOW IZ I", "IF U SAY SO", "I IZ", "MKAY"]),
 
     # MULTIPLE PARAM SEPARATOR
-    ("MULTI_PARAM_SEPARATOR", r"AN"),
+    ("MULTI_PARAM_SEPARATOR", ["AN"]),
 
     # INPUT AND OUTPUT
-    ("IO", r"GIMMEH"),
+    ("IO", ["GIMMEH"]),
 
     # TYPE AND CASTING
-    ("MAEK", r"\bMAEK\b"),
-    ("A", r"\bA\b"),
-    ("IS_NOW_A", r"\bIS NOW A\b"),
-    ("TYPE_LITERAL", r"\b(?:NUMBR|NUMBAR|YARN|TROOF|NOOB)\b"),
+    ("MAEK", ["MAEK"]),
+    ("A", ["A"]),
+    ("IS_NOW_A", ["IS NOW A"]),
+    ("TYPE_LITERAL", ["NUMBR", "NUMBAR", "YARN", "TROOF", "NOOB"]),
 
     # RESERVED IDENTIFIERS
-    ("SMOOSH", r"\bSMOOSH\b"),
+    ("SMOOSH", ["SMOOSH"]),
 
-    # LITERALS
-    ("FLOAT_LITERAL", r"-?\d+\.\d+"),   # NUMBAR_LITERAL 
-    ("INT_LITERAL", r"-?\d+"),          # NUMBR_LITERAL  
-    ("STRING", r'"[^"\n]*"'),           # YARN_LITERAL
+    # TROOF LITERALS
+    ("BOOL_TRUE", ["WIN"]),
+    ("BOOL_FALSE", ["FAIL"]),
 
-    ("BOOL_TRUE", r"WIN"),              # TROOF LITERAL
-    ("BOOL_FALSE", r"FAIL"),
+    # COMMENTS (the comment body is consumed by the scanner)
+    ("COMMENT", ["BTW"]),
+    ("COMMENT_MULTI", ["OBTW"]),
+]
 
-    # IDENTIFIER: FUNCIDENT, LOOPIDENT, VARIDENT
-    ("IDENTIFIER", r"[A-Za-z][A-Za-z0-9_]*"),
+# Key under which a trie node stores its (kind, phrase) when a keyword ends there
+KEYWORD_END = None
+
+# Words are stored as str, or as bytes when an `encoding` is given
+def build_keyword_trie(specs, encoding=None):
+    trie = {}
+    for kind, phrases in specs:
+        for phrase in phrases:
+            node = trie
+            for word in phrase.split(" "):
+                if encoding:
+                    word = word.encode(encoding)
+                node = node.setdefault(word, {})
+            node[KEYWORD_END] = (kind, phrase)
+    return trie
+
+keyword_trie = build_keyword_trie(keyword_specs)
+
+# One token-sized chunk of source: leading blanks, then a word, number,
+# string, newline or a single stray character (stray characters are skipped).
+atom_regex = re.compile(r"""
+    [ \t\r]*
+    (?:
+        (?P<WORD>[A-Za-z][A-Za-z0-9_]*)
+      | (?P<NUMBER>-?\d+(?:\.\d+)?)
+      | (?P<STRING>"[^"\n]*")
+      | (?P<NEWLINE>\n)
+      | (?P<OTHER>.)
+    )
+""", re.VERBOSE)
+
+# The next word of a multi-word keyword (same line only)
+next_word_regex = re.compile(r"[ \t]+([A-Za-z][A-Za-z0-9_]*)")
+
+
+def match_keyword(code, word, end, trie=keyword_trie, word_regex=next_word_regex, question="?"):
+    '''
+    Longest keyword phrase starting with `word` (which ends at `end`).
+    Returns (kind, phrase, end) or None when `word` does not start a keyword.
+    `code` may be str or bytes-like, with a matching trie, regex and "?".
+    '''
+    if code[end:end + 1] == question and word + question in trie:
+        word += question
+        end += 1
+    node = trie.get(word)
+    if node is None:
+        return None
+    best = node.get(KEYWORD_END)
+    best_end = end
+
+    while len(node) > (KEYWORD_END in node):
+        m = word_regex.match(code, end)
+        if m is None:
+            break
+        word = m.group(1)
+        end = m.end()
+        if code[end:end + 1] == question and word + question in node:
+            word += question
+            end += 1
+        node = node.get(word)
+        if node is None:
+            break
+        if KEYWORD_END in node:
+            best = node[KEYWORD_END]
+            best_end = end
+
+    if best is None:
+        return None
+    return best[0], best[1], best_end
+
+
+# Tables the scanner reads a str source with:
+# (keyword trie, atom regex, next word regex, "?", newline, ".", "TLDR")
+STR_SYNTAX = (keyword_trie, atom_regex, next_word_regex, "?", "\n", ".", "TLDR")
+
+# Scanner shared by tokenize(), iter_tokens() and token_stream.TokenStream.
+# Scans `code` (which must end on a line boundary unless `final` is set) and
+# yields tokens. When not `final`, it stops in front of an OBTW whose TLDR has
+# not been read yet. Returns (position, line number, line start) where
+# scanning stopped; `line_start` may be negative when resuming mid-line.
+# With BYTES_SYNTAX, `code` is bytes-like and so are the token values that
+# are source text (columns then count bytes).
+def scan_tokens(code, line_num=1, final=True, line_start=0, syntax=STR_SYNTAX):
+    trie, atoms, next_word, question, newline, dot, tldr_word = syntax
+    pos = 0
+    length = len(code)
+
+    while pos < length:
+        m = atoms.match(code, pos)
+        if m is None:           # only trailing blanks left
+            pos = length
+            break
+        kind = m.lastgroup
+        start = m.start(kind)
+        end = m.end()
 
-    # RETURN / EXIT
-    ("RETURN_KEYWORD", r"FOUND"),
-    ("YR", r"YR"),
-    ("EXIT_KEYWORD", r"GTFO"),
+        # Track newlines for correct line/column numbers
+        if kind == "NEWLINE":
+            line_num += 1
+            line_start = pos = end
+            continue
 
-    # EXCEPTION HANDLING
-    ("PLZ", r"PLZ"),
-    ("AWSUMTHX", r"AWSUM THX"),
-    ("ONOES", r"O NOES"),
-    ("KTHX", r"KTHX"),
+        # Skip characters that do not start any token
+        if kind == "OTHER":
+            pos = end
+            continue
 
-    # OTHERS
-    ("NEWLINE", r"\n"),
-    ("WHITESPACE", r"[ \t\r]+"),
-]
+        # Column calculation
+        col_num = start - line_start + 1
 
-# Build regex
-token_regex = "|".join(f"(?P<{name}>{pattern})" for name, pattern in token_specs)
+        if kind == "WORD":
+            keyword = match_keyword(code, m.group(kind), end, trie, next_word, question)
+            if keyword is None:
+                pos = end
+                yield ("IDENTIFIER", m.group(kind), line_num, col_num)
+                continue
+            kind, value, end = keyword
+
+            # Keep comments in tokens
+            if kind == "COMMENT":
+                eol = code.find(newline, end)
+                end = length if eol == -1 else eol
+                value = code[start:end]
+            elif kind == "COMMENT_MULTI":
+                tldr = code.find(tldr_word, end)
+                if tldr == -1 and not final:
+                    return start, line_num, line_start     # wait for more input
+                end = length if tldr == -1 else tldr + 4
+                value = code[start:end]
+                pos = end
+                yield (kind, value, line_num, col_num)
+                newlines = value.count(newline)
+                if newlines:
+                    line_num += newlines
+                    line_start = code.rfind(newline, start, end) + 1
+                continue
+
+            pos = end
+            yield (kind, value, line_num, col_num)
+
+        elif kind == "NUMBER":
+            value = m.group(kind)
+            pos = end
+            yield ("FLOAT_LITERAL" if dot in value else "INT_LITERAL", value, line_num, col_num)
+
+        else:
+            pos = end
+            yield (kind, m.group(kind), line_num, col_num)
+
+    return pos, line_num, line_start
 
 # Tokenizer
 def tokenize(code):
-    tokens = []
+    return list(scan_tokens(code))
+
+# -----------------------------
+# STREAMING TOKENIZER
+# -----------------------------
+# Reads `fileobj` in chunks and yields tokens lazily. Only whole lines are
+# scanned, so multi-word keywords never straddle a chunk boundary, and an
+# OBTW ... TLDR comment is held back until its TLDR has been read.
+def iter_tokens(fileobj, chunk_size=1 << 16):
+    buffer = ""
     line_num = 1
     line_start = 0
 
-    for match in re.finditer(token_regex, code):
-        kind = match.lastgroup
-        value = match.group()
-        start = match.start()
+    while True:
+        chunk = fileobj.read(chunk_size)
+        final = not chunk
+        buffer += chunk
 
-        # Track newlines for correct line/column numbers
-        if kind == "NEWLINE":
-            line_num += 1
-            line_start = match.end()
-            continue
+        if final:
+            cut = len(buffer)
+        else:
+            cut = buffer.rfind("\n") + 1
+            if cut == 0:
+                continue
 
-        # Skip whitespace only
-        if kind == "WHITESPACE":
-            continue
-
-        # Column calculation
-        col_num = start - line_start + 1
+        pos, line_num, line_start = yield from scan_tokens(buffer[:cut], line_num, final, line_start)
+        buffer = buffer[pos:]
+        line_start -= pos
 
-        # Keep comments in tokens
-        tokens.append((kind, value, line_num, col_num))
+        if final:
+            return
 
-    return tokens
+# -----------------------------
+# BYTES SCANNER TABLES (see token_stream.TokenStream)
+# -----------------------------
+keyword_trie_bytes = build_keyword_trie(keyword_specs, "ascii")
+atom_regex_bytes = re.compile(atom_regex.pattern.encode(), re.VERBOSE)
+next_word_regex_bytes = re.compile(next_word_regex.pattern.encode())
+non_ascii_regex = re.compile(rb"[\x80-\xff]")
+BYTES_SYNTAX = (keyword_trie_bytes, atom_regex_bytes, next_word_regex_bytes, b"?", b"\n", b".", b"TLDR")
 
 # -----------------------------
 # FILTER TOKENS (optional)
@@ -1,7 +1,6 @@
-from lexer import tokenize
-from parser import Parser, ParserError
-from semantic_analyzer import analyze_semantics
-from tree_parser import TreeParser      # Tree building parser
+from compilation import CompilationUnit  # Lexes and parses once for every phase
+from tree_semantic import analyze_unit
+from tree_node import write_tree
 
 token_labels = {
     "CODE_DELIMITER": "Code Delimiter",
@@ -37,34 +36,40 @@ def print_tokens(tokens):
 def main():
     filename = "../lol_files/06_comparison.lol"
 
-    # === READ FILE ===
-    with open(filename, "r") as f:
-        code = f.read()
-    tokens = tokenize(code)
+    # === OPEN FILE (tokens are streamed from disk, never read whole) ===
+    unit = CompilationUnit.from_file(filename)
 
     # === LEXICAL ANALYSIS ===
     print("=== LEXICAL ANALYSIS ===")
-    print_tokens(tokens)
+    print_tokens(unit.stream_tokens())
     
     # === SYNTAX ANALYSIS ===
     print("\n=== SYNTAX ANALYSIS / PARSE TREE ===")
-    tp = TreeParser(tokens)
-    tree = tp.parse_program()
+    tree = unit.tree
 
-    if tp.errors:
+    if unit.syntax_errors:
         print("Parsing completed with errors:")
-        for e in tp.errors:
+        for e in unit.syntax_errors:
             print("-", e)
     else:
         print("Parsing completed successfully! ✅")
 
     # Print parse tree anyway (useful to visualize partial AST)
     print("\nParse Tree:")
-    print(tree.pretty())
+    if tree is not None:
+        write_tree(tree)
+    print()
         
     # === SEMANTIC ANALYSIS ===
     print("\n=== SEMANTIC ANALYSIS ===")
-    analyze_semantics(filename)
+    warnings = []
+    errors, symbols = analyze_unit(unit, warnings)
+    for message in errors + warnings:
+        print("-", message)
+    if not errors:
+        print("No semantic errors found.")
+    for name, value in symbols.items():
+        print(f"{name} = {value!r}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
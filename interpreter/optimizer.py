@@ -0,0 +1,603 @@
+'''
+AST optimization passes, run between TreeParser.parse_program and
+semantic analysis or execution.
+
+Passes rewrite TreeNode trees in place (ArenaNode views build their
+children lists on the fly, so they cannot be rewritten this way).
+'''
+
+from tree_node import TreeNode
+from runtime import (
+    LOLError, CONSTANT_TYPES, decode_literal, node_constant, cast, type_name, to_yarn, lol_not,
+    BINARY_OPS, VARIADIC_OPS,
+)
+from resolver import resolve, declared_names, DEFINITE
+from inference import infer_types, assigned_names, node_line
+
+FOLDABLE_TYPES = frozenset(("OP", "COMPARISON", "LOGICAL", "SMOOSH", "NOT", "TYPECAST"))
+
+
+# -------------------------
+# Constant folding
+# -------------------------
+def make_constant(value, line):
+    return TreeNode(type_name(value), value, line)
+
+# Value of a foldable node whose operands are all constants, or raises
+# LOLError when it cannot be folded (the error is left for run time)
+def fold_value(node):
+    t = node.node_type
+    if t == "NOT":
+        return lol_not(node.children[0].value)
+    if t == "TYPECAST":
+        # MAEK <expr> A <type>; IS NOW A stores into a variable, so never folds
+        if node.children[0].node_type != "MAEK" or node.children[1].node_type not in CONSTANT_TYPES:
+            raise LOLError("not a constant cast")
+        return cast(node.children[1].value, node.children[-1].value)
+    values = [child.value for child in node.children]
+    function = BINARY_OPS.get(node.value)
+    if function is not None:
+        if len(values) != 2:
+            raise LOLError("wrong operand count")
+        return function(*values)
+    # UPPIN/NERFIN are OP nodes too, without operands
+    if node.value not in VARIADIC_OPS or not values:
+        raise LOLError("not a constant operator")
+    return VARIADIC_OPS[node.value](*values)
+
+def fold_constants(tree):
+    '''
+    Decode every LITERAL into a typed constant node (NUMBR, NUMBAR, YARN
+    with escapes resolved, TROOF) and replace constant OP, COMPARISON,
+    LOGICAL, SMOOSH, NOT and MAEK subtrees by their value. Expressions that
+    would fail (QUOSHUNT OF 1 AN 0, ...) are left to fail at run time.
+    Returns counts of decoded literals, folded subtrees and eliminated nodes.
+    '''
+    stats = {"literals": 0, "folded": 0, "eliminated": 0}
+
+    # Pre-order list with each node's place in its parent; walking it
+    # backwards visits children before their parents
+    order = []
+    pending = [(tree, None, 0)]
+    while pending:
+        entry = pending.pop()
+        order.append(entry)
+        node = entry[0]
+        for i in range(len(node.children) - 1, -1, -1):
+            pending.append((node.children[i], node, i))
+
+    for node, parent, index in reversed(order):
+        t = node.node_type
+        if t == "LITERAL":
+            replacement = make_constant(decode_literal(node.value), node.line)
+            stats["literals"] += 1
+        elif t in FOLDABLE_TYPES and all(
+                child.node_type in CONSTANT_TYPES or child.node_type in ("MAEK", "TYPE")
+                for child in node.children):
+            try:
+                value = fold_value(node)
+            except LOLError:
+                continue
+            if value is None:
+                continue
+            line = node.line
+            if line is None:
+                line = next((child.line for child in node.children if child.line is not None), None)
+            replacement = make_constant(value, line)
+            stats["folded"] += 1
+            stats["eliminated"] += len(node.children)
+        else:
+            continue
+        if parent is not None:      # the root is a PROG, never an expression
+            parent.children[index] = replacement
+    return stats
+
+
+# -------------------------
+# Passes over pure expressions
+# -------------------------
+# Operators that cannot fail on any operands
+TOTAL_OPS = frozenset(("BOTH SAEM", "DIFFRINT", "BOTH OF", "EITHER OF", "WON OF", "ALL OF", "ANY OF", "SMOOSH"))
+# Operators that cannot fail on NUMBR/NUMBAR/TROOF operands
+NUMERIC_OPS = frozenset(("SUM OF", "DIFF OF", "PRODUKT OF", "BIGGR OF", "SMALLR OF"))
+NUMBER_TYPES = frozenset(("NUMBR", "NUMBAR", "TROOF"))
+
+
+# Pre-order nodes of a tree, without recursion
+def iter_tree(root):
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        yield node
+        pending.extend(reversed(node.children))
+
+
+# Shared by passes that store expression values in new variables. These
+# temporaries are named with a leading underscore, which no LOLCODE
+# identifier can have
+class ExpressionPass:
+    def __init__(self, tree, prefix=None):
+        self.resolution = resolve(tree)
+        self.types = infer_types(tree)
+        self.temps = {}         # id(temporary IDENTIFIER) -> type of its value
+        self.prefix = prefix
+        # Continue the numbering of an earlier run over the same tree
+        self.count = 0 if prefix is None else 1 + max(
+            (int(node.value[len(prefix):]) for node in iter_tree(tree)
+             if node.node_type == "IDENTIFIER" and node.value.startswith(prefix)), default=-1)
+
+    def type_of(self, node):
+        if id(node) in self.temps:
+            return self.temps[id(node)]
+        return self.types.type_of(node)
+
+    # No side effects, and reads only variables certainly declared there
+    # (and not in `written`)
+    def pure(self, node, written=()):
+        t = node.node_type
+        if t == "LITERAL" or t in CONSTANT_TYPES:
+            return True
+        if t == "IDENTIFIER":
+            if node.value in written:
+                return False
+            ref = self.resolution.refs.get(id(node))
+            return id(node) in self.temps or (ref is not None and ref[1] == DEFINITE)
+        if t in ("OP", "COMPARISON", "LOGICAL", "SMOOSH", "NOT") or (t == "TYPECAST" and node.children[0].node_type == "MAEK"):
+            return all(child.node_type in ("MAEK", "TYPE") or self.pure(child, written) for child in node.children)
+        return False        # function calls, GIMMEH, IS NOW A
+
+    # Evaluating it cannot raise, so it can be moved to run earlier
+    def total(self, node):
+        t = node.node_type
+        if t in ("LITERAL", "IDENTIFIER") or t in CONSTANT_TYPES:
+            return True
+        if t == "NOT":
+            return self.total(node.children[0])
+        if t == "TYPECAST":
+            source = node.children[1]
+            if node.children[-1].value in ("NUMBR", "NUMBAR") and self.type_of(source) not in NUMBER_TYPES | {"NOOB"}:
+                return False
+            return self.total(source)
+        if not all(self.total(child) for child in node.children):
+            return False
+        op = node.value
+        if op in TOTAL_OPS:
+            return op in VARIADIC_OPS or len(node.children) == 2
+        if len(node.children) != 2 or any(self.type_of(child) not in NUMBER_TYPES for child in node.children):
+            return False
+        if op in NUMERIC_OPS:
+            return True
+        if op in ("QUOSHUNT OF", "MOD OF"):
+            divisor = node.children[1]
+            return (divisor.node_type == "LITERAL" or divisor.node_type in CONSTANT_TYPES) and node_constant(divisor) != 0
+        return False
+
+    # An operator expression over variables worth keeping in a temporary
+    def candidate(self, node, written=()):
+        t = node.node_type
+        return t in FOLDABLE_TYPES and not (t == "TYPECAST" and node.children[0].node_type == "VAR") \
+            and self.pure(node, written) and self.total(node) \
+            and any(leaf.node_type == "IDENTIFIER" for leaf in iter_tree(node))
+
+    # I HAS A <new temporary> ITZ <expr>; returns (declaration, name)
+    def temporary(self, expr):
+        name = f"{self.prefix}{self.count}"
+        self.count += 1
+        declaration = TreeNode("VAR_DEC", None, expr.line)
+        declaration.add(self.reference(name, expr))
+        declaration.add(expr)
+        return declaration, name
+
+    # New IDENTIFIER reading a temporary holding `expr`
+    def reference(self, name, expr):
+        node = TreeNode("IDENTIFIER", name, expr.line)
+        self.temps[id(node)] = self.type_of(expr)
+        return node
+
+
+# -------------------------
+# Loop-invariant code motion
+# -------------------------
+class InvariantHoister(ExpressionPass):
+    def __init__(self, tree):
+        super().__init__(tree, "_invariant")
+        self.stats = {"loops": 0, "hoisted": 0}
+
+    # Replace the invariant subexpressions under `node` by temporaries,
+    # declared in `preheader`
+    def hoist(self, node, written, preheader):
+        for i, child in enumerate(node.children):
+            if self.candidate(child, written):
+                declaration, name = self.temporary(child)
+                preheader.append(declaration)
+                node.children[i] = self.reference(name, child)
+                self.stats["hoisted"] += 1
+            elif child.node_type not in ("FUNC_DEF", "DIRECTION"):
+                self.hoist(child, written, preheader)
+
+    def loop(self, node):
+        written = assigned_names(node)
+        preheader = []
+        # Temporaries an inner loop hoisted into this body move out whole
+        # when their value is invariant here too
+        for child in node.children:
+            if child.node_type == "BLOCK":
+                body = child.children[0]
+                kept = []
+                for statement in body.children:
+                    if statement.node_type == "VAR_DEC" and statement.children[0].value.startswith(self.prefix) \
+                            and self.pure(statement.children[1], written - {statement.children[0].value}):
+                        preheader.append(statement)
+                        written = written - {statement.children[0].value}
+                    else:
+                        kept.append(statement)
+                body.children[:] = kept
+        for child in node.children:
+            if child.node_type not in ("IMINYR", "LOOP_NAME", "DIRECTION", "LOOP_END"):
+                self.hoist(child, written, preheader)
+        self.stats["loops"] += 1
+        return preheader
+
+    def run(self, tree):
+        # Innermost loops first: what they hoist lands in the enclosing
+        # body, where the enclosing loop can hoist it further
+        lists = [node for node in iter_tree(tree) if node.node_type == "STMT_LIST"]
+        for stmt_list in reversed(lists):
+            statements = []
+            for statement in stmt_list.children:
+                if statement.node_type == "LOOP":
+                    statements.extend(self.loop(statement))
+                statements.append(statement)
+            stmt_list.children[:] = statements
+        return self.stats
+
+def hoist_invariants(tree):
+    '''
+    Move loop-invariant subexpressions of IM IN YR loops (operands that
+    the loop, GIMMEH and I IZ calls included, never writes) into
+    temporaries declared just before the loop. Only expressions that can
+    never fail are moved, so a loop that runs zero times, or fails
+    part-way, behaves the same. Returns counts of loops and hoisted
+    expressions.
+    '''
+    return InvariantHoister(tree).run(tree)
+
+
+# -------------------------
+# Local value numbering
+# -------------------------
+# Statements whose expressions all run before anything they write
+NUMBERED_STATEMENTS = frozenset(("VAR_DEC", "ASSIGN", "PRINT", "EXPR_STMT", "FUNC_CALL", "RETURN"))
+
+
+class ValueNumbering(ExpressionPass):
+    def __init__(self, tree):
+        super().__init__(tree, "_value")
+        self.stats = {"blocks": 0, "temporaries": 0, "eliminated": 0}
+
+    # Value number of an expression: its structure, with each variable
+    # tagged by how many times it has been written so far in the block
+    def key(self, node, versions):
+        t = node.node_type
+        if t == "LITERAL" or t in CONSTANT_TYPES:
+            value = node_constant(node)
+            return (type_name(value), value)
+        if t == "IDENTIFIER":
+            return (t, node.value, versions.get(node.value, 0))
+        return (t, node.value) + tuple(self.key(child, versions) for child in node.children)
+
+    def block(self, stmt_list):
+        # Number every candidate expression, statement by statement
+        keys = {}           # id(node) -> value number
+        counts = {}
+        versions = {}
+        for statement in stmt_list.children:
+            nodes = list(iter_tree(statement))
+            if statement.node_type in NUMBERED_STATEMENTS and not any(
+                    node.node_type == "INPUT" or (node.node_type == "TYPECAST" and node.children[0].node_type == "VAR")
+                    for node in nodes):
+                for node in nodes:
+                    if self.candidate(node):
+                        key = keys[id(node)] = self.key(node, versions)
+                        counts[key] = counts.get(key, 0) + 1
+            for name in assigned_names(statement):
+                versions[name] = versions.get(name, 0) + 1
+
+        # Occurrences left once repeats are replaced: only the first
+        # occurrence of a repeated value still evaluates its operands
+        exposed = {}
+        seen = set()
+        pending = list(reversed(stmt_list.children))
+        while pending:
+            node = pending.pop()
+            key = keys.get(id(node))
+            if key is not None and counts[key] > 1:
+                exposed[key] = exposed.get(key, 0) + 1
+                if key in seen:
+                    continue
+                seen.add(key)
+            pending.extend(reversed(node.children))
+
+        shared = {key for key, count in exposed.items() if count > 1}
+        if not shared:
+            return
+        names = {}          # value number -> temporary holding it
+        statements = []
+        for statement in stmt_list.children:
+            self.replace(statement, keys, shared, names, statements)
+            statements.append(statement)
+        stmt_list.children[:] = statements
+        self.stats["blocks"] += 1
+
+    # Replace repeated values under `node` by their temporaries, adding
+    # the declarations of new ones to `statements`
+    def replace(self, node, keys, shared, names, statements):
+        for i, child in enumerate(node.children):
+            key = keys.get(id(child))
+            if key not in shared:
+                self.replace(child, keys, shared, names, statements)
+            elif key in names:
+                node.children[i] = self.reference(names[key], child)
+                self.stats["eliminated"] += 1
+            else:
+                self.replace(child, keys, shared, names, statements)
+                declaration, names[key] = self.temporary(child)
+                statements.append(declaration)
+                node.children[i] = self.reference(names[key], child)
+                self.stats["temporaries"] += 1
+
+    def run(self, tree):
+        for stmt_list in [node for node in iter_tree(tree) if node.node_type == "STMT_LIST"]:
+            self.block(stmt_list)
+        return self.stats
+
+def number_values(tree):
+    '''
+    Local value numbering: within each statement list, an operator
+    expression repeated with the same operands (no operand variable
+    written in between) is computed once into a temporary, declared
+    before the statement where it first appears, and the repeats read
+    the temporary. Only expressions that can never fail are shared.
+    Returns counts of blocks changed, temporaries and eliminated
+    evaluations.
+    '''
+    return ValueNumbering(tree).run(tree)
+
+
+# -------------------------
+# Dead code elimination
+# -------------------------
+# Statement lists directly inside a statement (its blocks)
+def child_lists(statement):
+    lists = []
+    pending = list(statement.children)
+    while pending:
+        node = pending.pop()
+        if node.node_type == "STMT_LIST":
+            lists.append(node)
+        else:
+            pending.extend(node.children)
+    return lists
+
+# Control never reaches the statement after it
+def terminates(statement):
+    t = statement.node_type
+    if t in ("RETURN", "EXIT"):
+        return True
+    if t != "IF" or statement.children[-2].node_type != "NO_WAI":
+        return False
+    return all(stmt_list.children and terminates(stmt_list.children[-1]) for stmt_list in child_lists(statement))
+
+def is_constant(node):
+    return node.node_type == "LITERAL" or node.node_type in CONSTANT_TYPES
+
+# Variables an expression (or statement) reads
+def reads(root):
+    names = set()
+    for node in iter_tree(root):
+        if node.node_type == "IDENTIFIER" or (node.node_type == "TYPECAST" and node.children[0].node_type == "VAR"):
+            names.add(node.value if node.node_type == "IDENTIFIER" else node.children[0].value)
+    return names
+
+
+class DeadCodeEliminator(ExpressionPass):
+    def __init__(self, tree, warnings):
+        super().__init__(tree)
+        self.warnings = warnings
+        self.stats = {"unreachable": 0, "branches": 0, "dead_stores": 0, "nodes": 0}
+        self.breaks = []            # live variables where each GTFO goes
+        self.extra = [set()]        # live at every point: an O NOES may take over
+        self.returns = set()        # live where FOUND YR goes
+
+    def warn(self, node, message):
+        self.warnings.append(f"Line {node_line(node)}: Warning: {message}")
+
+    # -------------------------
+    # Unreachable statements and constant O RLY?
+    # -------------------------
+    # Statements an O RLY? runs when IT is the constant `value`, or None
+    # when a MEBBE condition is not constant
+    def taken_branch(self, node, value):
+        if value:
+            return node.children[1].children[0].children[0].children
+        for child in node.children[2:]:
+            if child.node_type == "MEBBE":
+                if not is_constant(child.children[0]):
+                    return None
+                if node_constant(child.children[0]):
+                    return child.children[1].children[0].children
+            elif child.node_type == "NO_WAI":
+                return child.children[0].children[0].children
+        return []
+
+    def prune(self, stmt_list):
+        kept = []
+        pending = list(reversed(stmt_list.children))
+        while pending:
+            statement = pending.pop()
+            for nested in child_lists(statement):
+                self.prune(nested)
+            if statement.node_type == "IF" and kept and kept[-1].node_type == "EXPR_STMT" \
+                    and is_constant(kept[-1].children[0]):
+                value = node_constant(kept[-1].children[0])
+                taken = self.taken_branch(statement, value)
+                if taken is not None:
+                    self.warn(statement, f"O RLY? on a constant IT ({to_yarn(value)}), only one branch can run")
+                    self.stats["branches"] += 1
+                    pending.extend(reversed(taken))
+                    continue
+            kept.append(statement)
+            if terminates(statement) and pending:
+                # HOW IZ I definitions are hoisted, so they stay
+                dead = [node for node in pending if node.node_type != "FUNC_DEF"]
+                if dead:
+                    self.warn(dead[-1], f"unreachable code after {'GTFO' if statement.node_type == 'EXIT' else 'FOUND YR'}")
+                    self.stats["unreachable"] += len(dead)
+                kept.extend(node for node in reversed(pending) if node.node_type == "FUNC_DEF")
+                break
+        stmt_list.children[:] = kept
+
+    # -------------------------
+    # Dead stores
+    # -------------------------
+    def removable(self, expr):
+        return self.pure(expr) and self.total(expr)
+
+    # Live variables before the statements, given those live after;
+    # with `remove`, dead stores are dropped along the way
+    def statements(self, stmt_list, live, remove):
+        kept = []
+        for statement in reversed(stmt_list.children):
+            live, keep = self.statement(statement, live, remove)
+            live = live | self.extra[-1]
+            if keep:
+                kept.append(statement)
+        if remove:
+            stmt_list.children[:] = reversed(kept)
+        return live
+
+    def statement(self, node, live, remove):
+        t = node.node_type
+        if t == "VAR_DEC":
+            name = node.children[0].value
+            if len(node.children) > 1 and name not in live and self.removable(node.children[1]):
+                if remove:
+                    del node.children[1:]       # I HAS A <name> alone declares it NOOB
+                    self.stats["dead_stores"] += 1
+                return live - {name}, True
+            return (live - {name}) | reads(node), True
+        if t == "ASSIGN":
+            target, expr = node.children
+            if target.value not in live and self.removable(expr) and self.resolution.ref(target)[1] == DEFINITE:
+                if remove:
+                    self.stats["dead_stores"] += 1
+                return live, False
+            return (live - {target.value}) | reads(expr), True
+        if t == "EXPR_STMT":
+            expr = node.children[0]
+            if expr.node_type == "TYPECAST" and expr.children[0].node_type == "VAR":
+                return live | reads(expr), True
+            if "IT" not in live and self.removable(expr):
+                if remove:
+                    self.stats["dead_stores"] += 1
+                return live, False
+            return (live - {"IT"}) | reads(expr), True
+        if t == "FUNC_CALL":
+            return (live - {"IT"}) | reads(node), True
+        if t == "INPUT":
+            return live - {node.children[1].value}, True
+        if t == "PRINT":
+            return live | reads(node), True
+        if t == "RETURN":
+            return self.returns | reads(node), True
+        if t == "EXIT":
+            return set(self.breaks[-1]), True
+        if t == "IF":
+            rest = live
+            for child in reversed(node.children[2:]):
+                if child.node_type == "NO_WAI":
+                    rest = self.statements(child.children[0].children[0], live, remove)
+                elif child.node_type == "MEBBE":
+                    rest = rest | reads(child.children[0]) | self.statements(child.children[1].children[0], live, remove)
+            return {"IT"} | self.statements(node.children[1].children[0].children[0], live, remove) | rest, True
+        if t == "SWITCH":
+            # Each case falls through into the next one
+            self.breaks.append(live)
+            entry = set(live)
+            following = live
+            for child in reversed(node.children[1:]):
+                if child.node_type in ("CASE", "DEFAULT"):
+                    following = self.statements(child.children[-1].children[0], following, remove)
+                    entry |= following
+            self.breaks.pop()
+            return (entry - {"IT"}) | reads(node.children[0]), True
+        if t == "LOOP":
+            return self.loop(node, live, remove), True
+        if t == "EXCEPTION":
+            failed = live
+            for child in node.children:
+                if child.node_type == "FAIL":
+                    failed = self.statements(child.children[0].children[0], live, remove)
+            success = next(child for child in node.children if child.node_type == "SUCCESS")
+            self.extra.append(self.extra[-1] | failed)
+            done = self.statements(success.children[0].children[0], live, remove)
+            self.extra.pop()
+            return done | failed, True
+        return live, True       # FUNC_DEF: analysed on its own
+
+    def loop(self, node, live, remove):
+        var = None
+        condition = set()
+        body = None
+        for child in node.children:
+            if child.node_type == "DIRECTION":
+                var = child.children[1].value
+            elif child.node_type == "BLOCK":
+                body = child.children[0]
+            elif child.node_type not in ("IMINYR", "LOOP_NAME", "LOOP_END"):
+                condition = reads(child)
+        stepped = {var} if var is not None else set()
+
+        # Live at the loop head: iterate to a fixed point, then remove
+        self.breaks.append(live)
+        head = live | condition
+        while True:
+            entry = live | condition | self.statements(body, head | stepped, False)
+            if entry == head:
+                break
+            head = entry
+        if remove:
+            self.statements(body, head | stepped, True)
+        self.breaks.pop()
+        return head | stepped
+
+    def body(self, stmt_list, live, exits):
+        self.breaks = [exits]
+        self.returns = exits
+        self.statements(stmt_list, live, True)
+
+    def run(self, tree):
+        before = sum(1 for _ in iter_tree(tree))
+        for stmt_list in [node for node in tree.children if node.node_type == "STMT_LIST"]:
+            self.prune(stmt_list)
+            # The program's variables are its result: all live at the end
+            everything = declared_names(tree)
+            self.body(stmt_list, everything, everything)
+        for node in iter_tree(tree):
+            if node.node_type == "FUNC_DEF":
+                # Falling off the end returns IT; GTFO returns NOOB
+                self.body(node.children[3].children[0], {"IT"}, set())
+        self.stats["nodes"] = before - sum(1 for _ in iter_tree(tree))
+        return self.stats
+
+def eliminate_dead_code(tree, warnings=None):
+    '''
+    Drop statements after GTFO / FOUND YR (and after O RLY?s whose
+    branches all end so), resolve O RLY?s on a constant IT to the branch
+    that runs, and remove dead stores: assignments, initializers and bare
+    expressions whose value is never read, when computing them can have
+    no effect. Unreachable code and constant branches are appended to
+    `warnings`. Returns counts of removed statements, resolved branches,
+    dead stores and nodes.
+    '''
+    return DeadCodeEliminator(tree, [] if warnings is None else warnings).run(tree)
@@ -3,6 +3,7 @@ This used the intended implementation for a recursive-descent parser for LOLCODE
 '''
 
 from lexer import tokenize
+from token_stream import Kind, kind_name, TokenCursor
 
 # -------------------------
 # Parser Error
@@ -10,33 +11,34 @@ from lexer import tokenize
 class ParserError(Exception):
     pass
 
+# Literals and identifiers
+OPERAND_KINDS = frozenset((
+    Kind.INT_LITERAL, Kind.FLOAT_LITERAL, Kind.STRING, Kind.BOOL_TRUE, Kind.BOOL_FALSE, Kind.IDENTIFIER,
+))
+# Token kinds that can start an expression in VISIBLE
+EXPR_START_KINDS = OPERAND_KINDS | {Kind.ARITHMETIC_OPERATOR, Kind.COMPARISON_OPERATOR, Kind.SMOOSH}
+
 # -------------------------
 # Parser Class
 # -------------------------
 class Parser:
     def __init__(self, tokens):
-        self.tokens = tokens
-        self.pos = 0
+        self.cursor = TokenCursor(tokens)
         self.errors = []  # Collect parsing errors
     
     # -------------------------
     # Helpers
     # -------------------------
+    # Comments are already split off by the cursor
     def current(self):
-        # Skip comments automatically
-        while self.pos < len(self.tokens) and self.tokens[self.pos][0].startswith("COMMENT"):
-            self.pos += 1
-        if self.pos < len(self.tokens):
-            t = self.tokens[self.pos]
-            return t[0], t[1], t[2], t[3]  
-        return None, None, None, None
+        return self.cursor.current
     
     def advance(self):
-        self.pos += 1
+        self.cursor.advance()
     
     def match(self, ttype, value=None):
         token_type, token_value, *_ = self.current()
-        if token_type is None:
+        if token_type == Kind.EOF:
             return False
         if token_type == ttype and (value is None or token_value == value):
             self.advance()
@@ -48,7 +50,7 @@ class Parser:
         if token_type != ttype or (value is not None and token_value != value):
             # Record error with line info
             self.errors.append(
-                f"[Line {line}] Expected {ttype} {value}, got {token_type} {token_value}"
+                f"[Line {line}] Expected {kind_name(ttype)} {value}, got {kind_name(token_type)} {token_value}"
             )
             # Attempt simple recovery: skip until a safe token
             self.advance()
@@ -62,19 +64,21 @@ class Parser:
     # Program Entry
     # -------------------------
     def parse_program(self):
-        self.expect("CODE_DELIMITER", "HAI")          # program start
+        self.expect(Kind.CODE_DELIMITER, "HAI")          # program start
         self.parse_statement_list()
-        self.expect("CODE_DELIMITER", "KTHXBYE")      # program end
+        self.expect(Kind.CODE_DELIMITER, "KTHXBYE")      # program end
     
     # -------------------------
     # Statement Parsing
     # -------------------------
     def parse_statement_list(self):
         while True:
-            token_type, *_ = self.current()
-            if token_type in (None, "CODE_DELIMITER", "OIC", "IF U SAY SO", "IM OUTTA YR", "O NOES"):
+            token_type, token_value, *_ = self.current()
+            if token_type in (Kind.EOF, Kind.CODE_DELIMITER) or (token_type, token_value) in (
+                    (Kind.CONTROL_FLOW, "OIC"), (Kind.FUNCTION_DEF_CALL, "IF U SAY SO"),
+                    (Kind.LOOPING, "IM OUTTA YR"), (Kind.CONTROL_FLOW, "O NOES")):
                 break
-            elif token_type == "VAR_LIST_DELIMITER":  # Skip WAZZUP/BUHBYE
+            elif token_type == Kind.VAR_LIST_DELIMITER:  # Skip WAZZUP/BUHBYE
                 self.advance()
                 continue  # skip parsing a statement
             self.parse_statement()
@@ -84,55 +88,55 @@ class Parser:
         token_type, token_value, line, col = self.current()
         try:
             # <print>
-            if token_type == "OUTPUT_KEYWORD":
+            if token_type == Kind.OUTPUT_KEYWORD:
                 self.parse_print()
             
             # <declaration>
-            elif token_type == "VAR_DECLARATION":
+            elif token_type == Kind.VAR_DECLARATION:
                 self.parse_declaration()
                 
             # <identifier>
-            elif token_type == "IDENTIFIER":
+            elif token_type == Kind.IDENTIFIER:
                 self.parse_assignment()
 
             # <conditional>
-            elif token_type == "CONTROL_FLOW" and token_value == "O RLY?":
+            elif token_type == Kind.CONTROL_FLOW and token_value == "O RLY?":
                 self.parse_conditional()
                 
             # <loop>
-            elif token_type == "LOOPING" and token_value == "IM IN YR":
+            elif token_type == Kind.LOOPING and token_value == "IM IN YR":
                 self.parse_loop()
                 
             # <function_def>
-            elif token_type == "FUNCTION_DEF_CALL" and token_value == "HOW IZ I":
+            elif token_type == Kind.FUNCTION_DEF_CALL and token_value == "HOW IZ I":
                 self.parse_function_def()
                 
             # <function_call>
-            elif token_type == "FUNCTION_CALL" or (token_type == "I" and token_value == "IZ"):
+            elif token_type == Kind.FUNCTION_DEF_CALL and token_value == "I IZ":
                 self.parse_function_call()
                 
             # <input>
-            elif token_type == "IO" and token_value == "GIMMEH":
+            elif token_type == Kind.IO and token_value == "GIMMEH":
                 return self.parse_input()
                 
             # <return>
-            elif token_type == "RETURN" or (token_type == "FOUND" and token_value == "YR"):
+            elif token_type == Kind.CONTROL_FLOW and token_value == "FOUND YR":
                 self.parse_return()
                 
             # <exit>
-            elif token_type == "EXIT" or (token_type == "GTFO"):
+            elif token_type == Kind.CONTROL_FLOW and token_value == "GTFO":
                 self.advance()  # just consume GTFO
             
             # <typecast>  
-            elif token_type == "TYPECAST" and token_value == "MAEK":
+            elif token_type == Kind.MAEK:
                 self.parse_typecast()
                 
             # <exeception_handling>
-            elif token_type == "EXCEPTION" and token_value == "PLZ":
+            elif token_type == Kind.CONTROL_FLOW and token_value == "PLZ":
                 self.parse_exception_handling()
                 
             else:
-                raise ParserError(f"Unknown statement starting with {token_type} {token_value}")
+                raise ParserError(f"Unknown statement starting with {kind_name(token_type)} {token_value}")
                 error_msg = f"[Line {line}] Unknown statement starting with {token_type} {token_value}"
                 self.errors.append(error_msg)
                 self.advance()  # skip the token and continue
@@ -147,120 +151,116 @@ class Parser:
     
     # <print> ::= VISIBLE <expr_list>
     def parse_print(self):
-        self.expect("OUTPUT_KEYWORD", "VISIBLE")
+        self.expect(Kind.OUTPUT_KEYWORD, "VISIBLE")
         
         # Optional expression list
         token_type, token_value, *_ = self.current()
-        if token_type in ("INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE", "IDENTIFIER") \
-        or token_value in ("SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "BIGGR OF", "SMALLR OF", "BOTH SAEM", "DIFFRINT", "SMOOSH"):
+        if token_type in EXPR_START_KINDS:
             self.parse_expr_list() 
             
     # <declaration> ::= I HAS A <varident> (ITZ <expr>)?
     def parse_declaration(self):
-        self.expect("VAR_DECLARATION")
-        self.expect("IDENTIFIER")
-        if self.match("VAR_ASSIGNMENT"):
+        self.expect(Kind.VAR_DECLARATION)
+        self.expect(Kind.IDENTIFIER)
+        if self.match(Kind.VAR_ASSIGNMENT):
             self.parse_expr()
     
     # <assignment> ::= <varident> R <expr>
     def parse_assignment(self):
-        self.expect("IDENTIFIER")
-        if self.match("VAR_ASSIGNMENT"):
+        self.expect(Kind.IDENTIFIER)
+        if self.match(Kind.VAR_ASSIGNMENT):
             self.parse_expr()
         else:
             # Possibly a function call
-            if self.current()[0] == "FUNCTION_CALL":
+            if self.check(Kind.FUNCTION_DEF_CALL, "I IZ"):
                 self.parse_function_call()
                 
     # <return> ::= FOUND YR <expr>
     def parse_return(self):
-        self.expect("RETURN", "FOUND YR")
+        self.expect(Kind.CONTROL_FLOW, "FOUND YR")
         self.parse_expr()
         
     # <exit> ::= GTFO
     def parse_exit(self):
-        self.expect("EXIT", "GTFO")
+        self.expect(Kind.CONTROL_FLOW, "GTFO")
         
     # <typecast> ::= MAEK <expr> A <type>
     def parse_typecast(self):
-        self.expect("TYPECAST", "MAEK")
+        self.expect(Kind.MAEK)
         self.parse_expr()
-        self.expect("A")
-        self.expect("TYPE_LITERAL")
+        self.expect(Kind.A)
+        self.expect(Kind.TYPE_LITERAL)
     
     # <conditional>  ::= O RLY? <linebreak> YA RLY <linebreak> <block>
     #               (MEBBE <expr> <linebreak> <block>)*
     #               (NO WAI <linebreak> <block>)?
     #               OIC
     def parse_conditional(self):
-        self.expect("CONTROL_FLOW", "O RLY?")       # O RLY?
-        self.expect("CONTROL_FLOW", "YA RLY")       # YA RLY
+        self.expect(Kind.CONTROL_FLOW, "O RLY?")       # O RLY?
+        self.expect(Kind.CONTROL_FLOW, "YA RLY")       # YA RLY
         self.parse_statement_list()                 # ()
-        while self.match("CONTROL_FLOW", "MEBBE"):  # MEBBE
+        while self.match(Kind.CONTROL_FLOW, "MEBBE"):  # MEBBE
             self.parse_expr()
             self.parse_statement_list()
-        if self.match("CONTROL_FLOW", "NO WAI"):    # NO WAI
+        if self.match(Kind.CONTROL_FLOW, "NO WAI"):    # NO WAI
             self.parse_statement_list()
-        self.expect("CONTROL_FLOW", "OIC")          # OIC
+        self.expect(Kind.CONTROL_FLOW, "OIC")          # OIC
     
     # <loop> ::= IM IN YR <loopident> [UPPIN|NERFIN] YR <varident> TIL <expr> <linebreak> <block> IM OUTTA YR <loopident>
     def parse_loop(self):
-        self.expect("LOOPING", "IM IN YR")    
-        self.expect("IDENTIFIER")                   # Loop identifier
-        self.expect("YR")                       
-        self.expect("IDENTIFIER")                   # Target variable
-        self.expect("TIL")                    
+        self.expect(Kind.LOOPING, "IM IN YR")    
+        self.expect(Kind.IDENTIFIER)                   # Loop identifier
+        self.expect(Kind.LOOPING, "YR")                       
+        self.expect(Kind.IDENTIFIER)                   # Target variable
+        self.expect(Kind.LOOPING, "TIL")                    
         self.parse_expr()
         self.parse_statement_list()
-        self.expect("LOOPING", "IM OUTTA YR")     
-        self.expect("IDENTIFIER")             
+        self.expect(Kind.LOOPING, "IM OUTTA YR")     
+        self.expect(Kind.IDENTIFIER)             
         
     # <switch> ::= <expr> <linebreak> WTF? <linebreak> (OMG <literal> <linebreak> <statement_list>)* [OMGWTF <linebreak> <statement_list>] OIC
     def parse_switch(self):
         self.parse_expr()
-        self.expect("SWITCH", "WTF?")
-        while self.match("SWITCH_CASE", "OMG"):     # Parse case blocks
+        self.expect(Kind.CONTROL_FLOW, "WTF?")
+        while self.match(Kind.CONTROL_FLOW, "OMG"):     # Parse case blocks
             self.parse_literal()
             self.parse_statement_list()
-        if self.match("SWITCH_CASE", "OMGWTF"):     # Optional default case
+        if self.match(Kind.CONTROL_FLOW, "OMGWTF"):     # Optional default case
             self.parse_statement_list()
-        self.expect("CONTROL_FLOW", "OIC")
+        self.expect(Kind.CONTROL_FLOW, "OIC")
     
     # <function_def> ::= HOW IZ I <funcident> (<param>)* <linebreak> <block> IF U SAY SO
     def parse_function_def(self):
-        self.expect("FUNCTION_DEF_CALL", "HOW IZ I")
-        self.expect("IDENTIFIER")                   # Function name
-        while self.match("YR"):
-            self.expect("IDENTIFIER")               # Function args
+        self.expect(Kind.FUNCTION_DEF_CALL, "HOW IZ I")
+        self.expect(Kind.IDENTIFIER)                   # Function name
+        while self.match(Kind.LOOPING, "YR"):
+            self.expect(Kind.IDENTIFIER)               # Function args
         self.parse_statement_list()
-        self.expect("FUNCTION_DEF_CALL", "IF U SAY SO")
+        self.expect(Kind.FUNCTION_DEF_CALL, "IF U SAY SO")
     
     # <function_call>::= I IZ <funcident> (<expr>)* MKAY
     def parse_function_call(self):
-        self.expect("FUNCTION_CALL")
-        self.expect("IDENTIFIER")                   # Function name
-        while self.match("YR"):
+        self.expect(Kind.FUNCTION_DEF_CALL, "I IZ")
+        self.expect(Kind.IDENTIFIER)                   # Function name
+        while self.match(Kind.LOOPING, "YR"):
             self.parse_expr()
-        self.expect("FUNCTION_END")
+        self.expect(Kind.FUNCTION_DEF_CALL, "MKAY")
         
     # <input> ::= GIMMEH <varident>
     def parse_input(self):
-        self.expect("INPUT")
-        
-        self.expect("IO", "GIMMEH")
-        var_token = self.expect("IDENTIFIER")
-        self.expect(f"VAR({var_token['value']})")
+        self.expect(Kind.IO, "GIMMEH")
+        self.expect(Kind.IDENTIFIER)
     
     # <exception_handling> ::= PLZ <expr>? <linebreak> AWSUM THX <linebreak> <statement_list> (O NOES <linebreak> <statement_list>)? KTHX
     def parse_exception_handling(self):
-        self.expect("EXCEPTION", "PLZ")
-        if self.current()[0] != "AWSUM THX":
+        self.expect(Kind.CONTROL_FLOW, "PLZ")
+        if not self.check(Kind.CONTROL_FLOW, "AWSUM THX"):
             self.parse_expr()
-        self.expect("EXCEPTION", "AWSUM THX")
+        self.expect(Kind.CONTROL_FLOW, "AWSUM THX")
         self.parse_statement_list()
-        if self.match("EXCEPTION", "O NOES"):
+        if self.match(Kind.CONTROL_FLOW, "O NOES"):
             self.parse_statement_list()
-        self.expect("EXCEPTION", "KTHX")
+        self.expect(Kind.CONTROL_FLOW, "KTHX")
         
     # <block> ::= <statement_list>
     def parse_block(self):
@@ -274,10 +274,9 @@ class Parser:
         token_type, token_value, *_ = self.current()
         
         # Only parse if next token is a valid expression start
-        if token_type in ("INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE", "IDENTIFIER") \
-        or token_value in ("SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "BIGGR OF", "SMALLR OF", "BOTH SAEM", "DIFFRINT", "SMOOSH", "FUNCTION_CALL"):
+        if token_type in EXPR_START_KINDS or (token_type == Kind.FUNCTION_DEF_CALL and token_value == "I IZ"):
             self.parse_expr()
-            while self.match("YR"):
+            while self.match(Kind.LOOPING, "YR"):
                 self.parse_expr()
     
     def parse_expr(self):
@@ -285,27 +284,27 @@ class Parser:
         
         try:
             # Literal or variable
-            if token_type in ("INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE", "IDENTIFIER"):
+            if token_type in OPERAND_KINDS:
                 self.advance()
             
             # Arithmetic operation (SUM OF, DIFF OF, etc.)
-            elif token_type == "ARITHMETIC_OPERATOR" or token_value in ("SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "BIGGR OF", "SMALLR OF"):
+            elif token_type == Kind.ARITHMETIC_OPERATOR or token_value in ("BIGGR OF", "SMALLR OF"):
                 self.parse_operation()
             
             # Comparison (BOTH SAEM, DIFFRINT)
-            elif token_type == "COMPARISON_OPERATOR":
+            elif token_type == Kind.COMPARISON_OPERATOR:
                 self.parse_comparison()
             
             # SMOOSH concatenation
-            elif token_type == "SMOOSH":
+            elif token_type == Kind.SMOOSH:
                 self.parse_smoosh()
             
             # Function call
-            elif token_type == "FUNCTION_CALL":
+            elif token_type == Kind.FUNCTION_DEF_CALL and token_value == "I IZ":
                 self.parse_function_call()
                         
             else:
-                raise ParserError(f"Unexpected token in expression: {token_type} {token_value}")
+                raise ParserError(f"Unexpected token in expression: {kind_name(token_type)} {token_value}")
 
         except ParserError as e:
             self.errors.append(str(e))
@@ -321,7 +320,7 @@ class Parser:
         self.parse_expr()
 
         # additional operands (optional)
-        while self.match("MULTI_PARAM_SEPARATOR", "AN"):
+        while self.match(Kind.MULTI_PARAM_SEPARATOR, "AN"):
             self.parse_expr()
 
 
@@ -332,14 +331,13 @@ class Parser:
         self.parse_expr()
 
         # allow optional AN
-        if self.match("MULTI_PARAM_SEPARATOR", "AN"):
+        if self.match(Kind.MULTI_PARAM_SEPARATOR, "AN"):
             pass
 
         # second operand: check if there is a valid operand
         token_type, token_value, *_ = self.current()
-        if token_type in (
-            "INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE",
-            "IDENTIFIER", "ARITHMETIC_OPERATOR", "COMPARISON_OPERATOR", "SMOOSH"
+        if token_type in OPERAND_KINDS or token_type in (
+            Kind.ARITHMETIC_OPERATOR, Kind.COMPARISON_OPERATOR, Kind.SMOOSH
         ):
             self.parse_expr()
         else:
@@ -349,10 +347,10 @@ class Parser:
 
     def parse_smoosh(self):
         # <smoosh> ::= SMOOSH <expr> (AN <expr>)*
-        self.expect("SMOOSH")
+        self.expect(Kind.SMOOSH)
         self.parse_expr()
         
-        while self.match("MULTI_PARAM_SEPARATOR", "AN"):
+        while self.match(Kind.MULTI_PARAM_SEPARATOR, "AN"):
             self.parse_expr()
             
     # -------------------------
@@ -360,10 +358,10 @@ class Parser:
     # -------------------------
     def parse_literal(self):
         token_type, *_ = self.current()
-        if token_type in ("INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE"):
+        if token_type in OPERAND_KINDS and token_type != Kind.IDENTIFIER:
             self.advance()
         else:
-            raise ParserError(f"Expected literal, got {token_type}")
+            raise ParserError(f"Expected literal, got {kind_name(token_type)}")
         
     # ------------------------- 
     # Helpers
@@ -373,9 +371,9 @@ class Parser:
         return token_type == ttype and (value is None or token_value == value)
     
     def previous(self):
-        if self.pos > 0:
-            t = self.tokens[self.pos - 1]
-            return {"type": t[0], "value": t[1]}
+        if self.cursor.pos > 0:
+            token_type, token_value, *_ = self.cursor.peek(-1)
+            return {"type": token_type, "value": token_value}
         return None
     
 # -------------------------
@@ -0,0 +1,194 @@
+'''
+Variable resolver: gives every variable a numeric slot in its frame.
+
+The program body and each HOW IZ I body are scopes. In a scope, IT is
+slot 0, then come the function's parameters, then every declared name
+(I HAS A, and UPPIN/NERFIN loop variables, which are created on first
+use) in order of appearance. A frame is then a flat list indexed by slot.
+
+Each variable reference is classified once:
+  - declared on every path to it (an earlier declaration in the same or
+    an enclosing block): read and written without any check;
+  - declared somewhere in the scope, but not necessarily yet: the slot
+    holds UNSET until declared, and is checked on access;
+  - never declared in the scope: a resolve error, and the access fails
+    when it runs.
+'''
+
+# Slot value of a variable that has not been declared yet
+class Unset:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "UNSET"
+
+UNSET = Unset()
+
+# Reference kinds
+DEFINITE, CHECKED, UNDECLARED = "definite", "checked", "undeclared"
+
+# Expression-level nodes naming a variable (INPUT and IS NOW A use VAR)
+VAR_NODES = frozenset(("IDENTIFIER", "VAR"))
+
+
+# Variables a function body (or the whole program) can hold: IT, its
+# declarations and loop variables, not counting nested HOW IZ I bodies
+def declared_names(root):
+    names = {"IT"}
+    pending = list(root.children)
+    while pending:
+        node = pending.pop()
+        if node.node_type == "FUNC_DEF":
+            continue
+        if node.node_type == "VAR_DEC":
+            names.add(node.children[0].value)
+        elif node.node_type == "DIRECTION":
+            names.add(node.children[1].value)
+        pending.extend(node.children)
+    return names
+
+
+class Scope:
+    def __init__(self, name, params=()):
+        self.name = name            # function name, None for the program body
+        self.slots = {"IT": 0}
+        for param in params:
+            self.slots.setdefault(param, len(self.slots))
+        self.params = list(params)
+
+    def slot(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.slots)
+        return slot
+
+    def __len__(self):
+        return len(self.slots)
+
+    # Fresh frame: IT is NOOB, everything else undeclared
+    def new_frame(self):
+        frame = [UNSET] * len(self.slots)
+        frame[0] = None
+        return frame
+
+    # Frame as a {name: value} dict of its declared variables
+    def frame_dict(self, frame):
+        return {name: frame[slot] for name, slot in self.slots.items() if frame[slot] is not UNSET}
+
+
+class Resolution:
+    def __init__(self):
+        self.main = None
+        self.functions = {}         # function name -> Scope
+        self.refs = {}              # id(node) -> (slot, reference kind)
+        self.errors = []
+
+    def ref(self, node):
+        '''(slot, kind) for a variable node; slot is None when undeclared.'''
+        return self.refs[id(node)]
+
+
+class Resolver:
+    def __init__(self):
+        self.resolution = Resolution()
+        self.scope = None
+        self.declared = set()       # names declared anywhere in the scope
+
+    def resolve(self, tree):
+        resolution = self.resolution
+        definitions = []
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            if node.node_type == "FUNC_DEF":
+                definitions.append(node)
+            pending.extend(reversed(node.children))
+
+        resolution.main = self.enter(Scope(None), tree)
+        for node in tree.children:
+            if node.node_type == "STMT_LIST":
+                self.statements(node, {"IT"})
+
+        for node in definitions:
+            params = [param.value for param in node.children[2].children]
+            scope = Scope(node.children[1].value, params)
+            resolution.functions[scope.name] = self.enter(scope, node.children[3])
+            self.statements(node.children[3].children[0], {"IT"} | set(params))
+        return resolution
+
+    def enter(self, scope, body):
+        self.scope = scope
+        self.declared = declared_names(body) | set(scope.params)
+        return scope
+
+    # Record a variable reference, given the names certainly declared here
+    def reference(self, node, definite):
+        name = node.value
+        if name in definite:
+            self.resolution.refs[id(node)] = (self.scope.slot(name), DEFINITE)
+        elif name in self.declared:
+            self.resolution.refs[id(node)] = (self.scope.slot(name), CHECKED)
+        else:
+            self.resolution.refs[id(node)] = (None, UNDECLARED)
+            self.resolution.errors.append(f"Line {node.line}: Variable '{name}' used before declaration.")
+
+    def expression(self, root, definite):
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            if node.node_type in VAR_NODES:
+                self.reference(node, definite)
+            pending.extend(reversed(node.children))
+
+    # `definite` is extended in place as declarations run in this block
+    def statements(self, stmt_list, definite):
+        for node in stmt_list.children:
+            self.statement(node, definite)
+
+    def block(self, node, definite):
+        self.statements(node.children[0], set(definite))
+
+    def statement(self, node, definite):
+        t = node.node_type
+        if t == "FUNC_DEF":
+            return
+        if t == "VAR_DEC":
+            if len(node.children) > 1:
+                self.expression(node.children[1], definite)
+            target = node.children[0]
+            definite.add(target.value)
+            self.resolution.refs[id(target)] = (self.scope.slot(target.value), DEFINITE)
+        elif t == "LOOP":
+            for child in node.children:
+                if child.node_type == "DIRECTION":
+                    # Created on entry when missing, so declared from here on
+                    var = child.children[1]
+                    self.reference(var, definite)
+                    definite.add(var.value)
+                elif child.node_type == "BLOCK":
+                    self.block(child, definite)
+                elif child.node_type not in ("IMINYR", "LOOP_NAME", "LOOP_END"):
+                    self.expression(child, definite)
+        elif t in ("IF", "SWITCH", "EXCEPTION"):
+            for child in node.children:
+                if child.node_type in ("YA_RLY", "NO_WAI", "DEFAULT", "SUCCESS", "FAIL"):
+                    self.block(child.children[0], definite)
+                elif child.node_type == "MEBBE":
+                    self.expression(child.children[0], definite)
+                    self.block(child.children[1], definite)
+                elif child.node_type == "CASE":
+                    self.block(child.children[1], definite)
+                elif t == "SWITCH" and child is node.children[0]:
+                    self.expression(child, definite)
+                elif t == "EXCEPTION" and child.node_type not in ("PLZ", "KTHX"):
+                    self.expression(child, definite)
+        else:
+            # PRINT, ASSIGN, EXPR_STMT, FUNC_CALL, INPUT, RETURN, EXIT:
+            # only expressions and variable targets below
+            for child in node.children:
+                self.expression(child, definite)
+
+
+def resolve(tree):
+    '''Assign frame slots to every variable of a TreeParser AST; returns a Resolution.'''
+    return Resolver().resolve(tree)
@@ -0,0 +1,191 @@
+'''
+LOLCODE runtime values and operations, shared by the execution engines.
+
+Values map onto Python types: NOOB is None, TROOF is bool, NUMBR is int,
+NUMBAR is float and YARN is str.
+'''
+
+import math
+import re
+
+
+class LOLError(Exception):
+    pass
+
+
+# -------------------------
+# Literals
+# -------------------------
+YARN_ESCAPES = {")": "\n", ">": "\t", "o": "\a", '"': '"', ":": ":"}
+escape_regex = re.compile(r":(.)")
+
+def decode_yarn(text):
+    return escape_regex.sub(lambda m: YARN_ESCAPES.get(m.group(1), m.group(0)), text)
+
+# Value of a LITERAL node's source text
+def decode_literal(text):
+    if text == "WIN":
+        return True
+    if text == "FAIL":
+        return False
+    if text.startswith('"'):
+        return decode_yarn(text[1:-1])
+    if "." in text:
+        return float(text)
+    return int(text)
+
+# Node types of pre-decoded constants (see optimizer.fold_constants); their
+# value is the Python value itself
+CONSTANT_TYPES = frozenset(("NUMBR", "NUMBAR", "YARN", "TROOF"))
+
+# Value of a LITERAL or constant node
+def node_constant(node):
+    if node.node_type == "LITERAL":
+        return decode_literal(node.value)
+    return node.value
+
+
+# -------------------------
+# Casting
+# -------------------------
+number_regex = re.compile(r"\s*-?\d+(\.\d*)?\s*$")
+
+def type_name(value):
+    if value is None:
+        return "NOOB"
+    return {bool: "TROOF", int: "NUMBR", float: "NUMBAR", str: "YARN"}[type(value)]
+
+# Implicit cast for arithmetic: NUMBR/NUMBAR stay, TROOF is 0/1, YARN is parsed
+def to_number(value):
+    t = type(value)
+    if t is int or t is float:
+        return value
+    if t is bool:
+        return int(value)
+    if t is str:
+        m = number_regex.match(value)
+        if m is None:
+            raise LOLError(f"Cannot cast YARN '{value}' to a number")
+        return float(value) if m.group(1) else int(value)
+    raise LOLError("Cannot implicitly cast NOOB to a number")
+
+def to_troof(value):
+    return bool(value)
+
+def to_yarn(value):
+    t = type(value)
+    if t is str:
+        return value
+    if t is bool:
+        return "WIN" if value else "FAIL"
+    if t is float:
+        return f"{math.trunc(value * 100) / 100:.2f}"    # NUMBARs show two decimals
+    if value is None:
+        return "NOOB"
+    return str(value)
+
+# Explicit cast (MAEK / IS NOW A)
+def cast(value, type_literal):
+    if type_literal == "TROOF":
+        return bool(value)
+    if type_literal == "NOOB":
+        return None
+    if type_literal == "YARN":
+        return "" if value is None else to_yarn(value)
+    if value is None:
+        return 0 if type_literal == "NUMBR" else 0.0
+    number = to_number(value)
+    if type_literal == "NUMBR":
+        return int(number)
+    if type_literal == "NUMBAR":
+        return float(number)
+    raise LOLError(f"Unknown type {type_literal}")
+
+
+# -------------------------
+# Operators
+# -------------------------
+def lol_sum(a, b):
+    return to_number(a) + to_number(b)
+
+def lol_diff(a, b):
+    return to_number(a) - to_number(b)
+
+def lol_produkt(a, b):
+    return to_number(a) * to_number(b)
+
+# NUMBR division truncates toward zero, as in C
+def lol_quoshunt(a, b):
+    a, b = to_number(a), to_number(b)
+    if b == 0:
+        raise LOLError("Division by zero")
+    if type(a) is int and type(b) is int:
+        q = abs(a) // abs(b)
+        return q if (a < 0) == (b < 0) else -q
+    return a / b
+
+def lol_mod(a, b):
+    a, b = to_number(a), to_number(b)
+    if b == 0:
+        raise LOLError("Division by zero")
+    if type(a) is int and type(b) is int:
+        return a - b * lol_quoshunt(a, b)
+    return math.fmod(a, b)
+
+def lol_biggr(a, b):
+    return max(to_number(a), to_number(b))
+
+def lol_smallr(a, b):
+    return min(to_number(a), to_number(b))
+
+# BOTH SAEM: numbers compare by value, everything else needs the same type
+def lol_saem(a, b):
+    ta, tb = type(a), type(b)
+    if (ta is int or ta is float) and (tb is int or tb is float):
+        return a == b
+    return ta is tb and a == b
+
+def lol_diffrint(a, b):
+    return not lol_saem(a, b)
+
+def lol_both(a, b):
+    return bool(a) and bool(b)
+
+def lol_either(a, b):
+    return bool(a) or bool(b)
+
+def lol_won(a, b):
+    return bool(a) != bool(b)
+
+def lol_not(a):
+    return not a
+
+def lol_all(*values):
+    return all(values)
+
+def lol_any(*values):
+    return any(values)
+
+def lol_smoosh(*values):
+    return "".join(map(to_yarn, values))
+
+# Operator phrase -> Python function
+BINARY_OPS = {
+    "SUM OF": lol_sum,
+    "DIFF OF": lol_diff,
+    "PRODUKT OF": lol_produkt,
+    "QUOSHUNT OF": lol_quoshunt,
+    "MOD OF": lol_mod,
+    "BIGGR OF": lol_biggr,
+    "SMALLR OF": lol_smallr,
+    "BOTH SAEM": lol_saem,
+    "DIFFRINT": lol_diffrint,
+    "BOTH OF": lol_both,
+    "EITHER OF": lol_either,
+    "WON OF": lol_won,
+}
+VARIADIC_OPS = {
+    "ALL OF": lol_all,
+    "ANY OF": lol_any,
+    "SMOOSH": lol_smoosh,
+}
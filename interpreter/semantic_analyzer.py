@@ -1,5 +1,6 @@
-from lexer import tokenize, filter_tokens
+from token_stream import TokenStream
 from parser import Parser, ParserError
+from runtime import LOLError, decode_literal, lol_not, BINARY_OPS, VARIADIC_OPS
 
 # --------------------------
 # Track variable information
@@ -25,110 +26,87 @@ class SymbolTable:
         return self.symbols.get(name)
 
 # -----------------------------
-# Recursive expression evaluation
+# Prefix expression evaluation
 # -----------------------------
+LITERAL_KINDS = frozenset(("INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE"))
+
+# Operator phrase -> operand count; None for variadic (up to MKAY or the end)
+ARITIES = dict.fromkeys(BINARY_OPS, 2)
+ARITIES.update(dict.fromkeys(VARIADIC_OPS))
+ARITIES["NOT"] = 1
+
+# Stands in for MKAY on the operand stack
+MKAY = object()
+
+# Operators are prefix, so reading right to left every operator finds its
+# operands already evaluated on top of the stack (AN is just a separator).
+# One pass, each token pushed and popped once. Values follow the runtime;
+# None (NOOB or not known statically) makes the result unknown.
 def evaluate_expression(tokens, table, line_num, errors):
-    if not tokens:
-        return None
+    stack = []
+    for i in range(len(tokens) - 1, -1, -1):
+        ttype, val = tokens[i][:2]
 
-    ttype, val = tokens[0][:2]
-
-    # -----------------
-    # Literal
-    # -----------------
-    if ttype in ("INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE"):
-        if ttype == "INT_LITERAL":
-            return int(val)
-        elif ttype == "FLOAT_LITERAL":
-            return float(val)
-        elif ttype in ("BOOL_TRUE", "BOOL_FALSE"):
-            return True if ttype == "BOOL_TRUE" else False
-        else:
-            return val
-
-    # -----------------
-    # Identifier
-    # -----------------
-    elif ttype == "IDENTIFIER":
-        if not table.is_declared(val):
-            errors.append(f"Line {line_num}: Variable '{val}' used before declaration.")
-            return None
-        return table.get_value(val)
-
-    # -----------------
-    # Arithmetic operations
-    # -----------------
-    elif val in ("SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF"):
-        operands = []
-        current = []
-        # split tokens by AN
-        for tok in tokens[1:]:
-            if tok[1] == "AN":
-                if current:
-                    operands.append(current)
-                    current = []
-            else:
-                current.append(tok)
-        if current:
-            operands.append(current)
-
-        if len(operands) < 2:
-            errors.append(f"Line {line_num}: Not enough operands for '{val}'.")
-            return None
-
-        # recursively evaluate operands
-        evals = [evaluate_expression(op, table, line_num, errors) for op in operands]
-
-        # check for None
-        if any(e is None for e in evals):
-            return None
-
-        # perform operation
-        if val == "SUM OF":
-            return sum(evals)
-        elif val == "DIFF OF":
-            res = evals[0]
-            for e in evals[1:]:
-                res -= e
-            return res
-        elif val == "PRODUKT OF":
-            res = evals[0]
-            for e in evals[1:]:
-                res *= e
-            return res
-        elif val == "QUOSHUNT OF":
-            res = evals[0]
-            for e in evals[1:]:
-                res /= e
-            return res
-        elif val == "MOD OF":
-            res = evals[0]
-            for e in evals[1:]:
-                res %= e
-            return res
-
-    # -----------------
-    # SMOOSH (string concatenation)
-    # -----------------
-    elif val == "SMOOSH":
-        operands = []
-        current = []
-        for tok in tokens[1:]:
-            if tok[1] == "AN":
-                if current:
-                    operands.append(current)
-                    current = []
+        if val == "AN":
+            continue
+        if val == "MKAY":
+            stack.append(MKAY)
+        elif ttype in LITERAL_KINDS:
+            stack.append(decode_literal(val))
+        elif ttype == "IDENTIFIER":
+            if not table.is_declared(val):
+                errors.append(f"Line {line_num}: Variable '{val}' used before declaration.")
+            stack.append(table.get_value(val))
+        elif val in ARITIES:
+            arity = ARITIES[val]
+            if arity is None:
+                operands = []
+                while stack and stack[-1] is not MKAY:
+                    operands.append(stack.pop())
+                if stack:
+                    stack.pop()         # its MKAY
+                missing = not operands
             else:
-                current.append(tok)
-        if current:
-            operands.append(current)
-        evals = [str(evaluate_expression(op, table, line_num, errors)) for op in operands]
-        return ''.join(evals)
+                operands = stack[:-arity - 1:-1]
+                del stack[-arity:]
+                missing = len(operands) < arity or MKAY in operands
+            if missing:
+                errors.append(f"Line {line_num}: Not enough operands for '{val}'.")
+                return None
+            stack.append(apply_operator(val, operands))
+        else:
+            return None                 # function call, cast, ...: not evaluated
 
-    # -----------------
-    # Default
-    # -----------------
-    return None
+    # Anything left over after the first expression is not part of it
+    if not stack or stack[-1] is MKAY:
+        return None
+    return stack[-1]
+
+def apply_operator(op, operands):
+    if None in operands:
+        return None
+    try:
+        if op == "NOT":
+            return lol_not(operands[0])
+        if op in BINARY_OPS:
+            return BINARY_OPS[op](*operands)
+        return VARIADIC_OPS[op](*operands)
+    except LOLError:
+        return None                     # fails at run time, if reached
+
+# -----------------------------
+# Line index
+# -----------------------------
+# { line_num: (start, end) } token range on each line, in line order,
+# from the line number of every token
+def index_lines(lines):
+    index = {}
+    start = 0
+    for i in range(1, len(lines) + 1):
+        if i == len(lines) or lines[i] != lines[start]:
+            index[lines[start]] = (start, i)
+            start = i
+    return index
 
 # -----------------------------
 # Semantic Analysis
@@ -138,9 +116,7 @@ def analyze_semantics(code):
     # Syntax checking
     # -----------------------------
     try:
-        all_tokens = tokenize(code)       # Keep all tokens for Treeview if needed
-        parser_tokens = filter_tokens(all_tokens)  # Remove comment tokens
-        parser = Parser(parser_tokens)
+        parser = Parser(TokenStream(code))  # Lexed once; comments split off by the cursor
         parser.parse_program()
     except ParserError as e:
         return [str(e)], {}
@@ -151,10 +127,11 @@ def analyze_semantics(code):
     table = SymbolTable()
     errors = []
 
-    for line_num, line in enumerate(code.splitlines(), start=1):
-        tokens = filter_tokens(tokenize(line))  # Remove comments per line
-        if not tokens:
-            continue
+    # One statement per line: slice the parser's tokens instead of
+    # lexing each line again (which also split OBTW blocks apart)
+    stream = parser.cursor.tokens
+    for line_num, (start, end) in index_lines(stream.lines).items():
+        tokens = [stream[i] for i in range(start, end)]
 
         first_tok, *rest = tokens
         kind, value = first_tok[:2]
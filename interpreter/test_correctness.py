@@ -0,0 +1,191 @@
+'''
+Correctness checks behind the benchmarks, without the timing: every engine
+and optimization pass against the reference AST evaluator, plus the
+lexer, parser, analysis and transpiler checks. Run with `python -m pytest`.
+'''
+
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from differential import (
+    Mismatch, differential_check, differential_programs, check_types, prefix_mismatches,
+    parse_source, engine_output, run_program, run_vm, run_python, corpus_files, nested_sources,
+    same_tree, counted_program, fib_program, read_corpus, CORPUS_INPUT,
+)
+from lexer import tokenize
+from token_stream import TokenStream, TokenCursor, tokenize_mmap, EOF_TOKEN
+from tree_parser import TreeParser, StackTreeParser
+from tree_node import NodeArena
+from compilation import CompilationUnit
+from executor import compile_program, ClosureCompiler, iter_nodes
+from evaluator import evaluate
+from transpiler import transpile, load, run_transpiled
+from runtime import LOLError
+from optimizer import fold_constants, eliminate_dead_code, hoist_invariants, number_values
+from semantic_analyzer import analyze_semantics
+from tree_semantic import analyze_semantics_from_code
+
+ENGINES = {
+    "AST walk": evaluate,
+    "executor": lambda tree, i, o: compile_program(tree).run(i, o),
+    "untyped": lambda tree, i, o: compile_program(tree, typed=False).run(i, o),
+    "tiered": lambda tree, i, o: compile_program(tree, hot_threshold=1).run(i, o),
+    "vm": run_vm,
+    "python": run_python,
+}
+
+# Optimization pipelines, each run on the tree before the engine
+PASSES = {
+    "plain": (),
+    "folded": (fold_constants,),
+    "hoisted": (fold_constants, hoist_invariants),
+    "numbered": (fold_constants, hoist_invariants, number_values),
+    "eliminated": (fold_constants, eliminate_dead_code),
+}
+
+
+# -------------------------
+# Engines and passes
+# -------------------------
+@pytest.mark.parametrize("passes", PASSES)
+@pytest.mark.parametrize("engine", ENGINES)
+def test_differential(engine, passes):
+    if engine == "AST walk" and passes == "plain":
+        pytest.skip("the reference itself")
+    run = ENGINES[engine]
+
+    def optimized(tree, stdin, stdout):
+        for optimize in PASSES[passes]:
+            optimize(tree)
+        return run(tree, stdin, stdout)
+    assert differential_check(optimized, f"{passes} {engine}") == []
+
+def test_differential_check_fails_on_mismatch():
+    def wrong(tree, stdin, stdout):
+        evaluate(tree, stdin, stdout)
+        stdout.write("extra\n")
+    with pytest.raises(Mismatch):
+        differential_check(wrong, "wrong")
+
+def test_counted_loops_specialized():
+    tree = parse_source(counted_program(1000))
+    compiler = ClosureCompiler()
+    program = compiler.compile_program(tree)
+    assert compiler.counted > 0
+    assert run_program(program, "1000\n") == engine_output(evaluate, tree, "1000\n")
+
+# Use before declaration is a LOLError in generated code; a NameError
+# from the generated code itself is not
+def test_generated_code_name_errors():
+    source = "HAI\nWAZZUP\nI HAS A x ITZ y\nI HAS A y ITZ 1\nBUHBYE\nVISIBLE x\nKTHXBYE\n"
+    with pytest.raises(LOLError):
+        run_python(parse_source(source))
+    namespace = load(transpile(parse_source("HAI\nVISIBLE 1\nKTHXBYE\n")))
+    del namespace["_frame"]
+    with pytest.raises(NameError):
+        run_transpiled(namespace, io.StringIO(), io.StringIO())
+
+# The command line's output runs on its own, away from runtime.py
+@pytest.mark.parametrize("name, source, input_text", [("fib", fib_program(10), "")] + [
+    (os.path.basename(path), source, CORPUS_INPUT) for path, source in zip(corpus_files(), read_corpus())])
+def test_standalone_transpiled_program(tmp_path, name, source, input_text):
+    tree = parse_source(source)
+    expected = engine_output(evaluate, tree, input_text)
+    path = tmp_path / "program.py"
+    path.write_text(transpile(tree, standalone=True))
+    result = subprocess.run([sys.executable, str(path)], input=input_text, capture_output=True,
+                            text=True, cwd=tmp_path, env={"PATH": os.environ.get("PATH", "")})
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == expected
+
+
+# -------------------------
+# Lexer and parsers
+# -------------------------
+@pytest.mark.parametrize("path", corpus_files(), ids=os.path.basename)
+def test_mmap_matches_tokenize(path):
+    with open(path, "r") as f:
+        expected = tokenize(f.read())
+    with tokenize_mmap(path) as tokens:
+        assert list(tokens) == expected
+
+# Lookbehind past a token iterator's window reads as EOF
+def test_cursor_peek_behind_window():
+    cursor = TokenCursor(iter(tokenize("HAI\nVISIBLE 1 AN 2 AN 3 AN 4\nKTHXBYE\n")))
+    for _ in range(8):
+        cursor.advance()
+    assert cursor.peek(-2)[1] == "3"
+    assert cursor.peek(-(cursor.tokens.keep + 2)) == EOF_TOKEN
+
+# A unit over a file streams its tokens instead of reading the file
+@pytest.mark.parametrize("path", corpus_files(), ids=os.path.basename)
+def test_file_unit_streams_tokens(path):
+    with open(path, "r") as f:
+        expected = CompilationUnit(f.read())
+    unit = CompilationUnit.from_file(path)
+    assert same_tree(unit.tree, expected.tree)
+    assert unit.source is None and "tokens" not in unit.stages
+    assert unit.tokens == expected.tokens
+
+@pytest.mark.parametrize("label, code", list(nested_sources(100)), ids=lambda value: value[:8])
+def test_stack_parser_matches_recursive(label, code):
+    stream = TokenStream(code)
+    assert same_tree(StackTreeParser(stream).parse_program(), TreeParser(stream).parse_program())
+
+# Far past the call stack: only the explicit-stack parser gets through
+@pytest.mark.parametrize("label, code", list(nested_sources(100_000)), ids=lambda value: value[:8])
+def test_stack_parser_handles_deep_nesting(label, code):
+    stream = TokenStream(code)
+    parser = StackTreeParser(stream)
+    assert parser.parse_program() is not None and parser.errors == []
+    with pytest.raises(RecursionError):
+        TreeParser(stream).parse_program()
+
+# Folded constants keep their type in an arena: WIN, 1 and 1.0 are equal
+def test_arena_keeps_constant_types():
+    tree = parse_source("HAI\nVISIBLE WIN\nVISIBLE 1\nVISIBLE 1.0\nVISIBLE SUM OF 0.5 AN 0.5\nKTHXBYE\n")
+    fold_constants(tree)
+    copy = NodeArena.from_tree(tree)
+    assert same_tree(copy, tree)
+    assert [type(node.value) for node in iter_nodes(copy)] == [type(node.value) for node in iter_nodes(tree)]
+
+
+# -------------------------
+# Analysis
+# -------------------------
+def test_inferred_types_hold():
+    wrong = []
+    for name, tree, input_text in differential_programs():
+        wrong += check_types(name, tree, input_text)
+    assert wrong == []
+
+def test_prefix_evaluator_matches_ast():
+    assert prefix_mismatches(500) == []
+
+def test_semantics_skip_obtw():
+    code = "HAI\nWAZZUP\nI HAS A x ITZ 1\nBUHBYE\nOBTW\nx R y\nTLDR\nVISIBLE x\nKTHXBYE\n"
+    assert analyze_semantics(code) == ([], {"x": 1})
+
+# Dead code is still checked; the optimizer's findings stay warnings
+def test_semantics_check_dead_code():
+    code = ("HAI\nIM IN YR l\nGTFO\nVISIBLE nope\nIM OUTTA YR l\n"
+            "FAIL\nO RLY?\nYA RLY\nVISIBLE gone\nOIC\nKTHXBYE\n")
+    warnings = []
+    errors, _ = analyze_semantics_from_code(code, warnings)
+    assert errors == ["Variable 'nope' used before declaration.", "Variable 'gone' used before declaration."]
+    assert len(warnings) == 2
+
+# Known values in the symbol table are the ones every engine computes
+def test_symbol_values_match_runtime():
+    code = ("HAI\nWAZZUP\nI HAS A q ITZ QUOSHUNT OF -7 AN 2\nI HAS A m ITZ MOD OF -7 AN 2\n"
+            "I HAS A f ITZ QUOSHUNT OF 7.0 AN \"2\"\nI HAS A s ITZ SMOOSH 1.5 AN WIN AN q MKAY\n"
+            "I HAS A t ITZ SUM OF WIN AN m\nBUHBYE\nKTHXBYE\n")
+    errors, symbols = analyze_semantics_from_code(code)
+    expected = evaluate(parse_source(code))
+    assert errors == []
+    assert {name: (type(value), value) for name, value in symbols.items()} == \
+        {name: (type(expected[name]), expected[name]) for name in symbols}
@@ -0,0 +1,326 @@
+'''
+Compact token storage for the parsers.
+
+A TokenStream keeps token kinds as small-int `Kind` codes and token
+positions in array columns (struct-of-arrays). Token text is sliced from the
+source only when asked for; keyword tokens share one phrase string each.
+'''
+
+import mmap
+import os
+from array import array
+
+from lexer import keyword_specs, scan_tokens, STR_SYNTAX, BYTES_SYNTAX, non_ascii_regex
+
+# -------------------------
+# Token kinds
+# -------------------------
+# EOF is what a stream reports past its last token
+KIND_NAMES = (["EOF", "COMMENT", "COMMENT_MULTI"]
+              + list(dict.fromkeys(kind for kind, _ in keyword_specs if not kind.startswith("COMMENT")))
+              + ["IDENTIFIER", "INT_LITERAL", "FLOAT_LITERAL", "STRING"])
+KIND_CODES = {name: code for code, name in enumerate(KIND_NAMES)}
+
+# Kind.IDENTIFIER etc. are plain small ints (IntEnum member lookups are
+# several times slower, which shows in the parsers' hot paths)
+Kind = type("Kind", (), dict(KIND_CODES))
+
+def kind_name(code):
+    return KIND_NAMES[code] if code is not None else None
+
+COMMENT_KINDS = frozenset((Kind.COMMENT, Kind.COMMENT_MULTI))
+
+# Every keyword phrase gets a code; -1 marks a token whose value is source text
+PHRASES = [phrase for _, phrases in keyword_specs for phrase in phrases]
+PHRASE_CODES = {phrase: i for i, phrase in enumerate(PHRASES)}
+
+EOF_TOKEN = (Kind.EOF, None, None, None)
+
+# Kinds whose value is always taken from the source text
+TEXT_KINDS = frozenset((Kind.COMMENT, Kind.COMMENT_MULTI, Kind.IDENTIFIER,
+                        Kind.INT_LITERAL, Kind.FLOAT_LITERAL, Kind.STRING))
+
+
+# -------------------------
+# Token Stream
+# -------------------------
+class TokenStream:
+    '''
+    Tokens of `source` (a str, or a bytes-like buffer decoded with
+    `encoding`). Index access returns the usual (kind, value, line, col)
+    tuple; the parsers use kind()/value()/line()/col() instead.
+    Offsets are stored as array('i'), so sources are limited to 2 GB.
+    '''
+    def __init__(self, source="", encoding="utf-8"):
+        self.source = source
+        self.str_source = isinstance(source, str)
+        self.encoding = encoding
+        self.kinds = array("B")
+        self.phrases = array("h")
+        self.starts = array("i")
+        self.ends = array("i")
+        self.lines = array("i")
+        self.cols = array("i")
+        if source:
+            self.scan()
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        '''Build a stream from (kind, value, line, col) tuples, e.g. filter_tokens output.'''
+        stream = cls()
+        texts = []
+        offset = 0
+        for kind, value, line, col in tokens:
+            code = KIND_CODES[kind]
+            phrase = -1 if code in TEXT_KINDS else PHRASE_CODES.get(value, -1)
+            start = offset
+            if phrase < 0:
+                texts.append(value)
+                offset += len(value)
+            stream.append(code, phrase, start, offset, line, col)
+        stream.source = "".join(texts)
+        return stream
+
+    # Split into (code tokens, comment tokens); both share this stream's source
+    def split_comments(self):
+        code, comments = self.empty_like(), self.empty_like()
+        kinds, phrases, starts, ends, lines, cols = (
+            self.kinds, self.phrases, self.starts, self.ends, self.lines, self.cols)
+        for i, kind in enumerate(kinds):
+            target = comments if kind in COMMENT_KINDS else code
+            target.append(kind, phrases[i], starts[i], ends[i], lines[i], cols[i])
+        return code, comments
+
+    def empty_like(self):
+        stream = TokenStream(encoding=self.encoding)
+        stream.source = self.source
+        stream.str_source = self.str_source
+        return stream
+
+    def append(self, kind, phrase, start, end, line, col):
+        self.kinds.append(kind)
+        self.phrases.append(phrase)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.cols.append(col)
+
+    # Columns from lexer.scan_tokens; text stays in `source` as offsets
+    def scan(self):
+        source = self.source
+        if isinstance(source, str):
+            syntax, newline, cr = STR_SYNTAX, "\n", "\r"
+            exact_cols = False
+        else:
+            syntax, newline, cr = BYTES_SYNTAX, b"\n", b"\r"
+            # Columns count characters, so multi-byte text needs decoding
+            exact_cols = non_ascii_regex.search(source) is not None
+
+        append = self.append
+        line_num = 1
+        line_start = 0
+        for kind, value, line, col in scan_tokens(source, syntax=syntax):
+            while line_num < line:
+                line_start = source.find(newline, line_start) + 1
+                line_num += 1
+            start = line_start + col - 1
+            end = start + len(value)
+            code = KIND_CODES[kind]
+            if code in TEXT_KINDS:
+                phrase = -1
+                if code == Kind.COMMENT and value[-1:] == cr:
+                    end -= 1    # CRLF line ending
+            else:
+                phrase = PHRASE_CODES[value]
+            if exact_cols:
+                col = len(source[line_start:start].decode(self.encoding, "replace")) + 1
+            append(code, phrase, start, end, line, col)
+
+    # -------------------------
+    # Column access
+    # -------------------------
+    def kind(self, index):
+        try:
+            return self.kinds[index]
+        except IndexError:
+            return Kind.EOF
+
+    # (kind code, value, line, col) in one call
+    def token(self, index):
+        try:
+            kind = self.kinds[index]
+        except IndexError:
+            return EOF_TOKEN
+        phrase = self.phrases[index]
+        if phrase >= 0:
+            value = PHRASES[phrase]
+        elif self.str_source:
+            value = self.source[self.starts[index]:self.ends[index]]
+        else:
+            value = self.text(index)
+        return kind, value, self.lines[index], self.cols[index]
+
+    def value(self, index):
+        phrase = self.phrases[index]
+        if phrase >= 0:
+            return PHRASES[phrase]
+        return self.text(index)
+
+    def line(self, index):
+        return self.lines[index]
+
+    def col(self, index):
+        return self.cols[index]
+
+    # Source text of a token, with newlines read as in text mode
+    def text(self, index):
+        text = self.source[self.starts[index]:self.ends[index]]
+        if not isinstance(text, str):
+            text = text.decode(self.encoding)
+        if self.kinds[index] == Kind.COMMENT_MULTI:
+            text = text.replace("\r\n", "\n")
+        return text
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        return KIND_NAMES[self.kinds[index]], self.value(index), self.lines[index], self.cols[index]
+
+
+# -------------------------
+# Memory-mapped tokens
+# -------------------------
+class MappedTokens(TokenStream):
+    '''
+    TokenStream scanned directly over an mmap of a source file, so the
+    file is never decoded into one big str. Use as a context manager or
+    call close() when done.
+    '''
+    def __init__(self, path, encoding="utf-8"):
+        self.file = open(path, "rb")
+        if os.fstat(self.file.fileno()).st_size:
+            buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = b""    # empty files cannot be mapped
+        super().__init__(buffer, encoding)
+
+    def close(self):
+        if isinstance(self.source, mmap.mmap):
+            self.source.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def tokenize_mmap(path, encoding="utf-8"):
+    return MappedTokens(path, encoding)
+
+
+# -------------------------
+# Token Window
+# -------------------------
+class TokenWindow:
+    '''
+    Stream-like view over a lazy iterator of token tuples (e.g.
+    lexer.iter_tokens). Tokens are pulled on demand and only the last
+    `keep` tokens before the most recently accessed index are kept, so
+    lookahead/lookbehind is bounded; older tokens read as EOF.
+    '''
+    def __init__(self, tokens, keep=4):
+        self.source = iter(tokens)
+        self.window = []
+        self.offset = 0     # index of window[0] in the whole token sequence
+        self.keep = keep
+
+    def __getitem__(self, index):
+        if index < self.offset:
+            raise IndexError(f"Token {index} has left the lookahead window")
+        while index >= self.offset + len(self.window):
+            token = next(self.source, None)
+            if token is None:
+                raise IndexError(index)
+            self.window.append(token)
+
+        drop = index - self.keep - self.offset
+        if drop > 0:
+            del self.window[:drop]
+            self.offset += drop
+        return self.window[index - self.offset]
+
+    def kind(self, index):
+        try:
+            return KIND_CODES[self[index][0]]
+        except IndexError:
+            return Kind.EOF
+
+    def token(self, index):
+        try:
+            kind, value, line, col = self[index]
+        except IndexError:
+            return EOF_TOKEN
+        return KIND_CODES[kind], value, line, col
+
+    def value(self, index):
+        return self[index][1]
+
+    def line(self, index):
+        return self[index][2]
+
+    def col(self, index):
+        return self[index][3]
+
+
+# -------------------------
+# Token Cursor
+# -------------------------
+class TokenCursor:
+    '''
+    Parser position over the non-comment tokens of a token source.
+    Comments are split off once up front and kept in `comments` for tools
+    that need them, so `current`, peek() and advance() are constant time.
+    `current` is the (kind code, value, line, col) tuple at the cursor.
+    '''
+    def __init__(self, tokens):
+        if isinstance(tokens, TokenWindow):
+            tokens = tokens.source      # a fresh window: filter its iterator
+        source = token_source(tokens)
+        if isinstance(source, TokenStream):
+            self.tokens, self.comments = source.split_comments()
+        else:
+            self.comments = []
+            self.tokens = TokenWindow(self.divert_comments(tokens))
+        self.pos = 0
+        self.current = self.tokens.token(0)
+
+    # Lazily filter a token iterator, keeping comments on the side
+    def divert_comments(self, tokens):
+        comments = self.comments
+        for token in tokens:
+            if token[0].startswith("COMMENT"):
+                comments.append(token)
+            else:
+                yield token
+
+    def advance(self):
+        self.pos += 1
+        self.current = self.tokens.token(self.pos)
+
+    # Token k positions away from the cursor (k may be negative)
+    def peek(self, k=1):
+        index = self.pos + k
+        if index < 0:
+            return EOF_TOKEN
+        return self.tokens.token(index)
+
+
+# Wrap whatever a parser was given (token list, TokenStream, token iterator)
+def token_source(tokens):
+    if isinstance(tokens, (TokenStream, TokenWindow)):
+        return tokens
+    if isinstance(tokens, (list, tuple)):
+        return TokenStream.from_tokens(tokens)
+    return TokenWindow(tokens)
@@ -0,0 +1,525 @@
+'''
+Ahead-of-time transpiler from TreeParser ASTs to Python source.
+
+The generated module has one `def f_<name>` per HOW IZ I and a `main(stdin,
+stdout)` for the program body. LOLCODE variables become Python locals named
+`v_<name>`, loops become `while` loops, and SUM/DIFF/PRODUKT OF become native
+arithmetic guarded by a NUMBR/NUMBAR type test. The module imports
+runtime.py; the command line writes a standalone module with runtime.py
+inlined, which runs from anywhere.
+
+Usage:  python transpiler.py program.lol [-o program.py]
+'''
+
+import inspect
+import sys
+
+import runtime
+from lexer import iter_tokens
+from tree_parser import TreeParser
+from optimizer import fold_constants
+from resolver import declared_names
+from runtime import CONSTANT_TYPES, node_constant
+
+PREAMBLE_HEAD = """\
+# Generated from LOLCODE by transpiler.py
+import sys
+"""
+RUNTIME_IMPORT = """\
+from runtime import (LOLError, cast, to_number, to_yarn, lol_saem, lol_quoshunt, lol_mod,
+                     lol_biggr, lol_smallr, lol_sum, lol_diff, lol_produkt)
+"""
+PREAMBLE_BODY = """
+_NUM = frozenset((int, float))
+_write = sys.stdout.write
+_readline = sys.stdin.readline
+
+def _fail(message):
+    raise LOLError(message)
+
+# A declared variable read before its I HAS A has run
+def _unbound(error):
+    raise LOLError(f"Variable used before declaration ({error})") from None
+
+def _frame(names):
+    return {name[2:] if name.startswith("v_") else name: value
+            for name, value in names.items() if name.startswith("v_") or name == "IT"}
+"""
+PREAMBLE = PREAMBLE_HEAD + RUNTIME_IMPORT + PREAMBLE_BODY
+
+# Preamble with runtime.py pasted in place of the import, so the program
+# runs without it
+def standalone_preamble():
+    return PREAMBLE_HEAD + "\n# ---- runtime.py ----\n" + inspect.getsource(runtime) + PREAMBLE_BODY
+
+# Native operator and fallback for arithmetic that can stay in Python
+NATIVE_OPS = {"SUM OF": ("+", "lol_sum"), "DIFF OF": ("-", "lol_diff"), "PRODUKT OF": ("*", "lol_produkt")}
+CALL_OPS = {"QUOSHUNT OF": "lol_quoshunt", "MOD OF": "lol_mod", "BIGGR OF": "lol_biggr", "SMALLR OF": "lol_smallr"}
+BOOL_OPS = {"BOTH OF": "&", "EITHER OF": "|", "WON OF": "^"}
+
+LOOP_PARTS = frozenset(("IMINYR", "LOOP_NAME", "DIRECTION", "BLOCK", "LOOP_END"))
+
+# Static kinds of translated expressions
+NUM, YARN, TROOF = "num", "yarn", "troof"
+
+
+def var(name):
+    return f"v_{name}" if name != "IT" else "IT"
+
+def func(name):
+    return f"f_{name}"
+
+
+class Transpiler:
+    def __init__(self):
+        self.preamble = PREAMBLE
+        self.lines = []
+        self.level = 0
+        self.temps = 0
+        self.functions = {}     # name -> parameter count
+        # Innermost breakable construct: "loop", "switch", "function" or "main"
+        self.scopes = []
+        self.declared = set()   # names declared anywhere in the current scope
+        self.kinds = {}         # variables with a known static kind
+
+        self.expr_translators = {
+            "LITERAL": self.literal,
+            "IDENTIFIER": self.identifier,
+            "OP": self.operator,
+            "COMPARISON": self.operator,
+            "LOGICAL": self.operator,
+            "SMOOSH": self.operator,
+            "NOT": self.not_expr,
+            "TYPECAST": self.typecast,
+            "FUNC_CALL": self.call,
+            "INPUT": self.read,
+        }
+        self.expr_translators.update(dict.fromkeys(CONSTANT_TYPES, self.literal))
+        self.statement_translators = {
+            "PRINT": self.print_stmt,
+            "VAR_DEC": self.declaration,
+            "ASSIGN": self.assignment,
+            "EXPR_STMT": self.expr_stmt,
+            "FUNC_CALL": self.call_stmt,
+            "INPUT": self.input_stmt,
+            "IF": self.conditional,
+            "SWITCH": self.switch,
+            "LOOP": self.loop,
+            "RETURN": self.return_stmt,
+            "EXIT": self.exit_stmt,
+            "EXCEPTION": self.exception_handling,
+            "FUNC_DEF": lambda node: None,      # emitted at module level
+        }
+
+    def transpile(self, tree):
+        definitions = []
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            if node.node_type == "FUNC_DEF":
+                definitions.append(node)
+            pending.extend(reversed(node.children))
+        for node in definitions:
+            self.functions[node.children[1].value] = len(node.children[2].children)
+
+        self.lines.append(self.preamble)
+        for node in definitions:
+            self.function(node)
+            self.emit("")
+
+        self.emit("def main(stdin=None, stdout=None):")
+        self.level += 1
+        self.emit("global _write, _readline")
+        self.emit("_write = (stdout or sys.stdout).write")
+        self.emit("_readline = (stdin or sys.stdin).readline")
+        self.begin_unbound_guard()
+        self.emit("IT = None")
+        self.declared = declared_names(tree)
+        self.scopes.append("main")
+        for node in tree.children:
+            if node.node_type == "STMT_LIST":
+                self.statements(node)
+        self.scopes.pop()
+        self.emit("return _frame(locals())")
+        self.end_unbound_guard()
+        self.level -= 1
+        self.emit("")
+        self.emit('if __name__ == "__main__":')
+        self.emit("    main()")
+        return "\n".join(self.lines) + "\n"
+
+    # def f_<name>(...) for a FUNC_DEF. `param_kinds` maps parameters that
+    # the body never reassigns to a known static kind (for specialization)
+    def function(self, node, param_kinds=None):
+        params = [param.value for param in node.children[2].children]
+        self.emit(f"def {func(node.children[1].value)}({', '.join(map(var, params))}):")
+        self.declared = declared_names(node.children[3])
+        self.declared.update(params)
+        self.kinds = {}
+        if param_kinds:
+            assigned = assigned_names(node.children[3])
+            self.kinds = {name: kind for name, kind in param_kinds.items() if name not in assigned}
+        self.level += 1
+        self.scopes.append("function")
+        self.begin_unbound_guard()
+        self.emit("IT = None")
+        self.block(node.children[3])
+        self.emit("return IT")
+        self.end_unbound_guard()
+        self.scopes.pop()
+        self.level -= 1
+        self.kinds = {}
+
+    # Reading a declared local before it is assigned raises Python's
+    # UnboundLocalError; report that as LOLCODE's use before declaration.
+    # Any other NameError is a bug in the generated code and propagates.
+    def begin_unbound_guard(self):
+        self.emit("try:")
+        self.level += 1
+
+    def end_unbound_guard(self):
+        self.level -= 1
+        self.emit("except UnboundLocalError as e:")
+        self.emit("    _unbound(e)")
+
+    def emit(self, line):
+        self.lines.append("    " * self.level + line if line else "")
+
+    # Target for a store; never-declared names fail like the other engines
+    def store(self, node):
+        if node.value in self.declared:
+            return var(node.value)
+        return None
+
+    def undeclared(self, node):
+        return f"_fail({f'Line {node.line}: Variable {node.value!r} used before declaration.'!r})"
+
+    def temp(self):
+        self.temps += 1
+        return f"_t{self.temps}"
+
+    # -------------------------
+    # Statements
+    # -------------------------
+    def statements(self, stmt_list):
+        start = len(self.lines)
+        for node in stmt_list.children:
+            translator = self.statement_translators.get(node.node_type)
+            if translator is None:
+                self.emit(f"_fail({f'Line {node.line}: cannot run {node.node_type} {node.value}'!r})")
+            else:
+                translator(node)
+        if len(self.lines) == start:
+            self.emit("pass")
+
+    def block(self, node):
+        self.statements(node.children[0])
+
+    def indented_block(self, node):
+        self.level += 1
+        self.block(node)
+        self.level -= 1
+
+    def print_stmt(self, node):
+        parts = []
+        for expr in node.children[1].children:
+            code, kind = self.expr(expr)
+            parts.append(code if kind == YARN else f"to_yarn({code})")
+        parts.append('"\\n"')
+        self.emit(f"_write({' + '.join(parts)})")
+
+    def declaration(self, node):
+        value = self.expr(node.children[1])[0] if len(node.children) > 1 else "None"
+        self.emit(f"{var(node.children[0].value)} = {value}")
+
+    def assignment(self, node):
+        value = self.expr(node.children[1])[0]
+        target = self.store(node.children[0])
+        if target is None:
+            self.emit(f"{value}, {self.undeclared(node.children[0])}")
+        else:
+            self.emit(f"{target} = {value}")
+
+    def expr_stmt(self, node):
+        expr = node.children[0]
+        if expr.node_type == "TYPECAST" and expr.children[0].node_type == "VAR":
+            name = var(expr.children[0].value)
+            self.emit(f"{name} = cast({name}, {expr.children[1].value!r})")
+            return
+        self.emit(f"IT = {self.expr(expr)[0]}")
+
+    def call_stmt(self, node):
+        self.emit(f"IT = {self.call(node)[0]}")
+
+    def input_stmt(self, node):
+        self.emit(self.read(node)[0])
+
+    def conditional(self, node):
+        keyword = "if"
+        for child in node.children[1:]:
+            t = child.node_type
+            if t == "YA_RLY":
+                self.emit("if IT:")
+                self.indented_block(child.children[0])
+                keyword = "elif"
+            elif t == "MEBBE":
+                self.emit(f"{keyword} {self.expr(child.children[0])[0]}:")
+                self.indented_block(child.children[1])
+            elif t == "NO_WAI":
+                self.emit("else:")
+                self.indented_block(child.children[0])
+
+    # Python has no fall-through, so the matching case's index is computed
+    # first and each block runs if it is at or after that index; a
+    # one-pass `while True` gives GTFO something to break out of
+    def switch(self, node):
+        case = self.temp()
+        self.emit(f"IT = {self.expr(node.children[0])[0]}")
+        blocks = []
+        default = None
+        keyword = "if"
+        for child in node.children[1:]:
+            if child.node_type == "CASE":
+                literal = repr(node_constant(child.children[0]))
+                self.emit(f"{keyword} lol_saem(IT, {literal}):")
+                self.emit(f"    {case} = {len(blocks)}")
+                keyword = "elif"
+                blocks.append(child.children[1])
+            elif child.node_type == "DEFAULT":
+                default = child.children[0]
+        # No match starts at OMGWTF, which comes after every case (or at the end)
+        no_match = len(blocks)
+        if default is not None:
+            blocks.append(default)
+        if keyword == "if":
+            self.emit(f"{case} = {no_match}")
+        else:
+            self.emit("else:")
+            self.emit(f"    {case} = {no_match}")
+
+        self.emit("while True:")
+        self.level += 1
+        self.scopes.append("switch")
+        for i, block in enumerate(blocks):
+            self.emit(f"if {case} <= {i}:")
+            self.indented_block(block)
+        self.emit("break")
+        self.scopes.pop()
+        self.level -= 1
+
+    def loop(self, node):
+        name = None
+        step = None
+        condition = "True"
+        body = None
+        for child in node.children:
+            t = child.node_type
+            if t == "DIRECTION":
+                step = "+" if child.children[0].value == "UPPIN" else "-"
+                name = var(child.children[1].value)
+            elif t == "BLOCK":
+                body = child
+            elif t == "WILE":
+                condition = self.expr(child.children[0])[0]
+            elif t not in LOOP_PARTS:
+                condition = f"not {self.expr(child)[0]}"
+
+        if name is not None:
+            self.emit(f"try:")
+            self.emit(f"    {name}")
+            self.emit(f"except UnboundLocalError:")
+            self.emit(f"    {name} = 0")
+        self.emit(f"while {condition}:")
+        self.level += 1
+        self.scopes.append("loop")
+        self.block(body)
+        self.scopes.pop()
+        if name is not None:
+            self.emit(f"{name} = ({name} if type({name}) is int else to_number({name})) {step} 1")
+        self.level -= 1
+
+    def return_stmt(self, node):
+        self.emit(f"return {self.expr(node.children[-1])[0]}")
+
+    def exit_stmt(self, node):
+        scope = self.scopes[-1]
+        if scope in ("loop", "switch"):
+            self.emit("break")
+        elif scope == "function":
+            self.emit("return None")
+        else:
+            self.emit("return _frame(locals())")
+
+    def exception_handling(self, node):
+        self.emit("try:")
+        for child in node.children:
+            if child.node_type == "SUCCESS":
+                self.indented_block(child.children[0])
+        self.emit("except (LOLError, UnboundLocalError):")
+        fail = [child for child in node.children if child.node_type == "FAIL"]
+        if fail:
+            self.indented_block(fail[0].children[0])
+        else:
+            self.emit("    pass")
+
+    # -------------------------
+    # Expressions: each returns (python source, static kind or None)
+    # -------------------------
+    def expr(self, node):
+        translator = self.expr_translators.get(node.node_type)
+        if translator is None:
+            return f"_fail({f'Line {node.line}: cannot run {node.node_type} {node.value}'!r})", None
+        return translator(node)
+
+    def literal(self, node):
+        value = node_constant(node)
+        kind = {bool: TROOF, str: YARN}.get(type(value), NUM)
+        return repr(value), kind
+
+    def identifier(self, node):
+        if node.value not in self.declared:
+            return self.undeclared(node), None
+        return var(node.value), self.kinds.get(node.value)
+
+    def operator(self, node):
+        op = node.value
+        operands = [self.expr(child) for child in node.children]
+        codes = [code for code, _ in operands]
+
+        if op in NATIVE_OPS and len(operands) == 2:
+            symbol, fallback = NATIVE_OPS[op]
+            if operands[0][1] == NUM and operands[1][1] == NUM:
+                return f"({codes[0]} {symbol} {codes[1]})", NUM
+            a, b = self.temp(), self.temp()
+            return (f"({a} {symbol} {b} if (type({a} := {codes[0]}) in _NUM) & "
+                    f"(type({b} := {codes[1]}) in _NUM) else {fallback}({a}, {b}))"), NUM
+        if op in CALL_OPS:
+            return f"{CALL_OPS[op]}({codes[0]}, {codes[1]})", NUM
+        if op in ("BOTH SAEM", "DIFFRINT"):
+            if operands[0][1] == NUM and operands[1][1] == NUM:
+                same = f"({codes[0]} == {codes[1]})"
+            else:
+                same = f"lol_saem({codes[0]}, {codes[1]})"
+            return (same if op == "BOTH SAEM" else f"(not {same})"), TROOF
+        if op in BOOL_OPS:
+            return f"(bool({codes[0]}) {BOOL_OPS[op]} bool({codes[1]}))", TROOF
+        if op == "ALL OF":
+            return f"all(({', '.join(codes)},))", TROOF
+        if op == "ANY OF":
+            return f"any(({', '.join(codes)},))", TROOF
+        if op == "SMOOSH":
+            parts = [code if kind == YARN else f"to_yarn({code})" for code, kind in operands]
+            return f"({' + '.join(parts) or repr('')})", YARN
+        return f"_fail({f'Line {node.line}: cannot run {node.node_type} {op}'!r})", None
+
+    def not_expr(self, node):
+        return f"(not {self.expr(node.children[0])[0]})", TROOF
+
+    def typecast(self, node):
+        type_literal = node.children[-1].value
+        kind = {"YARN": YARN, "TROOF": TROOF, "NUMBR": NUM, "NUMBAR": NUM}.get(type_literal)
+        if node.children[0].node_type == "VAR":
+            name = var(node.children[0].value)
+            return f"({name} := cast({name}, {type_literal!r}))", kind
+        return f"cast({self.expr(node.children[1])[0]}, {type_literal!r})", kind
+
+    def call(self, node):
+        name = node.children[1].value
+        args = [self.expr(arg.children[0])[0] for arg in node.children[2].children]
+        if name not in self.functions:
+            return f"_fail({f'Line {node.line}: Unknown function {name!r}'!r})", None
+        if len(args) != self.functions[name]:
+            message = f"Function '{name}' takes {self.functions[name]} arguments, got {len(args)}"
+            return f"_fail({message!r})", None
+        return f"{func(name)}({', '.join(args)})", None
+
+    def read(self, node):
+        target = self.store(node.children[1])
+        if target is None:
+            return self.undeclared(node.children[1]), YARN
+        return f"({target} := _readline().rstrip('\\n'))", YARN
+
+
+# Variables a body stores into, besides through its declarations' ITZ
+def assigned_names(root):
+    names = set()
+    pending = list(root.children)
+    while pending:
+        node = pending.pop()
+        t = node.node_type
+        if t in ("ASSIGN", "VAR_DEC"):
+            names.add(node.children[0].value)
+        elif t == "INPUT":
+            names.add(node.children[1].value)
+        elif t == "DIRECTION":
+            names.add(node.children[1].value)
+        elif t == "TYPECAST" and node.children[0].node_type == "VAR":
+            names.add(node.children[0].value)
+        pending.extend(node.children)
+    return names
+
+# Static kind of values of a Python type, for specializing on argument types
+TYPE_KINDS = {int: NUM, float: NUM, str: YARN, bool: TROOF}
+
+def type_kind(value_type):
+    return TYPE_KINDS.get(value_type)
+
+
+def transpile(tree, standalone=False):
+    '''
+    Python module source for a TreeParser AST. It imports runtime.py
+    unless `standalone`, which inlines it instead.
+    '''
+    transpiler = Transpiler()
+    if standalone:
+        transpiler.preamble = standalone_preamble()
+    return transpiler.transpile(tree)
+
+def transpile_function(node, functions, param_kinds=None):
+    '''
+    Source of a single `def f_<name>` for a FUNC_DEF node, to be exec'd after
+    PREAMBLE. `functions` maps every callable function name to its arity.
+    '''
+    transpiler = Transpiler()
+    transpiler.functions = dict(functions)
+    transpiler.function(node, param_kinds)
+    return "\n".join(transpiler.lines) + "\n"
+
+def load(source, filename="<lolcode>"):
+    '''Compile and exec transpiled source; returns the module namespace.'''
+    namespace = {"__name__": "lolcode_program"}
+    exec(compile(source, filename, "exec"), namespace)
+    return namespace
+
+def run_transpiled(namespace, stdin=None, stdout=None):
+    '''Run a loaded module's main(); returns its final variables.'''
+    return namespace["main"](stdin, stdout)
+
+
+def main(argv):
+    out_path = None
+    if "-o" in argv:
+        i = argv.index("-o")
+        out_path = argv[i + 1] if i + 1 < len(argv) else None
+        argv = argv[:i] + argv[i + 2:]
+    if len(argv) != 1:
+        print("Usage: python transpiler.py program.lol [-o program.py]")
+        return 1
+    with open(argv[0], "r") as f:
+        parser = TreeParser(iter_tokens(f))
+        tree = parser.parse_program()
+    if parser.errors:
+        for error in parser.errors:
+            print("-", error)
+        return 1
+    fold_constants(tree)
+    source = transpile(tree, standalone=True)
+    if out_path is None:
+        sys.stdout.write(source)
+    else:
+        with open(out_path, "w") as f:
+            f.write(source)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,14 +1,14 @@
 import tkinter as tk
 from tkinter import filedialog, scrolledtext, ttk
-from lexer import tokenize, filter_tokens
-from tree_parser import TreeParser
-from tree_semantic import analyze_semantics_from_code
+from compilation import CompilationUnit
+from tree_semantic import analyze_unit
 
 class LOLCodeGUI:
     def __init__(self, root):
         self.root = root
         root.title("LOLCODE Interpreter")
         self.loaded_file_path = None  # Track last loaded file
+        self.unit = CompilationUnit("")  # Reused until the code changes
 
         # === Buttons ===
         self.load_button = tk.Button(root, text="Load File", command=self.load_file)
@@ -67,18 +67,14 @@ class LOLCodeGUI:
             with open(self.loaded_file_path, 'r') as f:
                 code = f.read()
 
-        # --- Tokenize ---
-        tokens = tokenize(code)
-        filtered_tokens = filter_tokens(tokens)
-        self.update_tokens(tokens)
-
-        # --- Parse ---
-        parser = TreeParser(filtered_tokens)
-        ast_root = parser.parse_program()
-        syntax_errors = parser.errors
+        # --- Tokenize, parse, analyze (each stage at most once per version) ---
+        unit = self.unit.update(code)
+        self.update_tokens(unit.tokens)
+        syntax_errors = unit.syntax_errors
 
         # --- Semantic analysis ---
-        semantic_errors, symbol_table = analyze_semantics_from_code(code)
+        warnings = []
+        semantic_errors, symbol_table = analyze_unit(unit, warnings)
 
         # --- Update symbol table ---
         self.update_symbols(symbol_table)
@@ -94,6 +90,10 @@ class LOLCodeGUI:
                 self.console.insert(tk.END, f"  - {err}\n")
         else:
             self.console.insert(tk.END, "No syntax or semantic errors found.\n")
+        if warnings and not syntax_errors:
+            self.console.insert(tk.END, "Warnings:\n")
+            for warning in warnings:
+                self.console.insert(tk.END, f"  - {warning}\n")
 
     def update_tokens(self, tokens):
         self.token_tree.delete(*self.token_tree.get_children())
@@ -1,7 +1,13 @@
+import io
+import sys
+from array import array
+
 # -------------------------
 # Parser Tree Node
 # -------------------------
 class TreeNode:
+    __slots__ = ("node_type", "value", "line", "children")
+
     def __init__(self, node_type, value=None, line=None):
         self.node_type = node_type  # e.g., "VAR_DECL", "FUNC_CALL"
         self.value = value          # e.g., var name, literal value, operator
@@ -13,8 +19,204 @@ class TreeNode:
             self.children.append(child)
 
     def pretty(self, level=0):
-        indent = " " * (level * 4)
-        out = f"{indent}{self.node_type}: {self.value}\n"
-        for c in self.children:
-            out += c.pretty(level + 1)
-        return out
+        out = io.StringIO()
+        write_tree(self, out, level=level)
+        return out.getvalue()
+
+
+# -------------------------
+# Tree Printer
+# -------------------------
+def write_tree(root, stream=None, max_depth=None, max_nodes=None, level=0, chunk_size=1 << 16):
+    '''
+    Write the pretty() form of `root` to `stream` (stdout by default)
+    without recursion, in chunks of about `chunk_size` characters.
+    Children below `max_depth` are replaced by one "..." line; output
+    stops after `max_nodes` nodes. Returns the number of nodes written.
+    '''
+    if stream is None:
+        stream = sys.stdout
+    buffer = []
+    buffered = 0
+    written = 0
+    pending = [iter((root,))]    # one children iterator per open level
+
+    while pending:
+        node = next(pending[-1], None)
+        if node is None:
+            pending.pop()
+            continue
+        depth = level + len(pending) - 1
+
+        if max_nodes is not None and written >= max_nodes:
+            buffer.append(f"... (stopped after {written} nodes)\n")
+            break
+        line = f"{' ' * (depth * 4)}{node.node_type}: {node.value}\n"
+        written += 1
+
+        children = node.children
+        if children:
+            if max_depth is not None and depth - level >= max_depth:
+                line += f"{' ' * ((depth + 1) * 4)}...\n"
+            else:
+                pending.append(iter(children))
+
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= chunk_size:
+            stream.write("".join(buffer))
+            buffer.clear()
+            buffered = 0
+
+    stream.write("".join(buffer))
+    return written
+
+
+# -------------------------
+# Tree Copy
+# -------------------------
+# Independent TreeNode copy of a subtree, for passes that rewrite in place
+def clone_tree(root):
+    top = TreeNode(root.node_type, root.value, root.line)
+    pending = [(top, root)]
+    while pending:
+        copy, node = pending.pop()
+        for child in node.children:
+            child_copy = TreeNode(child.node_type, child.value, child.line)
+            copy.children.append(child_copy)
+            pending.append((child_copy, child))
+    return top
+
+
+# -------------------------
+# Node Arena
+# -------------------------
+# -1 marks "no value / no line / no node" in the arena columns
+NONE = -1
+
+class NodeArena:
+    '''
+    Compact AST storage: one row per node across parallel arrays (node
+    type code, value index into an interned string table, line, first
+    child, next sibling). Nodes are handed out as ArenaNode views, which
+    behave like TreeNode.
+    '''
+    def __init__(self):
+        self.type_names = []        # node type code -> name
+        self.type_codes = {}
+        self.strings = []           # interned node values
+        self.string_codes = {}
+        self.types = array("B")
+        self.values = array("i")
+        self.lines = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.last_child = array("i")    # for O(1) appends while building
+
+    @classmethod
+    def from_tree(cls, root):
+        '''Copy a TreeNode tree into a new arena; returns the root ArenaNode.'''
+        arena = cls()
+        return ArenaNode(arena, arena.copy_tree(root))
+
+    def __len__(self):
+        return len(self.types)
+
+    # Keyed by type too: WIN, 1 and 1.0 are equal but distinct values
+    def intern(self, value):
+        key = (type(value), value)
+        code = self.string_codes.get(key)
+        if code is None:
+            code = self.string_codes[key] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def add_node(self, node_type, value=None, line=None):
+        code = self.type_codes.get(node_type)
+        if code is None:
+            code = self.type_codes[node_type] = len(self.type_names)
+            self.type_names.append(node_type)
+        self.types.append(code)
+        self.values.append(NONE if value is None else self.intern(value))
+        self.lines.append(NONE if line is None else line)
+        self.first_child.append(NONE)
+        self.next_sibling.append(NONE)
+        self.last_child.append(NONE)
+        return len(self.types) - 1
+
+    # TreeNode-style constructor, used as a parser's node_class
+    def new_node(self, node_type, value=None, line=None):
+        return ArenaNode(self, self.add_node(node_type, value, line))
+
+    def append_child(self, parent, child):
+        last = self.last_child[parent]
+        if last == NONE:
+            self.first_child[parent] = child
+        else:
+            self.next_sibling[last] = child
+        self.last_child[parent] = child
+
+    def children(self, index):
+        child = self.first_child[index]
+        while child != NONE:
+            yield child
+            child = self.next_sibling[child]
+
+    # Copy a TreeNode (or another arena's node) subtree in; returns its index
+    def copy_tree(self, root):
+        top = self.add_node(root.node_type, root.value, root.line)
+        pending = [(top, root)]
+        while pending:
+            index, node = pending.pop()
+            for child in node.children:
+                child_index = self.add_node(child.node_type, child.value, child.line)
+                self.append_child(index, child_index)
+                pending.append((child_index, child))
+        return top
+
+
+class ArenaNode:
+    '''TreeNode-compatible view of one node in a NodeArena.'''
+    __slots__ = ("arena", "index")
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def node_type(self):
+        return self.arena.type_names[self.arena.types[self.index]]
+
+    @property
+    def value(self):
+        code = self.arena.values[self.index]
+        return None if code == NONE else self.arena.strings[code]
+
+    @property
+    def line(self):
+        line = self.arena.lines[self.index]
+        return None if line == NONE else line
+
+    @property
+    def children(self):
+        arena = self.arena
+        return [ArenaNode(arena, child) for child in arena.children(self.index)]
+
+    def add(self, child):
+        if child is None:
+            return
+        if isinstance(child, ArenaNode) and child.arena is self.arena:
+            self.arena.append_child(self.index, child.index)
+        else:
+            self.arena.append_child(self.index, self.arena.copy_tree(child))
+
+    def pretty(self, level=0):
+        out = io.StringIO()
+        write_tree(self, out, level=level)
+        return out.getvalue()
+
+    def __eq__(self, other):
+        return isinstance(other, ArenaNode) and self.arena is other.arena and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.arena), self.index))
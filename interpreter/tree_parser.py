@@ -1,42 +1,132 @@
 '''
 This is a recursive-descent parser that generates an Abstract Syntax Tree (AST) for a LOLCODE program.
+StackTreeParser builds the same AST without Python recursion, for deeply nested programs.
 '''
 
-from lexer import tokenize
+from types import GeneratorType
+
 from parser import ParserError   # reuse your error class
 from tree_node import TreeNode   # the class above
+from token_stream import Kind, KIND_CODES, kind_name, TokenCursor
+from grammar import LL1_TABLE, TOKEN_TERMINALS, END
+
+LITERAL_KINDS = frozenset((Kind.INT_LITERAL, Kind.FLOAT_LITERAL, Kind.STRING, Kind.BOOL_TRUE, Kind.BOOL_FALSE))
+
+# FIRST(expr): token kinds that always start an expression, plus keyword
+# phrases that do although their kind also covers non-expression keywords
+EXPR_FIRST_KINDS = LITERAL_KINDS | frozenset((
+    Kind.IDENTIFIER, Kind.MAEK, Kind.ARITHMETIC_OPERATOR, Kind.COMPARISON_OPERATOR,
+    Kind.LOGICAL_OPERATOR, Kind.SMOOSH,
+))
+EXPR_FIRST_PHRASES = frozenset(("I IZ",))
+# VISIBLE also takes GIMMEH in its expression list
+EXPR_LIST_FIRST_PHRASES = EXPR_FIRST_PHRASES | frozenset(("GIMMEH",))
+
+# Requests a *_steps generator yields for a nested part it needs parsed;
+# a yielded generator is run as a nested step itself
+EXPR, BLOCK, STATEMENT, STATEMENT_LIST = "expr", "block", "statement", "statement_list"
+
+# Operator arity
+UNARY, BINARY, VARIADIC, VARIADIC_MKAY = range(4)
+
+# Operator phrase -> (node type, arity). Binary operators take exactly
+# `<expr> AN <expr>`; variadic ones take `<expr> (AN <expr>)*`, ended by a
+# required (VARIADIC_MKAY) or optional (VARIADIC) MKAY.
+EXPR_OPERATORS = {
+    "SUM OF": ("OP", BINARY),
+    "DIFF OF": ("OP", BINARY),
+    "PRODUKT OF": ("OP", BINARY),
+    "QUOSHUNT OF": ("OP", BINARY),
+    "MOD OF": ("OP", BINARY),
+    "BIGGR OF": ("COMPARISON", BINARY),
+    "SMALLR OF": ("COMPARISON", BINARY),
+    "BOTH SAEM": ("COMPARISON", BINARY),
+    "DIFFRINT": ("COMPARISON", BINARY),
+    "BOTH OF": ("LOGICAL", BINARY),
+    "EITHER OF": ("LOGICAL", BINARY),
+    "WON OF": ("LOGICAL", BINARY),
+    "ALL OF": ("LOGICAL", VARIADIC_MKAY),
+    "ANY OF": ("LOGICAL", VARIADIC_MKAY),
+    "NOT": ("NOT", UNARY),
+    "SMOOSH": ("SMOOSH", VARIADIC),
+}
+
+# LL(1) table rows keyed the way tokens are looked up: token-kind terminals
+# by Kind code, keyword terminals by phrase, "$" by Kind.EOF
+def table_row(nonterminal):
+    row = {}
+    for terminal, production in LL1_TABLE[nonterminal].items():
+        if terminal == END:
+            terminal = Kind.EOF
+        elif terminal in TOKEN_TERMINALS:
+            terminal = KIND_CODES[terminal]
+        row[terminal] = production
+    return row
+
+STMT_LIST_ROW = table_row("stmt_list")
+STMT_ROW = table_row("stmt")
+IDENT_TAIL_ROW = table_row("ident_tail")
+
+# Table entry for a token: keyword phrases first, then the token kind
+def predict(row, token):
+    entry = row.get(token[1])
+    if entry is None:
+        entry = row.get(token[0])
+    return entry
 
 # -------------------------
 # Tree Parser
 # -------------------------
 class TreeParser:
-    def __init__(self, tokens):
-        self.tokens = tokens
-        self.pos = 0
+    node_class = TreeNode
+
+    def __init__(self, tokens, arena=None):
+        # Accept a TokenStream, a token list or a lazy token iterator (e.g. lexer.iter_tokens)
+        self.cursor = TokenCursor(tokens)
+        # Build the AST into a tree_node.NodeArena instead of TreeNode objects
+        if arena is not None:
+            self.node_class = arena.new_node
         self.errors = []  # Collect parsing errors
+        self.in_wazzup = False
+
+        # Statement dispatch from the LL(1) table: stmt -> <name> is parse_<name>
+        self.statement_parsers = {
+            terminal: getattr(self, "parse_" + production[0]) for terminal, production in STMT_ROW.items()
+        }
+
+        # parse_expr dispatch on the current token kind
+        self.expr_parsers = dict.fromkeys(LITERAL_KINDS, self.parse_literal_expr)
+        self.expr_parsers.update({
+            Kind.IDENTIFIER: self.parse_identifier_expr,
+            Kind.MAEK: self.parse_typecast,
+            Kind.ARITHMETIC_OPERATOR: self.parse_operator,
+            Kind.COMPARISON_OPERATOR: self.parse_operator,
+            Kind.LOGICAL_OPERATOR: self.parse_operator,
+            Kind.SMOOSH: self.parse_operator,
+            Kind.FUNCTION_DEF_CALL: self.parse_call_expr,
+        })
     
     # -------------------------
     # Helpers
     # -------------------------
+    @property
+    def pos(self):
+        return self.cursor.pos
+
     def current(self):
-        while self.pos < len(self.tokens) and self.tokens[self.pos][0].startswith("COMMENT"):
-            self.pos += 1
-        if self.pos < len(self.tokens):
-            t = self.tokens[self.pos]
-            return t[0], t[1], t[2], t[3]  # type, value, line, col
-        return None, None, None, None
+        return self.cursor.current  # type, value, line, col
 
     def advance(self):
-        self.pos += 1
+        self.cursor.advance()
 
     def check(self, ttype, value=None):
         token_type, token_value, *_ = self.current()
         return token_type == ttype and (value is None or token_value == value)
     
     def previous(self):
-        if self.pos > 0:
-            t = self.tokens[self.pos - 1]
-            return {"type": t[0], "value": t[1], 'line': t[2] if len(t) > 2 else None}
+        if self.cursor.pos > 0:
+            token_type, token_value, line, _ = self.cursor.peek(-1)
+            return {"type": token_type, "value": token_value, "line": line}
         return None
 
     def match(self, ttype, value=None):
@@ -47,82 +137,74 @@ class TreeParser:
         return False
 
     def expect(self, ttype, value=None):
-        token_type, token_value, *_ = self.current()
+        token_type, token_value, line, _ = self.current()
         if token_type != ttype or (value is not None and token_value != value):
             # Record error
             self.errors.append(
-                f"Expected {ttype} {value}, got {token_type} {token_value} at position {self.pos}"
+                f"Expected {kind_name(ttype)} {value}, got {kind_name(token_type)} {token_value} at position {self.pos}"
             )
             # Attempt recovery: skip current token
             self.advance()
-            return {"type": token_type, "value": token_value}  # Still return something
+            return {"type": token_type, "value": token_value, "line": line}  # Still return something
         self.advance()
-        return {"type": token_type, "value": token_value}
+        return {"type": token_type, "value": token_value, "line": line}
     
     # Return the next token type and value without advancing
     def peek_next(self):
-        if self.pos + 1 < len(self.tokens):
-            t = self.tokens[self.pos + 1]
-            
-            # Allow either (type,value) or (type,value,line,col)
-            if isinstance(t, tuple):
-                if len(t) >= 2:
-                    return t[0], t[1]
-            return None, None
-        return None, None
+        token = self.cursor.peek(1)
+        return token[0], token[1]
     
     def peek_next_is_expr(self):
-        token_type, token_value = self.peek_next()
-        if token_type is None:
-            return False
-        return token_type in (
-            "INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE",
-            "IDENTIFIER", "MAEK", "ARITHMETIC_OPERATOR", "COMPARISON_OPERATOR",
-            "LOGICAL_OPERATOR", "SMOOSH", "FUNCTION_CALL", "IO"
-        ) or token_value in (
-            "SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF",
-            "BIGGR OF", "SMALLR OF", "BOTH SAEM", "DIFFRINT"
-        )
+        return self.starts_expr(self.cursor.peek(1))
+
+    # Run a *_steps generator, parsing each nested part it asks for by
+    # (Python) recursion. StackTreeParser runs them on an explicit stack.
+    def run_steps(self, steps):
+        value = None
+        while True:
+            try:
+                request = steps.send(value)
+            except StopIteration as done:
+                return done.value
+            if request is EXPR:
+                value = self.parse_expr()
+            elif request is BLOCK:
+                value = self.parse_block()
+            else:
+                value = self.run_steps(request)
+
+    # Is `token` in FIRST(expr)?
+    def starts_expr(self, token, phrases=EXPR_FIRST_PHRASES):
+        return token[0] in EXPR_FIRST_KINDS or (token[0] != Kind.STRING and token[1] in phrases)
 
     # -------------------------
     # Program Entry
     # -------------------------
     # PROGRAM ::= HAI stmt_list KTHXBYE
     def parse_program(self):
-        node = TreeNode("PROG")
-        self.expect("CODE_DELIMITER", "HAI")
-        node.add(TreeNode("HAI"))
+        node = self.node_class("PROG")
+        self.expect(Kind.CODE_DELIMITER, "HAI")
+        node.add(self.node_class("HAI"))
 
         node.add(self.parse_statement_list())
 
-        self.expect("CODE_DELIMITER", "KTHXBYE")
-        node.add(TreeNode("KTHXBYE"))
+        self.expect(Kind.CODE_DELIMITER, "KTHXBYE")
+        node.add(self.node_class("KTHXBYE"))
         return node
 
     # -------------------------
     # Statement Parsing
     # -------------------------
     def parse_statement_list(self):
-        node = TreeNode("STMT_LIST")
+        node = self.node_class("STMT_LIST")
+        cursor = self.cursor
         while True:
-            token_type, token_value, *_ = self.current()
-            
-            # End of program/block
-            if token_type in (None, "CODE_DELIMITER", "OIC", "IF U SAY SO",
-                       "IM OUTTA YR", "O NOES"):
+            token = cursor.current
+
+            # End of program/block: stmt_list -> epsilon on FOLLOW(stmt_list)
+            if predict(STMT_LIST_ROW, token) == [] or token[0] == Kind.EOF:
                 break
-            
-            # Handle WAZZUP/BUHBYE for variable declarations
-            if token_type == "VAR_LIST_DELIMITER":
-                if token_value == "WAZZUP":
-                    self.in_wazzup = True
-                    self.advance()
-                    continue  # skip this token
-                elif token_value == "BUHBYE":
-                    self.in_wazzup = False
-                    self.advance()
-                    continue  # skip this token
-                
+
             # Parse statement
             stmt = self.parse_statement()
             if stmt:
@@ -132,104 +214,53 @@ class TreeParser:
 
     # STATEMENT
     def parse_statement(self):
-        token_type, token_value, *_ = self.current()
-
-        # <print>
-        if token_type == "OUTPUT_KEYWORD":
-            return self.parse_print()
-
-        # <declaration>
-        elif token_type == "VAR_DECLARATION":
-            if not getattr(self, "in_wazzup", False):
-                self.errors.append(f"[pos {self.pos}] Variable declaration outside WAZZUP")
-            return self.parse_declaration()
-
-        # <identifier>
-        elif token_type == "IDENTIFIER":
-            next_type, next_value = self.peek_next()
-
-            # Assignment
-            if next_type == "VAR_ASSIGNMENT":
-                return self.parse_assignment()
-
-            # Typecast: x IS NOW A TYPE
-            elif next_type == "IS_NOW_A":
-                expr_node = self.parse_typecast()
-                node = TreeNode("EXPR_STMT")
-                node.add(expr_node)
-                return node
+        parser = predict(self.statement_parsers, self.cursor.current)
+        if parser is not None:
+            return parser()
 
-            # Otherwise treat as expression
-            else:
-                expr_node = self.parse_expr()
-                node = TreeNode("EXPR_STMT")
-                node.add(expr_node)
-                return node
-
-        # <typecast> with MAEK
-        elif token_type == "MAEK":
-            expr_node = self.parse_typecast()
-            node = TreeNode("EXPR_STMT")
-            node.add(expr_node)
-            return node
-
-        # <conditional>
-        elif token_type == "CONTROL_FLOW" and token_value == "O RLY?":
-            return self.parse_conditional()
-
-        # <loop>
-        elif token_type == "LOOPING" and token_value == "IM IN YR":
-            return self.parse_loop()
-
-        # <function_def>
-        elif token_type == "FUNCTION_DEF_CALL" and token_value == "HOW IZ I":
-            return self.parse_function_def()
-
-        # <function_call>
-        elif token_type == "FUNCTION_CALL" or (token_type == "I" and token_value == "IZ"):
-            return self.parse_function_call()
-
-        # Arithmetic operation line
-        elif token_type == "ARITHMETIC_OPERATOR":
-            expr = self.parse_expr()
-            node = TreeNode("EXPR_STMT")
-            node.add(expr)
-            return node
-
-        # <input>
-        elif token_type == "IO" and token_value == "GIMMEH":
-            return self.parse_input()
-
-        # <return>
-        elif token_type == "RETURN" or (token_type == "FOUND" and token_value == "YR"):
-            return self.parse_return()
+        # Unknown / error
+        token_type, token_value, *_ = self.current()
+        self.errors.append(
+            f"Unknown statement starting with {kind_name(token_type)} {token_value} at position {self.pos}"
+        )
+        self.advance()  # Skip token to continue parsing
+        return self.node_class("ERROR")
 
-        # <exit>
-        elif token_type in ("EXIT", "GTFO"):
-            self.advance()
-            return TreeNode("EXIT")
+    # WAZZUP / BUHBYE only mark the variable section
+    def parse_var_section(self):
+        self.in_wazzup = self.current()[1] == "WAZZUP"
+        self.advance()
+        return None
 
-        # <exception_handling>
-        elif token_type == "EXCEPTION" and token_value == "PLZ":
-            return self.parse_exception_handling()
+    # <varident> followed by R, IS NOW A, or nothing (an expression / switch subject)
+    def parse_ident_stmt(self):
+        return self.run_steps(self.ident_stmt_steps())
+
+    def ident_stmt_steps(self):
+        production = predict(IDENT_TAIL_ROW, self.cursor.peek(1))
+        if production == ["assignment"]:
+            return self.parse_assignment()
+        elif production == ["recast"]:
+            return self.parse_recast()
+        return (yield self.expr_stmt_steps())
+
+    # <varident> IS NOW A <type>
+    def parse_recast(self):
+        node = self.node_class("EXPR_STMT")
+        node.add(self.parse_typecast())
+        return node
 
-        # Expression-only lines (EXPR_STMT)
-        elif token_type in (
-            "INT_LITERAL", "FLOAT_LITERAL", "STRING", "IDENTIFIER",
-            "MAEK", "BOOL_TRUE", "BOOL_FALSE", "SMOOSH", "ARITHMETIC_OPERATOR"
-        ):
-            expr_node = self.parse_expr()
-            node = TreeNode("EXPR_STMT")
-            node.add(expr_node)
-            return node
+    # Expression-only lines (EXPR_STMT), or the expression a switch tests
+    def parse_expr_stmt(self):
+        return self.run_steps(self.expr_stmt_steps())
 
-        # Unknown / error
-        else:
-            self.errors.append(
-                f"Unknown statement starting with {token_type} {token_value} at position {self.pos}"
-            )
-            self.advance()  # Skip token to continue parsing
-            return TreeNode("ERROR")
+    def expr_stmt_steps(self):
+        expr_node = (yield EXPR)
+        if self.check(Kind.CONTROL_FLOW, "WTF?"):
+            return (yield self.switch_steps(expr_node))
+        node = self.node_class("EXPR_STMT")
+        node.add(expr_node)
+        return node
 
 
     # --------------------------
@@ -238,11 +269,11 @@ class TreeParser:
     
     # PRINT ::= VISIBLE expr_list
     def parse_print(self):
-        node = TreeNode("PRINT")
+        node = self.node_class("PRINT")
     
         # VISIBLE keyword
-        self.expect("OUTPUT_KEYWORD", "VISIBLE")
-        node.add(TreeNode("VISIBLE"))
+        self.expect(Kind.OUTPUT_KEYWORD, "VISIBLE")
+        node.add(self.node_class("VISIBLE"))
         
         # Parse a list of expressions
         expr_list_node = self.parse_expr_list()
@@ -252,18 +283,20 @@ class TreeParser:
     
     # <declaration> ::= I HAS A <varident> (ITZ <expr>)?
     def parse_declaration(self):
-        node = TreeNode("VAR_DEC")
+        node = self.node_class("VAR_DEC")
+        if not self.in_wazzup:
+            self.errors.append(f"[pos {self.pos}] Variable declaration outside WAZZUP")
 
         # I HAS A
-        self.expect("VAR_DECLARATION")
+        self.expect(Kind.VAR_DECLARATION)
 
         # Variable name
-        var_token = self.expect("IDENTIFIER")
-        var_node = TreeNode("IDENTIFIER", var_token['value'], var_token.get('line'))
+        var_token = self.expect(Kind.IDENTIFIER)
+        var_node = self.node_class("IDENTIFIER", var_token['value'], var_token.get('line'))
         node.add(var_node)
 
         # Optional: ITZ <expr>
-        if self.match("VAR_ASSIGNMENT"):
+        if self.match(Kind.VAR_ASSIGNMENT):
             expr_node = self.parse_expr()
             node.add(expr_node)
 
@@ -271,15 +304,15 @@ class TreeParser:
 
     # <assignment> ::= <varident> R <expr>
     def parse_assignment(self):
-        node = TreeNode("ASSIGN")
+        node = self.node_class("ASSIGN")
         
         # IDENTIFIER
-        ident = self.expect("IDENTIFIER")
-        ident_node = TreeNode("IDENTIFIER", ident['value'], ident.get('line'))
+        ident = self.expect(Kind.IDENTIFIER)
+        ident_node = self.node_class("IDENTIFIER", ident['value'], ident.get('line'))
         node.add(ident_node)
 
         # R keyword
-        self.expect("VAR_ASSIGNMENT")
+        self.expect(Kind.VAR_ASSIGNMENT)
 
         # expr
         expr_node = self.parse_expr()
@@ -289,15 +322,12 @@ class TreeParser:
     
     # <return> ::= FOUND YR <expr>
     def parse_return(self):
-        node = TreeNode("RETURN")
+        node = self.node_class("RETURN")
 
-        # FOUND
-        found_token = self.expect("RETURN_KEYWORD")  # should correspond to FOUND
-        node.add(TreeNode("FOUND", found_token["value"], found_token.get('line')))
-        
-        # YR
-        yr_token = self.expect("YR")
-        node.add(TreeNode("YR", yr_token["value"], yr_token.get('line')))
+        # FOUND YR (lexed as one keyword)
+        found_token = self.expect(Kind.CONTROL_FLOW, "FOUND YR")
+        node.add(self.node_class("FOUND", "FOUND", found_token.get('line')))
+        node.add(self.node_class("YR", "YR", found_token.get('line')))
 
         # Expression to return
         expr_node = self.parse_expr()
@@ -307,43 +337,46 @@ class TreeParser:
     
     # <exit> ::= GTFO
     def parse_exit(self):
-        gtfo_token = self.expect("EXIT_KEYWORD")  # token for GTFO
-        node = TreeNode("EXIT", gtfo_token["value"], gtfo_token.get('line'))
+        gtfo_token = self.expect(Kind.CONTROL_FLOW, "GTFO")
+        node = self.node_class("EXIT", None, gtfo_token.get('line'))
         return node
     
     # <typecast> ::= MAEK <expr> A <type>
     def parse_typecast(self):
-        node = TreeNode("TYPECAST")
+        return self.run_steps(self.typecast_steps())
+
+    def typecast_steps(self):
+        node = self.node_class("TYPECAST")
         
         token_type, token_value, *_ = self.current()
 
-        if token_type == "IDENTIFIER" and self.peek_next()[0] == "IS_NOW_A":
+        if token_type == Kind.IDENTIFIER and self.peek_next()[0] == Kind.IS_NOW_A:
             # Form: x IS NOW A TYPE
-            var_token = self.expect("IDENTIFIER")
-            node.add(TreeNode("VAR", var_token["value"], var_token.get('line')))
-            self.expect("IS_NOW_A")
-            type_token = self.expect("TYPE_LITERAL")
-            node.add(TreeNode("TYPE", type_token["value"], type_token.get('line')))
+            var_token = self.expect(Kind.IDENTIFIER)
+            node.add(self.node_class("VAR", var_token["value"], var_token.get('line')))
+            self.expect(Kind.IS_NOW_A)
+            type_token = self.expect(Kind.TYPE_LITERAL)
+            node.add(self.node_class("TYPE", type_token["value"], type_token.get('line')))
             return node
 
-        elif token_type == "MAEK":
+        elif token_type == Kind.MAEK:
             # Form: MAEK <expr> A <type>
-            maek_token = self.expect("MAEK")
-            node.add(TreeNode("MAEK", maek_token["value"], maek_token.get('line')))
+            maek_token = self.expect(Kind.MAEK)
+            node.add(self.node_class("MAEK", maek_token["value"], maek_token.get('line')))
 
             # Expression: allow literals, identifiers, or nested expressions (including SMOOSH)
-            expr_node = self.parse_expr()
+            expr_node = (yield EXPR)
             node.add(expr_node)
 
             # Optional "A"
-            self.match("A")  # consume "A" if present, ignore result
-            type_token = self.expect("TYPE_LITERAL")
-            node.add(TreeNode("TYPE", type_token["value"], type_token.get('line')))
+            self.match(Kind.A)  # consume "A" if present, ignore result
+            type_token = self.expect(Kind.TYPE_LITERAL)
+            node.add(self.node_class("TYPE", type_token["value"], type_token.get('line')))
 
             return node
 
         else:
-            self.errors.append(f"[pos {self.pos}] Invalid typecast start: {token_type} {token_value}")
+            self.errors.append(f"[pos {self.pos}] Invalid typecast start: {kind_name(token_type)} {token_value}")
             self.advance()
             return node
     
@@ -352,224 +385,257 @@ class TreeParser:
     #               (NO WAI <linebreak> <block>)?
     #               OIC
     def parse_conditional(self):
-        node = TreeNode("IF")
+        return self.run_steps(self.conditional_steps())
+
+    def conditional_steps(self):
+        node = self.node_class("IF")
 
         # O RLY?
-        orly_token = self.expect("ORLY")
-        node.add(TreeNode("ORLY", orly_token["value"], orly_token.get('line')))
+        orly_token = self.expect(Kind.CONTROL_FLOW, "O RLY?")
+        node.add(self.node_class("ORLY", orly_token["value"], orly_token.get('line')))
 
         # YA RLY
-        yarly_token = self.expect("YARLY")
-        ya_block = self.parse_block()
-        ya_node = TreeNode("YA_RLY", yarly_token["value"], yarly_token.get('line'))
+        yarly_token = self.expect(Kind.CONTROL_FLOW, "YA RLY")
+        ya_block = (yield BLOCK)
+        ya_node = self.node_class("YA_RLY", yarly_token["value"], yarly_token.get('line'))
         ya_node.add(ya_block)
         node.add(ya_node)
 
         # optional: any number of MEBBE <expr> <block>
-        while self.match("MEBBE"):
+        while self.match(Kind.CONTROL_FLOW, "MEBBE"):
             mebbe_token = self.previous()
-            expr = self.parse_expr()
-            block = self.parse_block()
-            mebbe_node = TreeNode("MEBBE", mebbe_token["value"], mebbe_token.get('line'))
+            expr = (yield EXPR)
+            block = (yield BLOCK)
+            mebbe_node = self.node_class("MEBBE", mebbe_token["value"], mebbe_token.get('line'))
             mebbe_node.add(expr)
             mebbe_node.add(block)
             node.add(mebbe_node)
 
         # optional NO WAI
-        if self.match("NOWAI"):
+        if self.match(Kind.CONTROL_FLOW, "NO WAI"):
             nowai_token = self.previous()
-            no_block = self.parse_block()
-            no_node = TreeNode("NO_WAI", nowai_token["value"], nowai_token.get('line'))
+            no_block = (yield BLOCK)
+            no_node = self.node_class("NO_WAI", nowai_token["value"], nowai_token.get('line'))
             no_node.add(no_block)
             node.add(no_node)
 
         # OIC
-        oic_token = self.expect("OIC")
-        node.add(TreeNode("OIC", oic_token["value"], oic_token.get('line')))
+        oic_token = self.expect(Kind.CONTROL_FLOW, "OIC")
+        node.add(self.node_class("OIC", oic_token["value"], oic_token.get('line')))
 
         return node
     
-    # <loop> ::= IM IN YR <loopident> [UPPIN|NERFIN] YR <varident> TIL <expr> <linebreak> <block> IM OUTTA YR <loopident>
+    # <loop> ::= IM IN YR <loopident> [UPPIN|NERFIN YR <varident>] [TIL|WILE <expr>] <linebreak> <block> IM OUTTA YR <loopident>
+    # A TIL condition is added as is; a WILE condition is wrapped in a WILE node
     def parse_loop(self):
-        node = TreeNode("LOOP")
+        return self.run_steps(self.loop_steps())
 
-        im_token = self.expect("IMINYR")
-        node.add(TreeNode("IMINYR", im_token["value"], im_token.get('line')))
+    def loop_steps(self):
+        node = self.node_class("LOOP")
+
+        im_token = self.expect(Kind.LOOPING, "IM IN YR")
+        node.add(self.node_class("IMINYR", im_token["value"], im_token.get('line')))
     
-        loop_name_token = self.expect("IDENTIFIER")
-        node.add(TreeNode("LOOP_NAME", loop_name_token["value"], loop_name_token.get('line')))
+        loop_name_token = self.expect(Kind.IDENTIFIER)
+        node.add(self.node_class("LOOP_NAME", loop_name_token["value"], loop_name_token.get('line')))
 
         # Optional UPPIN/NERFIN
-        if self.match("UPPIN", "NERFIN"):
+        if self.match(Kind.LOOPING, "UPPIN") or self.match(Kind.LOOPING, "NERFIN"):
             direction_token = self.previous()
-            self.expect("YR")
-            var_token = self.expect("IDENTIFIER")
+            self.expect(Kind.LOOPING, "YR")
+            var_token = self.expect(Kind.IDENTIFIER)
             
-            dir_node = TreeNode("DIRECTION")
-            dir_node.add(TreeNode("OP", direction_token["value"], direction_token.get('line')))
-            dir_node.add(TreeNode("VAR", var_token["value"], var_token.get('line')))
+            dir_node = self.node_class("DIRECTION")
+            dir_node.add(self.node_class("OP", direction_token["value"], direction_token.get('line')))
+            dir_node.add(self.node_class("VAR", var_token["value"], var_token.get('line')))
             node.add(dir_node)
 
-        self.expect("TIL")
-        cond_expr = self.parse_expr()
-        node.add(cond_expr)
+        if self.match(Kind.LOOPING, "TIL"):
+            cond_expr = (yield EXPR)
+            node.add(cond_expr)
+        elif self.match(Kind.LOOPING, "WILE"):
+            wile_token = self.previous()
+            cond_node = self.node_class("WILE", wile_token["value"], wile_token.get('line'))
+            cond_node.add((yield EXPR))
+            node.add(cond_node)
 
         # Loop block
-        block = self.parse_block()
+        block = (yield BLOCK)
         node.add(block)
 
         # Loop exit
-        self.expect("IMOUTTAYR")
-        end_name_token = self.expect("IDENTIFIER")
-        node.add(TreeNode("LOOP_END", end_name_token["value"], end_name_token.get('line')))
+        self.expect(Kind.LOOPING, "IM OUTTA YR")
+        end_name_token = self.expect(Kind.IDENTIFIER)
+        node.add(self.node_class("LOOP_END", end_name_token["value"], end_name_token.get('line')))
 
         return node
 
     # <switch> ::= <expr> <linebreak> WTF? <linebreak> (OMG <literal> <linebreak> <statement_list>)* [OMGWTF <linebreak> <statement_list>] OIC
-    def parse_switch(self):
-        node = TreeNode("SWITCH")
+    # `expr` is the already parsed switch expression, if any
+    def parse_switch(self, expr=None):
+        return self.run_steps(self.switch_steps(expr))
+
+    def switch_steps(self, expr=None):
+        node = self.node_class("SWITCH")
 
-        expr = self.parse_expr()
+        if expr is None:
+            expr = (yield EXPR)
         node.add(expr)
 
-        wtf_token = self.expect("WTF")
-        node.add(TreeNode("WTF", wtf_token["value"], wtf_token.get('line')))
+        wtf_token = self.expect(Kind.CONTROL_FLOW, "WTF?")
+        node.add(self.node_class("WTF", wtf_token["value"], wtf_token.get('line')))
 
         # OMG cases
-        while self.match("OMG"):
+        while self.match(Kind.CONTROL_FLOW, "OMG"):
             omg_token = self.previous()
             literal = self.parse_literal()
-            block = self.parse_block()
+            block = (yield BLOCK)
 
-            case_node = TreeNode("CASE", omg_token["value"], omg_token.get('line'))
+            case_node = self.node_class("CASE", omg_token["value"], omg_token.get('line'))
             case_node.add(literal)
             case_node.add(block)
             node.add(case_node)
 
         # Optional OMGWTF default case
-        if self.match("OMGWTF"):
+        if self.match(Kind.CONTROL_FLOW, "OMGWTF"):
             omgwtf_token = self.previous()
-            block = self.parse_block()
-            default_node = TreeNode("DEFAULT", omgwtf_token["value"], omgwtf_token.get('line'))
+            block = (yield BLOCK)
+            default_node = self.node_class("DEFAULT", omgwtf_token["value"], omgwtf_token.get('line'))
             default_node.add(block)
             node.add(default_node)
 
-        oic_token = self.expect("OIC")
-        node.add(TreeNode("OIC", oic_token["value"], oic_token.get('line')))
+        oic_token = self.expect(Kind.CONTROL_FLOW, "OIC")
+        node.add(self.node_class("OIC", oic_token["value"], oic_token.get('line')))
 
         return node
 
-    # <function_def> ::= HOW IZ I <funcident> (<param>)* <linebreak> <block> IF U SAY SO
+    # <function_def> ::= HOW IZ I <funcident> (YR <param> (AN YR <param>)*)? <linebreak> <block> IF U SAY SO
     def parse_function_def(self):
-        node = TreeNode("FUNC_DEF")
+        return self.run_steps(self.function_def_steps())
+
+    def function_def_steps(self):
+        node = self.node_class("FUNC_DEF")
 
         # HOW IZ I
-        howizi_token = self.expect("HOWIZI")
-        node.add(TreeNode("HOWIZI", howizi_token["value"], howizi_token.get('line')))
+        howizi_token = self.expect(Kind.FUNCTION_DEF_CALL, "HOW IZ I")
+        node.add(self.node_class("HOWIZI", howizi_token["value"], howizi_token.get('line')))
 
         # function name
-        func_name = self.expect("IDENTIFIER")
-        node.add(TreeNode("FUNC_NAME", func_name["value"], func_name.get('line')))
-
-        # Parameters: 0 or more "YR <IDENTIFIER>"
-        params_node = TreeNode("PARAMS")
-        while self.match("YR"):
-            yr_token = self.previous()
-            param = self.expect("IDENTIFIER")
-            params_node.add(TreeNode("PARAM", param["value"], param.get('line')))
+        func_name = self.expect(Kind.IDENTIFIER)
+        node.add(self.node_class("FUNC_NAME", func_name["value"], func_name.get('line')))
+
+        # Parameters: 0 or more "YR <IDENTIFIER>", separated by AN
+        params_node = self.node_class("PARAMS")
+        while self.match(Kind.LOOPING, "YR"):
+            param = self.expect(Kind.IDENTIFIER)
+            params_node.add(self.node_class("PARAM", param["value"], param.get('line')))
+            if not (self.check(Kind.MULTI_PARAM_SEPARATOR) and self.cursor.peek(1)[:2] == (Kind.LOOPING, "YR")):
+                break
+            self.advance()  # AN
         node.add(params_node)
 
         # Block
-        block = self.parse_block()
+        block = (yield BLOCK)
         node.add(block)
 
         # IF U SAY SO
-        ifusayso_token = self.expect("IFUSAYSO")
-        node.add(TreeNode("IFUSAYSO", ifusayso_token["value"], ifusayso_token.get('line')))
+        ifusayso_token = self.expect(Kind.FUNCTION_DEF_CALL, "IF U SAY SO")
+        node.add(self.node_class("IFUSAYSO", ifusayso_token["value"], ifusayso_token.get('line')))
 
         return node
     
-    # <function_call>::= I IZ <funcident> (<expr>)* MKAY
+    # <function_call>::= I IZ <funcident> (YR <expr> (AN YR <expr>)*)? MKAY
+    # (MKAY may be left off at the end of a line)
     def parse_function_call(self):
-        node = TreeNode("FUNC_CALL")
+        return self.run_steps(self.function_call_steps())
+
+    def function_call_steps(self):
+        node = self.node_class("FUNC_CALL")
 
         # I IZ
-        iiz_token = self.expect("I IZ")
-        node.add(TreeNode("IIZ", iiz_token["value"], iiz_token.get('line')))
+        iiz_token = self.expect(Kind.FUNCTION_DEF_CALL, "I IZ")
+        node.add(self.node_class("IIZ", iiz_token["value"], iiz_token.get('line')))
 
         # function name
-        func_name = self.expect("IDENTIFIER")
-        node.add(TreeNode("FUNC_NAME", func_name["value"], func_name.get('line')))
+        func_name = self.expect(Kind.IDENTIFIER)
+        node.add(self.node_class("FUNC_NAME", func_name["value"], func_name.get('line')))
     
         # arguments
-        args_node = TreeNode("ARGS")
-        while self.match("YR"):
+        args_node = self.node_class("ARGS")
+        while self.match(Kind.LOOPING, "YR"):
             yr_token = self.previous()
-            expr = self.parse_expr()
-            expr_node = TreeNode("ARG", None, yr_token.get('line'))
+            expr = (yield EXPR)
+            expr_node = self.node_class("ARG", None, yr_token.get('line'))
             expr_node.add(expr)
             args_node.add(expr_node)
+            if not (self.check(Kind.MULTI_PARAM_SEPARATOR) and self.cursor.peek(1)[:2] == (Kind.LOOPING, "YR")):
+                break
+            self.advance()  # AN
         node.add(args_node)
 
         # MKAY
-        mkay_token = self.expect("MKAY")
-        node.add(TreeNode("MKAY", mkay_token["value"], mkay_token.get('line')))
+        if self.current()[2] == self.previous()["line"] or self.check(Kind.FUNCTION_DEF_CALL, "MKAY"):
+            mkay_token = self.expect(Kind.FUNCTION_DEF_CALL, "MKAY")
+            node.add(self.node_class("MKAY", mkay_token["value"], mkay_token.get('line')))
 
         return node
     
     # <input> ::= GIMMEH <varident>
     def parse_input(self):
-        node = TreeNode("INPUT")
+        node = self.node_class("INPUT")
         
         # GIMMEH keyword
-        gimmeh_token = self.expect("IO", "GIMMEH")
-        node.add(TreeNode("GIMMEH", gimmeh_token["value"], gimmeh_token.get('line')))
+        gimmeh_token = self.expect(Kind.IO, "GIMMEH")
+        node.add(self.node_class("GIMMEH", gimmeh_token["value"], gimmeh_token.get('line')))
         
         # Variable
-        var_token = self.expect("IDENTIFIER")
-        node.add(TreeNode("VAR", var_token["value"], var_token.get('line')))
+        var_token = self.expect(Kind.IDENTIFIER)
+        node.add(self.node_class("VAR", var_token["value"], var_token.get('line')))
         
         return node
         
     # <exception_handling> ::= PLZ <expr>? <linebreak> AWSUM THX <linebreak> <statement_list> (O NOES <linebreak> <statement_list>)? KTHX
     def parse_exception_handling(self):
-        node = TreeNode("EXCEPTION")
+        return self.run_steps(self.exception_handling_steps())
+
+    def exception_handling_steps(self):
+        node = self.node_class("EXCEPTION")
 
         # PLZ
-        plz_token = self.expect("PLZ")
-        node.add(TreeNode("PLZ", plz_token["value"], plz_token.get('line')))
+        plz_token = self.expect(Kind.CONTROL_FLOW, "PLZ")
+        node.add(self.node_class("PLZ", plz_token["value"], plz_token.get('line')))
         
         # optional <expr>
-        if not self.check("AWSUMTHX"):
-            expr = self.parse_expr()
+        if not self.check(Kind.CONTROL_FLOW, "AWSUM THX"):
+            expr = (yield EXPR)
             node.add(expr)
         
         # AWSUM THX
-        aws_token = self.expect("AWSUMTHX")
+        aws_token = self.expect(Kind.CONTROL_FLOW, "AWSUM THX")
         
         # success block
-        success_block = self.parse_block()
-        success_node = TreeNode("SUCCESS", aws_token["value"], aws_token.get('line'))
+        success_block = (yield BLOCK)
+        success_node = self.node_class("SUCCESS", aws_token["value"], aws_token.get('line'))
         success_node.add(success_block)
         node.add(success_node)
         
         # optional O NOES
-        if self.match("ONOES"):
+        if self.match(Kind.CONTROL_FLOW, "O NOES"):
             fail_token = self.previous()  # token for O NOES
-            fail_block = self.parse_block()
-            fail_node = TreeNode("FAIL", fail_token["value"], fail_token.get('line'))
+            fail_block = (yield BLOCK)
+            fail_node = self.node_class("FAIL", fail_token["value"], fail_token.get('line'))
             fail_node.add(fail_block)
             node.add(fail_node)
         
         # KTHX
-        kthx_token = self.expect("KTHX")
-        node.add(TreeNode("KTHX", kthx_token["value"], kthx_token.get('line')))
+        kthx_token = self.expect(Kind.CONTROL_FLOW, "KTHX")
+        node.add(self.node_class("KTHX", kthx_token["value"], kthx_token.get('line')))
         
         return node
 
     # <block> ::= <statement_list>
     def parse_block(self):
-        block_node = TreeNode("BLOCK")
+        block_node = self.node_class("BLOCK")
         stmt_list_node = self.parse_statement_list()
         block_node.add(stmt_list_node)
         return block_node
@@ -579,37 +645,32 @@ class TreeParser:
     # Expressions
     # -------------------------
     def parse_expr_list(self):
-        node = TreeNode("EXPR_LIST")
-        first = True
+        node = self.node_class("EXPR_LIST")
+        cursor = self.cursor
 
-        while True:
-            token_type, token_value, *_ = self.current()
-
-            # Stop if definitely not an expression
-            if token_type in ("CODE_DELIMITER", "EOF"):
-                break
+        # Stop if definitely not an expression
+        if cursor.current[0] in (Kind.CODE_DELIMITER, Kind.EOF):
+            return node
 
-            # Prevent infinite loop: stop on statement starters
-            if not first and token_type in ("OUTPUT_KEYWORD", "INPUT_KEYWORD", "VAR_DECLARATION", "FUNCTION_DEF"):
-                break
+        while True:
+            token_type, token_value, *_ = cursor.current
             # If it's GIMMEH, treat it as an expression
-            if token_type == "IO" and token_value == "GIMMEH":
+            if token_type == Kind.IO and token_value == "GIMMEH":
                 expr_node = self.parse_input()
             else:
                 expr_node = self.parse_expr()
-
             node.add(expr_node)
-            first = False  # update after first expression
 
             # Continue if next token is a multi-param separator "AN"
-            if self.match("MULTI_PARAM_SEPARATOR", "AN"):
-                if not self.peek_next_is_expr():
+            if self.match(Kind.MULTI_PARAM_SEPARATOR, "AN"):
+                if not self.starts_expr(cursor.current, EXPR_LIST_FIRST_PHRASES):
                     self.errors.append(f"Expected expression after AN at pos {self.pos}")
                     break
                 continue
 
-            # Or continue if next token is another expression (no AN needed)
-            if self.peek_next_is_expr():
+            # Or continue with another expression on the same line (no AN needed)
+            token = cursor.current
+            if token[2] == cursor.peek(-1)[2] and self.starts_expr(token, EXPR_LIST_FIRST_PHRASES):
                 continue
 
             # Otherwise, stop
@@ -617,164 +678,212 @@ class TreeParser:
 
         return node
 
-    # EXPR
+    # EXPR: one table lookup on the current token kind
     def parse_expr(self):
-        token_type, token_value, *_ = self.current()
+        return self.expr_parsers.get(self.cursor.current[0], self.parse_expr_error)()
 
-        # Literal or variable
-        if token_type in ("INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE"):
-            self.advance()
-            return TreeNode("LITERAL", token_value, getattr(self.current(), 'line', None))
-        
-        # Identifiers
-        elif token_type == "IDENTIFIER":
-            self.advance()
-            return TreeNode("IDENTIFIER", token_value, getattr(self.current(), 'line', None))
-        
-        # Typecast expressions
-        elif token_type == "MAEK":
-            return self.parse_typecast()
-
-        # Arithmetic operation 
-        elif token_type == "ARITHMETIC_OPERATOR" or token_value in ("SUM OF", "DIFF OF", "PRODUKT OF", "QUOSHUNT OF", "MOD OF"):
-            return self.parse_operation()
-        
-        # Comparison operation
-        elif token_type == "COMPARISON_OPERATOR" or token_value in ("BIGGR OF", "SMALLR OF", "BOTH SAEM", "DIFFRINT"):
-            return self.parse_comparison()
-        
-        # Logical (BOTH OF, ANY OF, ALL OF, etc.)
-        elif token_type == "LOGICAL_OPERATOR":
-            if token_value == "NOT":
-                self.advance()
-                node = TreeNode("NOT", token_value, getattr(self.current(), 'line', None))
-                node.add(self.parse_expr())
-                return node
-            else:
-                return self.parse_logical()
-        
-        # SMOOSH concatenation
-        elif token_type == "SMOOSH":
-            return self.parse_smoosh()
-        
-        # Function call
-        elif token_type == "FUNCTION_CALL":
+    def parse_expr_error(self):
+        token_type, token_value, line, _ = self.current()
+        #raise ParserError(f"Unexpected token in expression: {token_type} {token_value}")
+        self.errors.append(f"Unexpected token {kind_name(token_type)} {token_value} at pos {self.pos}")
+        self.advance()
+        return self.node_class("ERROR", token_value, line)
+
+    # Literal
+    def parse_literal_expr(self):
+        _, token_value, line, _ = self.cursor.current
+        self.cursor.advance()
+        return self.node_class("LITERAL", token_value, line)
+
+    # Variable
+    def parse_identifier_expr(self):
+        _, token_value, line, _ = self.cursor.current
+        self.cursor.advance()
+        return self.node_class("IDENTIFIER", token_value, line)
+
+    # Function call (only I IZ of the FUNCTION_DEF_CALL keywords)
+    def parse_call_expr(self):
+        if self.cursor.current[1] == "I IZ":
             return self.parse_function_call()
-
-        else:
-            #raise ParserError(f"Unexpected token in expression: {token_type} {token_value}")
-            self.errors.append(f"Unexpected token {token_type} {token_value} at pos {self.pos}")
-            self.advance()
-            return TreeNode("ERROR", token_value, getattr(self.current(), 'line', None))
-        
-    # Arithmetic operation
-    def parse_operation(self):
-        tok = self.expect("ARITHMETIC_OPERATOR")
-        node = TreeNode("OP", tok["value"], tok.get("line"))
-
-        # Parse **any expression** as operands, including nested comparisons or operations
+        return self.parse_expr_error()
+
+    # <operator> <expr> [AN <expr> ...] [MKAY], shaped by EXPR_OPERATORS:
+    # OP, COMPARISON, LOGICAL, NOT and SMOOSH nodes
+    def parse_operator(self):
+        cursor = self.cursor
+        token_type, token_value, line, _ = cursor.current
+        operator = EXPR_OPERATORS.get(token_value)
+        if operator is None:
+            self.errors.append(f"Unknown {kind_name(token_type)} operator: {token_value} at pos {self.pos}")
+            cursor.advance()
+            return self.node_class("ERROR", token_value, line)
+        node_type, arity = operator
+        cursor.advance()
+
+        node = self.node_class(node_type, token_value, line)
         node.add(self.parse_expr())
 
-        while self.match("MULTI_PARAM_SEPARATOR", "AN"):
+        if arity == BINARY:
+            self.expect(Kind.MULTI_PARAM_SEPARATOR, "AN")
             node.add(self.parse_expr())
+        elif arity != UNARY:
+            while cursor.current[0] == Kind.MULTI_PARAM_SEPARATOR:
+                cursor.advance()
+                node.add(self.parse_expr())
+            if arity == VARIADIC_MKAY:
+                self.expect(Kind.FUNCTION_DEF_CALL, "MKAY")
+            else:
+                self.match(Kind.FUNCTION_DEF_CALL, "MKAY")
 
         return node
-    
-    # Comparison operation
-    def parse_comparison(self):
-        token_type, token_value, *_ = self.current()
-
-        if token_type == "COMPARISON_OPERATOR" or token_value in ("BIGGR OF", "SMALLR OF", "BOTH SAEM", "DIFFRINT"):
-            tok = self.expect(token_type, token_value)
-            node = TreeNode("COMPARISON", tok["value"], tok.get("line"))
-
-            # First operand must always exist
-            node.add(self.parse_expr())
-
-            # Parse additional operands after "AN"
-            while self.match("MULTI_PARAM_SEPARATOR", "AN"):
-                if self.peek_next_is_expr():
-                    node.add(self.parse_expr())
-                else:
-                    # If next token after AN is missing or invalid, stop gracefully
-                    break
-
-            return node
-
-        self.errors.append(f"Unexpected token in comparison: {token_type} {token_value}")
-        self.advance()
-        return TreeNode("ERROR", token_value, getattr(self.current(), 'line', None))
 
+    # parse_operator as a step generator (StackTreeParser); kept separate
+    # since operators are too frequent to pay for run_steps
+    def operator_steps(self):
+        cursor = self.cursor
+        token_type, token_value, line, _ = cursor.current
+        operator = EXPR_OPERATORS.get(token_value)
+        if operator is None:
+            self.errors.append(f"Unknown {kind_name(token_type)} operator: {token_value} at pos {self.pos}")
+            cursor.advance()
+            return self.node_class("ERROR", token_value, line)
+        node_type, arity = operator
+        cursor.advance()
+
+        node = self.node_class(node_type, token_value, line)
+        node.add((yield EXPR))
+
+        if arity == BINARY:
+            self.expect(Kind.MULTI_PARAM_SEPARATOR, "AN")
+            node.add((yield EXPR))
+        elif arity != UNARY:
+            while cursor.current[0] == Kind.MULTI_PARAM_SEPARATOR:
+                cursor.advance()
+                node.add((yield EXPR))
+            if arity == VARIADIC_MKAY:
+                self.expect(Kind.FUNCTION_DEF_CALL, "MKAY")
+            else:
+                self.match(Kind.FUNCTION_DEF_CALL, "MKAY")
 
-    def parse_logical(self):
-        token_type, token_value, *_ = self.current()
-        line = self.tokens[self.pos][2] if len(self.tokens[self.pos]) > 2 else None
+        return node
+    
+    # -------------------------
+    # Literals
+    # -------------------------
+    def parse_literal(self):
+        token_type, token_value, line, _ = self.current()
         
-        # Combine ANY/ALL with OF if necessary
-        if token_value in ("ANY", "ALL"):
+        if token_type in LITERAL_KINDS:
             self.advance()
-            next_type, next_value, *_ = self.current()
-            if next_type == "LOGICAL_OPERATOR" and next_value == "OF":
-                token_value = f"{token_value} OF"
-                self.advance()
-            else:
-                raise ParserError(f"Expected OF after {token_value}")
-
+            return self.node_class("LITERAL", token_value, line)
         else:
-            self.advance()
+            raise ParserError(f"Expected literal, got {kind_name(token_type)} ({token_value})")
 
-        # Create node with value and line
-        node = TreeNode("LOGICAL", token_value, line)
 
-        if token_value == "NOT":
-            node.add(self.parse_expr())
-            return node
-        elif token_value in ("BOTH OF", "EITHER OF", "WON OF"):
-            node.add(self.parse_expr())
-            self.expect("MULTI_PARAM_SEPARATOR", "AN")
-            node.add(self.parse_expr())
-            return node
-        elif token_value in ("ALL OF", "ANY OF"):
-            node.add(self.parse_expr())
-            while self.match("MULTI_PARAM_SEPARATOR", "AN"):
-                node.add(self.parse_expr())
-            self.expect("FUNCTION_DEF_CALL", "MKAY")
-            return node
-        else:
-            self.errors.append(f"Unknown logical operator: {token_value}")
-            return node
-    
-    # <smoosh> ::= SMOOSH <expr> (AN <expr>)*
-    def parse_smoosh(self):
-        token_type, token_value, *_ = self.current()
-        line = self.tokens[self.pos][2] if len(self.tokens[self.pos]) > 2 else None
+# -------------------------
+# Explicit-stack Tree Parser
+# -------------------------
+class StackTreeParser(TreeParser):
+    '''
+    TreeParser that keeps nested blocks and expressions on an explicit work
+    stack instead of the Python call stack, so nesting depth is only
+    limited by memory. Builds the same AST as TreeParser.
+    '''
+    def __init__(self, tokens, arena=None):
+        super().__init__(tokens, arena)
+
+        # What to start for each request: a finished node or a *_steps generator
+        self.starters = {
+            EXPR: self.expr_start,
+            BLOCK: self.block_steps,
+            STATEMENT: self.statement_start,
+            STATEMENT_LIST: self.statement_list_steps,
+        }
+        nested = {
+            Kind.ARITHMETIC_OPERATOR: self.operator_steps,
+            Kind.COMPARISON_OPERATOR: self.operator_steps,
+            Kind.LOGICAL_OPERATOR: self.operator_steps,
+            Kind.SMOOSH: self.operator_steps,
+            Kind.MAEK: self.typecast_steps,
+            Kind.FUNCTION_DEF_CALL: self.call_expr_start,
+        }
+        self.expr_starters = dict(self.expr_parsers)
+        self.expr_starters.update(nested)
+
+        # Statements that contain blocks are started as *_steps generators
+        self.statement_starters = {}
+        for terminal, parser in self.statement_parsers.items():
+            name = parser.__name__[len("parse_"):]
+            self.statement_starters[terminal] = getattr(self, name + "_steps", parser)
+
+    # Run a *_steps generator and everything it asks for on one explicit stack
+    def run_stack(self, steps):
+        if type(steps) is not GeneratorType:
+            return steps    # already finished
+        starters = self.starters
+        stack = [steps]
+        value = None
+        while True:
+            try:
+                request = stack[-1].send(value)
+            except StopIteration as done:
+                stack.pop()
+                if not stack:
+                    return done.value
+                value = done.value
+                continue
+            task = request if type(request) is GeneratorType else starters[request]()
+            if type(task) is GeneratorType:
+                stack.append(task)
+                value = None
+            else:
+                value = task
 
-        # Consume SMOOSH
-        self.expect("SMOOSH")
+    def run_steps(self, steps):
+        return self.run_stack(steps)
 
-        # Create SMOOSH node
-        node = TreeNode("SMOOSH", token_value, line)
+    def parse_expr(self):
+        return self.run_stack(self.expr_start())
 
-        # At least one expression
-        expr_node = self.parse_expr()
-        node.add(expr_node)
+    def parse_block(self):
+        return self.run_stack(self.block_steps())
 
-        # Additional expressions separated by AN
-        while self.match("MULTI_PARAM_SEPARATOR", "AN"):
-            expr_node = self.parse_expr()
-            node.add(expr_node)
+    def parse_statement_list(self):
+        return self.run_stack(self.statement_list_steps())
+
+    def parse_statement(self):
+        return self.run_stack(self.statement_start())
 
-        return node
-    
     # -------------------------
-    # Literals
+    # Starters
     # -------------------------
-    def parse_literal(self):
-        token_type, token_value, *_ = self.current()
-        line = self.tokens[self.pos][2] if len(self.tokens[self.pos]) > 2 else None
-        
-        if token_type in ("INT_LITERAL", "FLOAT_LITERAL", "STRING", "BOOL_TRUE", "BOOL_FALSE"):
-            self.advance()
-            return TreeNode("LITERAL", token_value, line)
-        else:
-            raise ParserError(f"Expected literal, got {token_type} ({token_value})")
+    def expr_start(self):
+        return self.expr_starters.get(self.cursor.current[0], self.parse_expr_error)()
+
+    def call_expr_start(self):
+        if self.cursor.current[1] == "I IZ":
+            return self.function_call_steps()
+        return self.parse_expr_error()
+
+    def statement_start(self):
+        starter = predict(self.statement_starters, self.cursor.current)
+        if starter is not None:
+            return starter()
+        return TreeParser.parse_statement(self)     # unknown statement error
+
+    def block_steps(self):
+        block_node = self.node_class("BLOCK")
+        block_node.add((yield STATEMENT_LIST))
+        return block_node
+
+    def statement_list_steps(self):
+        node = self.node_class("STMT_LIST")
+        cursor = self.cursor
+        while True:
+            token = cursor.current
+            if predict(STMT_LIST_ROW, token) == [] or token[0] == Kind.EOF:
+                break
+            stmt = yield STATEMENT
+            if stmt:
+                node.add(stmt)
+        return node
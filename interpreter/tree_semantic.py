@@ -1,5 +1,7 @@
-from lexer import tokenize, filter_tokens
-from tree_parser import TreeParser, ParserError
+from compilation import CompilationUnit
+from inference import infer_types
+from visitor import Visitor, SKIP
+from runtime import LOLError, BINARY_OPS, decode_literal, lol_smoosh
 
 
 # ==========================================================
@@ -27,122 +29,129 @@ class SymbolTable:
 
 
 # ==========================================================
-# Expression Evaluator for AST Nodes
+# AST Walker for Semantic Analysis
 # ==========================================================
-def eval_ast(node, table: SymbolTable, errors: list):
-    # ---------- Literals ----------
-    if node.node_type == "LITERAL":
-        val = node.value
-        if val.isdigit():
-            return int(val)
-        try:
-            return float(val)
-        except ValueError:
-            return val  # string literal
+class SemanticAnalyzer(Visitor):
+    """
+    Checks declarations and tracks the values of variables known at
+    analysis time. Expressions evaluate bottom-up in post hooks; a value
+    of None means unknown.
+    """
+
+    def __init__(self, table: SymbolTable, errors: list):
+        super().__init__()
+        self.globals = table
+        self.table = table      # the scope being walked
+        self.errors = errors
+
+    # ---------- Scopes ----------
+    # A HOW IZ I body sees only its parameters
+    def pre_FUNC_DEF(self, node):
+        self.table = SymbolTable()
+        for param in node.children[2].children:
+            self.table.declare(param.value)
+
+    def post_FUNC_DEF(self, node, values):
+        self.table = self.globals
+
+    # UPPIN/NERFIN create their variable when it is missing
+    def pre_LOOP(self, node):
+        for child in node.children:
+            if child.node_type == "DIRECTION" and not self.table.is_declared(child.children[1].value):
+                self.table.declare(child.children[1].value, 0)
 
-    # ---------- Identifier ----------
-    if node.node_type == "IDENTIFIER":
-        name = node.value
-        if not table.is_declared(name):
-            errors.append(f"Variable '{name}' used before declaration.")
-            return None
-        return table.get_value(name)
+    # ---------- Variable Declaration ----------
+    # Declared before its initializer runs
+    def pre_VAR_DEC(self, node):
+        err = self.table.declare(node.children[0].value)
+        if err:
+            self.errors.append(err)
 
-    # ---------- Operations (SUM OF, DIFF OF, etc.) ----------
-    if node.node_type == "OP":
-        op = node.value
-        operands = [eval_ast(child, table, errors) for child in node.children]
+    def post_VAR_DEC(self, node, values):
+        if len(values) > 1:
+            self.table.set_value(node.children[0].value, values[1])
 
-        if any(v is None for v in operands):
-            return None
+    # ---------- Assignment ----------
+    def pre_ASSIGN(self, node):
+        var_name = node.children[0].value
+        if not self.table.is_declared(var_name):
+            self.errors.append(f"Variable '{var_name}' used before declaration.")
+            return SKIP
 
-        if op == "SUM OF":
-            return sum(operands)
-
-        elif op == "DIFF OF":
-            res = operands[0]
-            for n in operands[1:]:
-                res -= n
-            return res
-
-        elif op == "PRODUKT OF":
-            res = operands[0]
-            for n in operands[1:]:
-                res *= n
-            return res
-
-        elif op == "QUOSHUNT OF":
-            res = operands[0]
-            for n in operands[1:]:
-                res /= n
-            return res
-
-        elif op == "MOD OF":
-            res = operands[0]
-            for n in operands[1:]:
-                res %= n
-            return res
+    def post_ASSIGN(self, node, values):
+        self.table.set_value(node.children[0].value, values[1])
 
-    # ---------- SMOOSH ----------
-    if node.node_type == "SMOOSH":
-        parts = [str(eval_ast(child, table, errors)) for child in node.children]
-        return "".join(parts)
+    # ---------- Variables ----------
+    def post_IDENTIFIER(self, node, values):
+        name = node.value
+        if name == "IT":
+            return None
+        if not self.table.is_declared(name):
+            self.errors.append(f"Variable '{name}' used before declaration.")
+            return None
+        return self.table.get_value(name)
 
-    return None
+    # GIMMEH and IS NOW A targets
+    def post_VAR(self, node, values):
+        if not self.table.is_declared(node.value):
+            self.errors.append(f"Variable '{node.value}' used before declaration.")
 
+    # ---------- Literals ----------
+    # LITERAL as parsed, or the NUMBR/NUMBAR/YARN/TROOF nodes of a folded tree
+    def post_LITERAL(self, node, values):
+        return decode_literal(node.value)
 
-# ==========================================================
-# AST Walker for Semantic Analysis
-# ==========================================================
-def walk_ast(node, table: SymbolTable, errors: list):
-    # ---------- Variable Declaration ----------
-    if node.node_type == "VAR_DEC":
-        var_name = node.children[0].value
-        err = table.declare(var_name)
-        if err:
-            errors.append(err)
+    def post_constant(self, node, values):
+        return node.value
+    post_NUMBR = post_NUMBAR = post_YARN = post_TROOF = post_constant
 
-        if len(node.children) > 1:
-            init_value = eval_ast(node.children[1], table, errors)
-            table.set_value(var_name, init_value)
+    # ---------- Operations (SUM OF, DIFF OF, etc.) ----------
+    # Computed as the engines do, by the runtime's operators
+    def post_OP(self, node, values):
+        function = BINARY_OPS.get(node.value)
+        if function is None or len(values) != 2 or None in values:
+            return None
+        try:
+            return function(*values)
+        except LOLError:
+            return None     # type errors are reported by infer_types
 
-    # ---------- Assignment ----------
-    elif node.node_type == "ASSIGN":
-        var_name = node.children[0].value
-        if not table.is_declared(var_name):
-            errors.append(f"Variable '{var_name}' used before declaration.")
-        else:
-            value = eval_ast(node.children[1], table, errors)
-            table.set_value(var_name, value)
+    # ---------- SMOOSH ----------
+    def post_SMOOSH(self, node, values):
+        if None in values:
+            return None
+        return lol_smoosh(*values)
 
-    # ---------- VISIBLE ----------
-    elif node.node_type == "PRINT":
-        for expr in node.children:
-            eval_ast(expr, table, errors)  # detect undeclared usage
 
-    # ---------- Other constructs ----------
-    # BLOCK, IF, LOOP, etc.
-    for child in node.children:
-        walk_ast(child, table, errors)
+def walk_ast(node, table: SymbolTable, errors: list):
+    SemanticAnalyzer(table, errors).walk(node)
 
 
 # ==========================================================
 # Main Entry Point
 # ==========================================================
-def analyze_semantics_from_code(code):
+# (errors, symbols) of a CompilationUnit, memoized on the unit. The
+# optimizer's warnings (unreachable code, constant O RLY?) go to
+# `warnings` when given
+def analyze_unit(unit, warnings=None):
+    if warnings is not None:
+        warnings.extend(unit.warnings)
+    return unit.stage("semantics", lambda: check_tree(unit))
+
+def check_tree(unit):
     # ---------- Syntax Check ----------
-    try:
-        tokens = tokenize(code)
-        clean_tokens = filter_tokens(tokens)
-        parser = TreeParser(clean_tokens)
-        ast_root = parser.parse_program()
-    except ParserError as e:
-        return [str(e)], {}
+    if unit.tree is None:
+        return unit.syntax_errors, {}
 
     # ---------- Semantic Check ----------
+    # On the tree as parsed: code the optimizer drops is still checked
     table = SymbolTable()
     errors = []
 
-    walk_ast(ast_root, table, errors)
+    walk_ast(unit.tree, table, errors)
+    errors.extend(infer_types(unit.tree).errors)
 
     return errors, table.symbols
+
+def analyze_semantics_from_code(code, warnings=None):
+    return analyze_unit(CompilationUnit(code), warnings)
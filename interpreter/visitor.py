@@ -0,0 +1,53 @@
+'''
+Iterative visitor for TreeParser ASTs.
+
+A Visitor subclass defines `pre_<NODE_TYPE>(node)` and
+`post_<NODE_TYPE>(node, values)` methods; they are looked up once into
+dispatch dicts keyed by node type. walk() visits every node exactly once
+with an explicit stack, so trees of any depth work:
+
+  - the pre hook runs on the way down; returning SKIP leaves the node's
+    children unvisited (and its post hook unrun);
+  - the post hook runs on the way up with the list of values its
+    children's post hooks returned, and returns the node's own value.
+
+Node types without a hook are walked through, with the value None.
+'''
+
+# Returned by a pre hook to skip a node's subtree
+SKIP = object()
+
+ENTER, LEAVE = 0, 1
+
+
+class Visitor:
+    def __init__(self):
+        self.pre = {}
+        self.post = {}
+        for name in dir(type(self)):
+            if name.startswith("pre_"):
+                self.pre[name[4:]] = getattr(self, name)
+            elif name.startswith("post_"):
+                self.post[name[5:]] = getattr(self, name)
+
+    def walk(self, root):
+        '''Visit `root` and everything below it; returns the root's value.'''
+        pre = self.pre
+        post = self.post
+        result = []
+        stack = [(ENTER, root, result, None)]
+        while stack:
+            action, node, out, values = stack.pop()
+            if action == ENTER:
+                hook = pre.get(node.node_type)
+                if hook is not None and hook(node) is SKIP:
+                    out.append(None)
+                    continue
+                values = []
+                stack.append((LEAVE, node, out, values))
+                for child in reversed(node.children):
+                    stack.append((ENTER, child, values, None))
+            else:
+                hook = post.get(node.node_type)
+                out.append(None if hook is None else hook(node, values))
+        return result[0]
@@ -0,0 +1,190 @@
+'''
+Stack VM for programs compiled by bytecode.py.
+
+One dispatch loop runs the whole program with an operand stack and an
+explicit call stack, so HOW IZ I recursion depth is not limited by
+Python's recursion limit.
+
+Usage:  python vm.py [--dis] program.lol
+'''
+
+import sys
+
+from lexer import tokenize
+from tree_parser import TreeParser
+from optimizer import fold_constants
+from bytecode import OP, BINARY_FUNCS, compile_bytecode, disassemble
+from runtime import LOLError, cast, to_number, to_yarn
+
+NUMERIC_TYPES = frozenset((int, float))
+
+
+class VM:
+    def __init__(self, program, stdin=None, stdout=None):
+        self.program = program
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+
+    def run(self):
+        '''Run the program; returns its global variables.'''
+        program = self.program
+        # A list indexes faster than the array('i') it is stored in
+        code = list(program.code)
+        consts = program.consts
+        names = program.names
+        functions = program.functions
+        write = self.stdout.write
+        readline = self.stdin.readline
+        binary_funcs = BINARY_FUNCS
+        numeric = NUMERIC_TYPES
+        # Opcodes as locals: the dispatch chain compares against them constantly
+        (LOAD, CONST, DECLARE, STORE, ADD, SUB, MUL, BINARY, JUMP_IF_FALSE, JUMP_IF_TRUE,
+         JUMP, INC, DEC, CALL, RETURN) = (
+            OP.LOAD, OP.CONST, OP.DECLARE, OP.STORE, OP.ADD, OP.SUB, OP.MUL, OP.BINARY,
+            OP.JUMP_IF_FALSE, OP.JUMP_IF_TRUE, OP.JUMP, OP.INC, OP.DEC, OP.CALL, OP.RETURN)
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        calls = []          # (return offset, caller frame)
+        handlers = []       # (handler offset, call depth, stack depth)
+        globals_ = frame = {"IT": None}
+        pc = 0
+
+        while True:
+            try:
+                while True:
+                    op = code[pc]
+                    arg = code[pc + 1]
+                    pc += 2
+
+                    if op == LOAD:
+                        try:
+                            push(frame[names[arg]])
+                        except KeyError:
+                            raise LOLError(self.undeclared(pc, arg)) from None
+                    elif op == CONST:
+                        push(consts[arg])
+                    elif op == DECLARE:
+                        frame[names[arg]] = pop()
+                    elif op == STORE:
+                        name = names[arg]
+                        if name not in frame:
+                            raise LOLError(self.undeclared(pc, arg))
+                        frame[name] = pop()
+                    elif op == ADD or op == SUB or op == MUL:
+                        b = pop()
+                        a = pop()
+                        if type(a) not in numeric or type(b) not in numeric:
+                            a = to_number(a)
+                            b = to_number(b)
+                        push(a + b if op == ADD else a - b if op == SUB else a * b)
+                    elif op == BINARY:
+                        b = pop()
+                        stack[-1] = binary_funcs[arg](stack[-1], b)
+                    elif op == JUMP_IF_FALSE:
+                        if not pop():
+                            pc = arg
+                    elif op == JUMP_IF_TRUE:
+                        if pop():
+                            pc = arg
+                    elif op == JUMP:
+                        pc = arg
+                    elif op == INC or op == DEC:
+                        name = names[arg]
+                        frame[name] = to_number(frame[name]) + (1 if op == INC else -1)
+                    elif op == CALL:
+                        function = functions[arg]
+                        params = function.params
+                        if params:
+                            local = dict(zip(params, stack[-len(params):]))
+                            del stack[-len(params):]
+                        else:
+                            local = {}
+                        local["IT"] = None
+                        calls.append((pc, frame))
+                        frame = local
+                        pc = function.entry
+                    elif op == RETURN:
+                        pc, frame = calls.pop()
+                    elif op == OP.NOT:
+                        stack[-1] = not stack[-1]
+                    elif op == OP.PRINT:
+                        values = stack[len(stack) - arg:]
+                        del stack[len(stack) - arg:]
+                        write("".join([to_yarn(value) for value in values]) + "\n")
+                    elif op == OP.VARIADIC:
+                        function, argc = consts[arg]
+                        values = stack[len(stack) - argc:]
+                        del stack[len(stack) - argc:]
+                        push(function(*values))
+                    elif op == OP.CAST:
+                        stack[-1] = cast(stack[-1], consts[arg])
+                    elif op == OP.POP:
+                        pop()
+                    elif op == OP.DUP:
+                        push(stack[-1])
+                    elif op == OP.READ:
+                        name = names[arg]
+                        if name not in frame:
+                            raise LOLError(self.undeclared(pc, arg))
+                        value = frame[name] = readline().rstrip("\n")
+                        push(value)
+                    elif op == OP.INIT_COUNTER:
+                        frame.setdefault(names[arg], 0)
+                    elif op == OP.SETUP_EXCEPT:
+                        handlers.append((arg, len(calls), len(stack)))
+                    elif op == OP.POP_EXCEPT:
+                        handlers.pop()
+                    elif op == OP.ERROR:
+                        raise LOLError(consts[arg])
+                    elif op == OP.HALT:
+                        return globals_
+                    else:
+                        raise LOLError(f"Bad opcode {op} at {pc - 2}")
+            except LOLError:
+                if not handlers:
+                    raise
+                # Unwind to the innermost PLZ and run its O NOES block
+                pc, depth, stack_depth = handlers.pop()
+                if depth < len(calls):
+                    frame = calls[depth][1]
+                    del calls[depth:]
+                del stack[stack_depth:]
+
+    def undeclared(self, pc, arg):
+        line = self.program.lines[(pc - 2) // 2]
+        return f"Line {line}: Variable '{self.program.names[arg]}' used before declaration."
+
+
+def run_bytecode(program, stdin=None, stdout=None):
+    return VM(program, stdin, stdout).run()
+
+
+def main(argv):
+    show = "--dis" in argv
+    paths = [arg for arg in argv if arg != "--dis"]
+    if len(paths) != 1:
+        print("Usage: python vm.py [--dis] program.lol")
+        return 1
+    with open(paths[0], "r") as f:
+        parser = TreeParser(tokenize(f.read()))
+    tree = parser.parse_program()
+    if parser.errors:
+        for error in parser.errors:
+            print("-", error)
+        return 1
+    fold_constants(tree)
+    program = compile_bytecode(tree)
+    if show:
+        print(disassemble(program))
+        return 0
+    try:
+        run_bytecode(program)
+    except LOLError as e:
+        print(f"Runtime error: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))